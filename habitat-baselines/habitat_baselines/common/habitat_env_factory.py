@@ -112,6 +112,14 @@ class HabitatVectorEnvFactory(VectorEnvFactory):
             make_env_fn=make_gym_from_config,
             env_fn_args=tuple((c,) for c in configs),
             workers_ignore_signals=workers_ignore_signals,
+            shared_memory_observations=config.habitat_baselines.vector_env.shared_memory_observations,
+            envs_per_worker=config.habitat_baselines.vector_env.envs_per_worker,
+            respawn_workers=config.habitat_baselines.vector_env.respawn_workers,
+            worker_timeout=(
+                config.habitat_baselines.vector_env.worker_timeout
+                if config.habitat_baselines.vector_env.worker_timeout > 0
+                else None
+            ),
         )
 
         if config.habitat.simulator.renderer.enable_batch_renderer:
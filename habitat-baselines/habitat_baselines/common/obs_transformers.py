@@ -231,6 +231,143 @@ class CenterCropper(ObservationTransformer):
         )
 
 
+@baseline_registry.register_obs_transformer()
+class ResizeShortestEdgeCenterCropper(ObservationTransformer):
+    r"""A `ResizeShortestEdge` followed by a `CenterCropper`, see
+    `fuse_obs_transforms`. When the resize shrinks a sensor by an integer
+    factor, the crop is taken from the input before resizing, which gives the
+    same result without resizing the pixels that are cropped away.
+    """
+
+    def __init__(self, resize: ResizeShortestEdge, crop: CenterCropper):
+        super().__init__()
+        self.resize = resize
+        self.crop = crop
+
+    def transform_observation_space(
+        self,
+        observation_space: spaces.Dict,
+    ):
+        return self.crop.transform_observation_space(
+            self.resize.transform_observation_space(observation_space)
+        )
+
+    def _fused_transform_obs(
+        self, obs: torch.Tensor, interpolation_mode: str
+    ) -> Optional[torch.Tensor]:
+        """
+        :returns: The resized and cropped `obs`, None if the resize is not
+            shrinking `obs` by an integer factor.
+        """
+        if obs.dim() != 4:
+            return None
+        channels_last = self.resize.channels_last
+        h, w = get_image_height_width(obs, channels_last=channels_last)
+        scale = self.resize._size / min(h, w)
+        new_h, new_w = int(h * scale), int(w * scale)
+        factor = h // new_h if new_h > 0 else 0
+        crop_h, crop_w = self.crop._size
+        if (
+            factor == 0
+            or new_h * factor != h
+            or new_w * factor != w
+            or crop_h > new_h
+            or crop_w > new_w
+        ):
+            return None
+
+        start_y = (new_h // 2 - crop_h // 2) * factor
+        start_x = (new_w // 2 - crop_w // 2) * factor
+        end_y = start_y + crop_h * factor
+        end_x = start_x + crop_w * factor
+        if channels_last:
+            obs = obs[..., start_y:end_y, start_x:end_x, :]
+        else:
+            obs = obs[..., start_y:end_y, start_x:end_x]
+        if factor == 1:
+            return obs
+        if channels_last:
+            obs = obs.permute(0, 3, 1, 2)  # NHWC => NCHW
+        resized_obs = torch.nn.functional.interpolate(
+            obs.float(), size=(crop_h, crop_w), mode=interpolation_mode
+        ).to(dtype=obs.dtype)
+        if channels_last:
+            resized_obs = resized_obs.permute(0, 2, 3, 1)  # NCHW => NHWC
+        return resized_obs
+
+    @torch.no_grad()
+    def forward(
+        self, observations: Dict[str, torch.Tensor]
+    ) -> Dict[str, torch.Tensor]:
+        if self.resize._size is None:
+            return self.crop(observations)
+
+        fused_sensors = set()
+        if self.crop._size is not None and (
+            self.resize.channels_last == self.crop.channels_last
+        ):
+            for sensor in self.resize.trans_keys:
+                if sensor not in observations or (
+                    sensor not in self.crop.trans_keys
+                ):
+                    continue
+                interpolation_mode = "area"
+                if self.resize.semantic_key in sensor:
+                    interpolation_mode = "nearest"
+                obs = self._fused_transform_obs(
+                    observations[sensor], interpolation_mode
+                )
+                if obs is not None:
+                    observations[sensor] = obs
+                    fused_sensors.add(sensor)
+
+        for sensor in self.resize.trans_keys:
+            if sensor in observations and sensor not in fused_sensors:
+                interpolation_mode = "area"
+                if self.resize.semantic_key in sensor:
+                    interpolation_mode = "nearest"
+                observations[sensor] = self.resize._transform_obs(
+                    observations[sensor], interpolation_mode
+                )
+        if self.crop._size is not None:
+            observations.update(
+                {
+                    sensor: self.crop._transform_obs(observations[sensor])
+                    for sensor in self.crop.trans_keys
+                    if sensor in observations and sensor not in fused_sensors
+                }
+            )
+        return observations
+
+    @classmethod
+    def from_config(cls, config: "DictConfig"):
+        return cls(
+            ResizeShortestEdge.from_config(config.resize_shortest_edge),
+            CenterCropper.from_config(config.center_cropper),
+        )
+
+
+def fuse_obs_transforms(
+    obs_transforms: List[ObservationTransformer],
+) -> List[ObservationTransformer]:
+    r"""Replaces every `ResizeShortestEdge` directly followed by a
+    `CenterCropper` with a `ResizeShortestEdgeCenterCropper` doing both.
+    """
+    fused_obs_transforms: List[ObservationTransformer] = []
+    for obs_transform in obs_transforms:
+        if (
+            isinstance(obs_transform, CenterCropper)
+            and len(fused_obs_transforms) > 0
+            and type(fused_obs_transforms[-1]) is ResizeShortestEdge
+        ):
+            fused_obs_transforms[-1] = ResizeShortestEdgeCenterCropper(
+                fused_obs_transforms[-1], obs_transform  # type: ignore[arg-type]
+            )
+        else:
+            fused_obs_transforms.append(obs_transform)
+    return fused_obs_transforms
+
+
 class _DepthFrom(Enum):
     Z_VAL = 0
     OPTI_CENTER = 1
@@ -646,10 +783,13 @@ class ProjectionConverter(nn.Module):
             self.output_models, inverse=True
         )
 
-        # grids shape: (output_len, input_len, output_img_h, output_img_w, 2)
+        # grids shape: (input_len, output_len, output_img_h, output_img_w, 2)
         self.grids = self.generate_grid()
-        # _grids_cache shape: (batch_size*output_len*input_len, output_img_h, output_img_w, 2)
-        self._grids_cache: Optional[torch.Tensor] = None
+        # Maps (device, dtype) -> grids with the outputs stacked along the
+        # height, shape: (input_len, output_len*output_img_h, output_img_w, 2)
+        self._grids_cache: Dict[
+            Tuple[torch.device, torch.dtype], torch.Tensor
+        ] = {}
 
     def _generate_grid_one_output(
         self, output_model: CameraProjection
@@ -678,27 +818,18 @@ class ProjectionConverter(nn.Module):
         multi_output_grids = torch.cat(multi_output_grids, dim=1)
         return multi_output_grids  # input_len, output_len, output_img_h, output_img_w, 2
 
-    def _convert(self, batch: torch.Tensor) -> torch.Tensor:
-        """Takes a batch of images stacked in proper order and converts thems,
-        reduces batch size by input_len."""
-        batch_size, ch, _H, _W = batch.shape
-        out_h, out_w = self.output_models[0].size()
-        if batch_size == 0 or batch_size % self.input_len != 0:
-            raise ValueError(f"Batch size should be {self.input_len}x")
-        output = torch.nn.functional.grid_sample(
-            batch,
-            self._grids_cache,
-            align_corners=True,
-            padding_mode="zeros",
-        )
-        output = output.view(
-            batch_size // self.input_len,
-            self.input_len,
-            ch,
-            out_h,
-            out_w,
-        ).sum(dim=1)
-        return output  # output_len * batch_size, ch, output_model.img_h, output_model.img_w
+    def _get_grids(
+        self, device: torch.device, dtype: torch.dtype
+    ) -> torch.Tensor:
+        key = (device, dtype)
+        if key not in self._grids_cache:
+            out_h, out_w = self.output_models[0].size()
+            self._grids_cache[key] = (
+                self.grids.to(device=device, dtype=dtype)
+                .reshape(self.input_len, self.output_len * out_h, out_w, 2)
+                .contiguous()
+            )
+        return self._grids_cache[key]
 
     def to_converted_tensor(self, batch: torch.Tensor) -> torch.Tensor:
         """Convert tensors based on projection models. If there are two
@@ -717,30 +848,27 @@ class ProjectionConverter(nn.Module):
         # How many sets of input.
         num_input_set = batch_size // self.input_len
 
-        # to(device) is a NOOP after the first call
-        self.grids = self.grids.to(batch.device)
-
-        # Adjust batch for multiple outputs
-        # batch must be [1st batch * output_len, 2nd batch * output_len, ...]
-        # not that [1st batch, 2nd batch, ...] * output_len
-        multi_out_batch = (
+        # Fold the sets of inputs into the channels so every input model is
+        # sampled with one grid for the whole batch. The grids then do not
+        # depend on the batch size and are not repeated per input set.
+        imgs = (
             batch.view(num_input_set, self.input_len, ch, in_h, in_w)
-            .repeat(1, self.output_len, 1, 1, 1)
-            .view(self.output_len * batch_size, ch, in_h, in_w)
+            .transpose(0, 1)
+            .reshape(self.input_len, num_input_set * ch, in_h, in_w)
         )
-
-        # Cache the repeated grids for subsequent batches
-        if (
-            self._grids_cache is None
-            or self._grids_cache.size()[0] != multi_out_batch.size()[0]
-        ):
-            # batch size is more than one
-            self._grids_cache = self.grids.repeat(
-                num_input_set, 1, 1, 1, 1
-            ).view(batch_size * self.output_len, out_h, out_w, 2)
-        self._grids_cache = self._grids_cache.to(batch.device)
-
-        return self._convert(multi_out_batch)
+        output = torch.nn.functional.grid_sample(
+            imgs,
+            self._get_grids(batch.device, batch.dtype),
+            align_corners=True,
+            padding_mode="zeros",
+        )
+        # Every output pixel is only sampled from a single input.
+        output = output.sum(dim=0)
+        return (
+            output.view(num_input_set, ch, self.output_len, out_h, out_w)
+            .transpose(1, 2)
+            .reshape(num_input_set * self.output_len, ch, out_h, out_w)
+        )  # output_len * batch_size, ch, output_model.img_h, output_model.img_w
 
     def calculate_zfactor(
         self, projections: List[CameraProjection], inverse: bool = False
@@ -789,7 +917,10 @@ class ProjectionConverter(nn.Module):
         if is_depth and self.input_zfactor is not None:
             input_b = batch.size()[0] // self.input_len
             self.input_zfactor = self.input_zfactor.to(batch.device)
-            batch = batch * self.input_zfactor.repeat(input_b, 1, 1, 1)
+            batch = (
+                batch.view(input_b, self.input_len, *batch.shape[1:])
+                * self.input_zfactor
+            ).view(batch.shape)
 
         # Common operator to convert projection models
         out = self.to_converted_tensor(batch)
@@ -798,7 +929,10 @@ class ProjectionConverter(nn.Module):
         if is_depth and self.output_zfactor is not None:
             output_b = out.size()[0] // self.output_len
             self.output_zfactor = self.output_zfactor.to(batch.device)
-            out = out * self.output_zfactor.repeat(output_b, 1, 1, 1)
+            out = (
+                out.view(output_b, self.output_len, *out.shape[1:])
+                * self.output_zfactor
+            ).view(out.shape)
 
         return out
 
@@ -1222,7 +1356,7 @@ def get_active_obs_transforms(
                 )
             obs_transform = obs_trans_cls.from_config(obs_transform_config)
             active_obs_transforms.append(obs_transform)
-    return active_obs_transforms
+    return fuse_obs_transforms(active_obs_transforms)
 
 
 def apply_obs_transforms_batch(
@@ -21,6 +21,49 @@ from habitat_baselines.utils.common import get_action_space_info
 from habitat_baselines.utils.timing import g_timer
 
 
+def reverse_discounted_scan(
+    x: torch.Tensor, discounts: torch.Tensor
+) -> torch.Tensor:
+    r"""Solves :py:`y[t] = x[t] + discounts[t] * y[t + 1]` along the first
+    dimension, with :py:`y[T] = 0`.
+
+    Instead of a sequential loop over the steps, this composes the
+    recurrence over doubling spans, so it takes :py:`ceil(log2(T))`
+    vectorized steps. The sums are associated differently than in the
+    sequential loop, so the result can differ from it by rounding.
+    """
+    y = x.clone()
+    discounts = discounts.expand_as(y).clone()
+    span = 1
+    while span < y.size(0):
+        y[:-span] += discounts[:-span] * y[span:]
+        discounts[:-span] = discounts[:-span] * discounts[span:]
+        span *= 2
+
+    return y
+
+
+def compute_gae_returns(
+    rewards: torch.Tensor,
+    value_preds: torch.Tensor,
+    masks: torch.Tensor,
+    gamma: float,
+    tau: float,
+) -> torch.Tensor:
+    r"""Computes the returns of the first :py:`T` steps with generalized
+    advantage estimation.
+
+    :param rewards: :py:`(T, ...)` rewards of the steps.
+    :param value_preds: :py:`(T + 1, ...)` value predictions, the last one
+        is the bootstrap value.
+    :param masks: :py:`(T + 1, ...)` masks, zero at the first step of an
+        episode.
+    """
+    discounts = gamma * masks[1:]
+    deltas = rewards + discounts * value_preds[1:] - value_preds[:-1]
+    return reverse_discounted_scan(deltas, tau * discounts) + value_preds[:-1]
+
+
 @baseline_registry.register_storage
 class RolloutStorage(Storage):
     r"""Class for storing rollout information for RL trainers."""
@@ -84,6 +127,11 @@ class RolloutStorage(Storage):
         self.buffers["masks"] = torch.zeros(
             numsteps + 1, num_envs, 1, dtype=torch.bool
         )
+        # Steps left out of the advantages and the loss, see
+        # `mask_interrupted_episodes`.
+        self.buffers["loss_mask"] = torch.ones(
+            numsteps + 1, num_envs, 1, dtype=torch.bool
+        )
 
         self.is_double_buffered = is_double_buffered
         self._nbuffers = 2 if is_double_buffered else 1
@@ -93,6 +141,9 @@ class RolloutStorage(Storage):
 
         self.num_steps = numsteps
         self.current_rollout_step_idxs = [0 for _ in range(self._nbuffers)]
+        # Per environment rollout step, the `*_at` methods use it as
+        # environments can be at different steps of the rollout.
+        self.env_rollout_step_idxs = torch.zeros(num_envs, dtype=torch.long)
 
         # The default device to torch is the CPU, so everything is on the CPU.
         self.device = torch.device("cpu")
@@ -142,10 +193,7 @@ class RolloutStorage(Storage):
         next_step = {k: v for k, v in next_step.items() if v is not None}
         current_step = {k: v for k, v in current_step.items() if v is not None}
 
-        env_slice = slice(
-            int(buffer_index * self._num_envs / self._nbuffers),
-            int((buffer_index + 1) * self._num_envs / self._nbuffers),
-        )
+        env_slice = self._get_env_slice(buffer_index)
 
         if len(next_step) > 0:
             self.buffers.set(
@@ -161,48 +209,122 @@ class RolloutStorage(Storage):
                 strict=False,
             )
 
+    @g_timer.avg_time("rollout_storage.insert_at", level=1)
+    def insert_at(
+        self,
+        env_idxs: torch.Tensor,
+        next_observations=None,
+        next_recurrent_hidden_states=None,
+        actions=None,
+        action_log_probs=None,
+        value_preds=None,
+        rewards=None,
+        next_masks=None,
+        **kwargs,
+    ):
+        assert not self.is_double_buffered
+
+        next_step = dict(
+            observations=next_observations,
+            recurrent_hidden_states=next_recurrent_hidden_states,
+            prev_actions=actions,
+            masks=next_masks,
+        )
+
+        current_step = dict(
+            actions=actions,
+            action_log_probs=action_log_probs,
+            value_preds=value_preds,
+            rewards=rewards,
+        )
+
+        next_step = {k: v for k, v in next_step.items() if v is not None}
+        current_step = {k: v for k, v in current_step.items() if v is not None}
+
+        env_idxs = env_idxs.to(self.device)
+        step_idxs = self.env_rollout_step_idxs.to(self.device)[env_idxs]
+
+        if len(next_step) > 0:
+            self.buffers.set(
+                (step_idxs + 1, env_idxs), next_step, strict=False
+            )
+
+        if len(current_step) > 0:
+            self.buffers.set((step_idxs, env_idxs), current_step, strict=False)
+
+    def _get_env_slice(self, buffer_index: int) -> slice:
+        return slice(
+            int(buffer_index * self._num_envs / self._nbuffers),
+            int((buffer_index + 1) * self._num_envs / self._nbuffers),
+        )
+
     def advance_rollout(self, buffer_index: int = 0):
         self.current_rollout_step_idxs[buffer_index] += 1
+        self.env_rollout_step_idxs[self._get_env_slice(buffer_index)] += 1
+
+    def advance_rollout_at(self, env_idxs: torch.Tensor):
+        self.env_rollout_step_idxs[env_idxs.cpu()] += 1
+        # The rollout is only as far along as its slowest environment.
+        self.current_rollout_step_idxs = [
+            int(self.env_rollout_step_idxs.min())
+        ]
+
+    def mask_interrupted_episodes(self, env_idxs: torch.Tensor) -> None:
+        r"""Leaves the steps of the current episode of the environments in
+        env_idxs, up to their current rollout step, out of the advantages and
+        the loss. The returns of these steps are wrong as the episode was cut
+        short.
+        """
+        assert isinstance(self.buffers["masks"], torch.Tensor)
+        assert isinstance(self.buffers["loss_mask"], torch.Tensor)
+        step_idxs = self._get_env_step_idxs(env_idxs)
+        for env_idx, step_idx in zip(env_idxs.tolist(), step_idxs.tolist()):
+            # The episode starts at the last step whose mask is not set.
+            episode_starts = torch.nonzero(
+                torch.logical_not(
+                    self.buffers["masks"][1 : step_idx + 1, env_idx].view(-1)
+                )
+            )
+            start = int(episode_starts[-1]) + 1 if len(episode_starts) else 0
+            self.buffers["loss_mask"][start : step_idx + 1, env_idx] = False
+
+    def _get_env_step_idxs(self, env_idxs: torch.Tensor) -> torch.Tensor:
+        return self.env_rollout_step_idxs[env_idxs.cpu()]
 
     def after_update(self):
         self.buffers[0] = self.buffers[self.current_rollout_step_idx]
+        assert isinstance(self.buffers["loss_mask"], torch.Tensor)
+        self.buffers["loss_mask"].fill_(True)
 
         self.current_rollout_step_idxs = [
             0 for _ in self.current_rollout_step_idxs
         ]
+        self.env_rollout_step_idxs.zero_()
 
     @g_timer.avg_time("rollout_storage.compute_returns", level=1)
     def compute_returns(self, next_value, use_gae, gamma, tau):
+        num_steps = self.current_rollout_step_idx
+        assert isinstance(self.buffers["rewards"], torch.Tensor)
+        assert isinstance(self.buffers["masks"], torch.Tensor)
+        rewards = self.buffers["rewards"][:num_steps]
+        masks = self.buffers["masks"][: num_steps + 1]
         if use_gae:
             assert isinstance(self.buffers["value_preds"], torch.Tensor)
-            self.buffers["value_preds"][
-                self.current_rollout_step_idx
-            ] = next_value
-            gae = 0.0
-            for step in reversed(range(self.current_rollout_step_idx)):
-                delta = (
-                    self.buffers["rewards"][step]
-                    + gamma
-                    * self.buffers["value_preds"][step + 1]
-                    * self.buffers["masks"][step + 1]
-                    - self.buffers["value_preds"][step]
-                )
-                gae = (
-                    delta + gamma * tau * gae * self.buffers["masks"][step + 1]
-                )
-                self.buffers["returns"][step] = (  # type: ignore
-                    gae + self.buffers["value_preds"][step]  # type: ignore
-                )
+            self.buffers["value_preds"][num_steps] = next_value
+            self.buffers["returns"][:num_steps] = compute_gae_returns(
+                rewards,
+                self.buffers["value_preds"][: num_steps + 1],
+                masks,
+                gamma,
+                tau,
+            )
 
         else:
-            self.buffers["returns"][self.current_rollout_step_idx] = next_value
-            for step in reversed(range(self.current_rollout_step_idx)):
-                self.buffers["returns"][step] = (
-                    gamma
-                    * self.buffers["returns"][step + 1]
-                    * self.buffers["masks"][step + 1]
-                    + self.buffers["rewards"][step]
-                )
+            # The bootstrap value is the last term of the discounted sum.
+            self.buffers["returns"][: num_steps + 1] = reverse_discounted_scan(
+                torch.cat([rewards, next_value.unsqueeze(0)]),
+                torch.cat([gamma * masks[1:], torch.zeros_like(rewards[:1])]),
+            )
 
     def data_generator(
         self,
@@ -271,5 +393,12 @@ class RolloutStorage(Storage):
             env_slice,
         ]
 
+    def get_current_step_at(self, env_idxs: torch.Tensor):
+        env_idxs = env_idxs.to(self.device)
+        return self.buffers[
+            self.env_rollout_step_idxs.to(self.device)[env_idxs],
+            env_idxs,
+        ]
+
     def get_last_step(self):
         return self.buffers[self.current_rollout_step_idx]
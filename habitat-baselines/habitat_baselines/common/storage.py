@@ -50,3 +50,42 @@ class Storage(abc.ABC):
 
     def get_current_step(self, env_slice, buffer_index):
         pass
+
+    def mask_interrupted_episodes(self, env_idxs: torch.Tensor) -> None:
+        """
+        Leaves the steps of the current episode of the environments in
+        `env_idxs` out of the loss, called when their episode was cut short.
+        Storages that do not override it keep these steps.
+        """
+
+    def insert_at(
+        self,
+        env_idxs: torch.Tensor,
+        next_observations=None,
+        next_recurrent_hidden_states=None,
+        actions=None,
+        action_log_probs=None,
+        value_preds=None,
+        rewards=None,
+        next_masks=None,
+        **kwargs,
+    ) -> None:
+        """
+        Like `insert`, but only for the environments in `env_idxs`, each
+        written at its own rollout step. Only used by the first-ready
+        sampler, storages that do not support it need not override it.
+        """
+        self._raise_first_ready_not_supported()
+
+    def advance_rollout_at(self, env_idxs: torch.Tensor) -> None:
+        self._raise_first_ready_not_supported()
+
+    def get_current_step_at(self, env_idxs: torch.Tensor):
+        self._raise_first_ready_not_supported()
+
+    def _raise_first_ready_not_supported(self):
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support the first-ready "
+            "sampler, set habitat_baselines.rl.ppo.use_first_ready_sampler "
+            "to False"
+        )
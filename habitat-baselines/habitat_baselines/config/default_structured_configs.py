@@ -130,6 +130,25 @@ cs.store(
 )
 
 
+@dataclass
+class ResizeShortestEdgeCenterCropperConfig(ObsTransformConfig):
+    """A ResizeShortestEdge followed by a CenterCropper, done in one pass
+    when possible. A ResizeShortestEdge entry directly followed by a
+    CenterCropper entry is already fused this way.
+    """
+
+    type: str = "ResizeShortestEdgeCenterCropper"
+    resize_shortest_edge: ResizeShortestEdgeConfig = ResizeShortestEdgeConfig()
+    center_cropper: CenterCropperConfig = CenterCropperConfig()
+
+
+cs.store(
+    group="habitat_baselines/rl/policy/obs_transforms",
+    name="resize_shortest_edge_center_cropper_base",
+    node=ResizeShortestEdgeCenterCropperConfig,
+)
+
+
 @dataclass
 class Cube2EqConfig(ObsTransformConfig):
     type: str = "CubeMap2Equirect"
@@ -311,6 +330,16 @@ class PPOConfig(HabitatBaselinesBaseConfig):
     # policy inference time during rollout generation
     # Not that this does not change the memory requirements
     use_double_buffered_sampler: bool = False
+    # Run policy inference on whichever environments have finished
+    # stepping instead of waiting for all of them, typically helps
+    # when environment step times vary a lot. Every environment still
+    # collects num_steps steps per rollout and DD-PPO does not preempt
+    # stragglers. Not compatible with the double buffered sampler,
+    # the batch renderer or hierarchical policies.
+    use_first_ready_sampler: bool = False
+    # Minimum number of environments to wait for before running
+    # inference with the first-ready sampler
+    first_ready_min_envs: int = 1
 
 
 @dataclass
@@ -416,6 +445,32 @@ class VectorEnvFactoryConfig(HabitatBaselinesBaseConfig):
     _target_: str = "habitat_baselines.common.HabitatVectorEnvFactory"
 
 
+@dataclass
+class VectorEnvConfig(HabitatBaselinesBaseConfig):
+    """
+    Options of the `habitat.VectorEnv` created by the
+    `HabitatVectorEnvFactory`.
+    """
+
+    # If True, the environment workers write their observations into
+    # shared memory buffers and only the reward, done and info go through
+    # the pipe. The trainer then reads the batch of observations without
+    # copying it. Requires every observation space to be a Box.
+    shared_memory_observations: bool = False
+    # Number of environments hosted by each worker process. The commands sent
+    # to the environments of a worker are batched into a single message.
+    # With double buffered sampling, this should divide num_environments / 2.
+    envs_per_worker: int = 1
+    # If True, a worker that dies or hangs is replaced by a new one instead
+    # of stopping the training. The interrupted step of its environments is
+    # treated as the end of the episode and left out of the episode stats.
+    respawn_workers: bool = False
+    # Time in seconds to wait for the reply of a worker before it is
+    # considered hung. It must cover the slowest step or reset. -1 to wait
+    # forever.
+    worker_timeout: float = -1.0
+
+
 @dataclass
 class EvaluatorConfig(HabitatBaselinesBaseConfig):
     """
@@ -470,6 +525,7 @@ class HabitatBaselinesConfig(HabitatBaselinesBaseConfig):
     verbose: bool = True
     # Creates the vectorized environment.
     vector_env_factory: VectorEnvFactoryConfig = VectorEnvFactoryConfig()
+    vector_env: VectorEnvConfig = VectorEnvConfig()
     evaluator: EvaluatorConfig = EvaluatorConfig()
     eval_keys_to_include_in_name: List[str] = field(default_factory=list)
     # For our use case, the CPU side things are mainly memory copies
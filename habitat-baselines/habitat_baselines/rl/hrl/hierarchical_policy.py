@@ -3,7 +3,6 @@
 # LICENSE file in the root directory of this source tree.
 
 import os.path as osp
-from collections import defaultdict
 from typing import Any, Dict, List, Optional, Tuple
 
 import gym.spaces as spaces
@@ -105,16 +104,25 @@ class HierarchicalPolicy(nn.Module, Policy):
             aux_loss_config=aux_loss_config,
             agent_name=agent_name,
         )
-        first_idx: Optional[int] = None
+        first_idxs: Dict[Optional[int], int] = {}
 
-        # Remap all the Noop skills to the same underlying skill so all the
-        # calls to these are batched together.
+        # Remap all the skills that share the same skill controller, and all
+        # the Noop skills, to the same underlying skill so all the calls to
+        # these are batched together.
         for skill_i, skill in self._skills.items():
-            if isinstance(skill, NoopSkillPolicy):
-                if first_idx is None:
-                    first_idx = skill_i
-                else:
-                    self._skill_redirects[skill_i] = first_idx
+            key = None if isinstance(skill, NoopSkillPolicy) else id(skill)
+            if key not in first_idxs:
+                first_idxs[key] = skill_i
+            else:
+                self._skill_redirects[skill_i] = first_idxs[key]
+        # Maps (skill idx -> redirected skill idx) for all the skills at once.
+        self._skill_redirect_ids = np.array(
+            [
+                self._skill_redirects.get(skill_i, skill_i)
+                for skill_i in range(len(self._skills))
+            ],
+            dtype=np.int64,
+        )
 
         self._recurrent_hidden_size = (
             full_config.habitat_baselines.rl.ppo.hidden_size
@@ -251,29 +259,49 @@ class HierarchicalPolicy(nn.Module, Policy):
         observations per skill.
 
         If an entry in `sel_dat` is `None`, then it is including in all groups.
+        Skills redirected to the same skill (see `self._skill_redirects`) are
+        in the same group, and a group covering the whole batch gets the data
+        of `sel_dat` without slicing.
         """
 
-        skill_to_batch: Dict[int, List[int]] = defaultdict(list)
-        if should_adds is None:
-            should_adds = [True for _ in range(len(skill_ids))]
-        for i, (cur_skill, should_add) in enumerate(
-            zip(skill_ids, should_adds)
-        ):
-            if not should_add:
-                continue
+        # High-level policies may output the skill IDs as floats.
+        skill_ids = np.asarray(skill_ids).astype(np.int64)
+        skill_ids = np.where(
+            skill_ids >= 0,
+            self._skill_redirect_ids[np.maximum(skill_ids, 0)],
+            -1,
+        )
+        if should_adds is not None:
+            if isinstance(should_adds, torch.Tensor):
+                should_adds = should_adds.cpu().numpy()
+            skill_ids = np.where(
+                np.asarray(should_adds, dtype=bool), skill_ids, -1
+            )
 
-            if cur_skill in self._skill_redirects:
-                cur_skill = self._skill_redirects[cur_skill]
-            skill_to_batch[cur_skill].append(i)
+        batch_size = len(skill_ids)
         grouped_skills = {}
-        for k, v in skill_to_batch.items():
+        for k in np.unique(skill_ids):
+            if k < 0:
+                continue
+            k = int(k)
+            batch_idxs = np.nonzero(skill_ids == k)[0]
+            v = batch_idxs.tolist()
+            # Skip the slicing when the skill runs for the whole batch.
+            is_full_batch = len(v) == batch_size
             skill_dat = {}
             for dat_k, dat in sel_dat.items():
                 if dat_k == "observations":
                     # Reduce the slicing required by only extracting what the
                     # skills will actually need.
                     dat = dat.slice_keys(*self._skills[k].required_obs_keys)
-                skill_dat[dat_k] = dat[v]
+                if is_full_batch:
+                    skill_dat[dat_k] = dat
+                elif isinstance(dat, torch.Tensor):
+                    skill_dat[dat_k] = dat[
+                        torch.from_numpy(batch_idxs).to(dat.device)
+                    ]
+                else:
+                    skill_dat[dat_k] = dat[v]
             grouped_skills[k] = (v, skill_dat)
         return grouped_skills
 
@@ -341,11 +369,18 @@ class HierarchicalPolicy(nn.Module, Policy):
                 masks=batch_dat["masks"],
                 cur_batch_idx=batch_ids,
             )
-            actions[batch_ids] += action_data.actions
+            if len(batch_ids) == batch_size:
+                actions += action_data.actions
+            else:
+                actions[batch_ids] += action_data.actions
 
             if self._has_ll_hidden_state:
                 # Update the LL hidden state.
-                ll_rnn_hidden_states[batch_ids] = action_data.rnn_hidden_states
+                ll_rnn_hidden_states = _write_tensor_batched(
+                    ll_rnn_hidden_states,
+                    action_data.rnn_hidden_states,
+                    batch_ids,
+                )
 
         # Skills should not be responsible for terminating the overall episode.
         actions[:, self._stop_action_idx] = 0.0
@@ -594,7 +629,10 @@ class HierarchicalPolicy(nn.Module, Policy):
             bad_should_terminate = _write_tensor_batched(
                 bad_should_terminate, bad_should_terminate_batch, batch_ids
             )
-            actions[batch_ids] += new_actions
+            if len(batch_ids) == batch_size:
+                actions += new_actions
+            else:
+                actions[batch_ids] += new_actions
         return self._cur_call_high_level, bad_should_terminate, actions
 
     def get_value(self, observations, rnn_hidden_states, prev_actions, masks):
@@ -3,16 +3,21 @@
 # LICENSE file in the root directory of this source tree.
 
 import random
-from collections import deque
+from collections import OrderedDict, deque
 from dataclasses import dataclass
-from typing import List
+from typing import Callable, Dict, List, Tuple, Union
 
 import gym.spaces as spaces
+import numpy as np
 import torch
 
 from habitat.tasks.rearrange.multi_task.pddl_action import PddlAction
-from habitat.tasks.rearrange.multi_task.pddl_logical_expr import LogicalExpr
+from habitat.tasks.rearrange.multi_task.pddl_logical_expr import (
+    LogicalExpr,
+    LogicalExprType,
+)
 from habitat.tasks.rearrange.multi_task.pddl_predicate import Predicate
+from habitat.tasks.rearrange.multi_task.rearrange_pddl import PddlEntity
 from habitat_baselines.rl.hrl.hl.high_level_policy import HighLevelPolicy
 from habitat_baselines.rl.ppo.policy import PolicyActionData
 
@@ -24,18 +29,31 @@ class PlanNode:
     actions to the goal.
     """
 
-    cur_pred_state: List[Predicate]
+    # Bitmask of the true predicates, see `PlannerHighLevelPolicy`.
+    cur_pred_state: int
     parent: "PlanNode"
     depth: int
     action: PddlAction
 
 
+PredicateKey = Tuple[str, Tuple[PddlEntity, ...]]
+
+
+def _get_pred_key(pred: Predicate) -> PredicateKey:
+    return (pred.name, tuple(pred.arg_values or ()))
+
+
 class PlannerHighLevelPolicy(HighLevelPolicy):
     """
     High-level policy that will plan a sequence of objects to rearrange
     actions. The `plan_idx` config parameter controls what sort of plan the
     agent will execute. The agent can either rearrange 1 of the objects, or
     both of the objects.
+
+    The planner represents the set of true predicates as an integer bitmask,
+    with one bit per predicate. The action preconditions, effects and goals
+    are compiled once to operate on the bitmasks. The plans are cached by
+    start state and goal, and shared by all the environments and episodes.
     """
 
     def __init__(self, *args, **kwargs):
@@ -48,6 +66,32 @@ class PlannerHighLevelPolicy(HighLevelPolicy):
         self._max_search_depth = self._config.max_search_depth
         self._reactive_planner = self._config.is_reactive
 
+        # The bits of the predicates, the predicates of `_predicates_list`
+        # come first, followed by the other action post conditions.
+        self._pred_bits: Dict[PredicateKey, int] = {}
+        self._bit_preds: List[Predicate] = []
+        for pred in self._predicates_list:
+            self._get_pred_bit(pred)
+        for action in self._all_actions:
+            for pred in action.post_cond:
+                self._get_pred_bit(pred)
+        self._action_preconds = [
+            self._compile_expr(action.precond) for action in self._all_actions
+        ]
+        self._action_effects = [
+            self._compile_effects(action) for action in self._all_actions
+        ]
+        self._compiled_goals: Dict[
+            int, Tuple[LogicalExpr, Callable[[int], bool]]
+        ] = {}
+        # Cached plans are reused as is, without drawing a new random
+        # tie-break between the equally short plans.
+        self._use_plan_cache = self._config.get("use_plan_cache", False)
+        self._plan_cache_size = self._config.get("plan_cache_size", 1024)
+        self._plan_cache: "OrderedDict[Tuple[int, int], List[PddlAction]]" = (
+            OrderedDict()
+        )
+
         self._next_sol_idxs = torch.zeros(self._num_envs, dtype=torch.int32)
         self._plans: List[List[PddlAction]] = [
             [] for _ in range(self._num_envs)
@@ -114,6 +158,124 @@ class PlannerHighLevelPolicy(HighLevelPolicy):
             rnn_hidden_states.device
         )
 
+    def _get_pred_bit(self, pred: Predicate) -> int:
+        key = _get_pred_key(pred)
+        if key not in self._pred_bits:
+            self._pred_bits[key] = len(self._bit_preds)
+            self._bit_preds.append(pred)
+        return self._pred_bits[key]
+
+    def _get_preds_mask(self, pred_filter: Callable[[Predicate], bool]) -> int:
+        mask = 0
+        for bit, pred in enumerate(self._bit_preds):
+            if pred_filter(pred):
+                mask |= 1 << bit
+        return mask
+
+    def _compile_expr(
+        self, expr: Union[LogicalExpr, Predicate]
+    ) -> Callable[[int], bool]:
+        """
+        Compiles the expression to a function of the bitmask of the true
+        predicates. Same as `LogicalExpr.is_true_from_predicates`.
+        """
+        if isinstance(expr, Predicate):
+            pred_mask = 1 << self._get_pred_bit(expr)
+            return lambda state: state & pred_mask != 0
+
+        # The predicates of the expression are checked with a single mask.
+        pred_mask = 0
+        sub_fns = []
+        for sub_expr in expr.sub_exprs:
+            if isinstance(sub_expr, Predicate):
+                pred_mask |= 1 << self._get_pred_bit(sub_expr)
+            else:
+                sub_fns.append(self._compile_expr(sub_expr))
+
+        if expr.expr_type in (LogicalExprType.AND, LogicalExprType.NAND):
+
+            def is_true(state: int) -> bool:
+                return state & pred_mask == pred_mask and all(
+                    sub_fn(state) for sub_fn in sub_fns
+                )
+
+        elif expr.expr_type in (LogicalExprType.OR, LogicalExprType.NOR):
+
+            def is_true(state: int) -> bool:
+                return state & pred_mask != 0 or any(
+                    sub_fn(state) for sub_fn in sub_fns
+                )
+
+        else:
+            raise ValueError(f"Got unexpected expr_type: {expr.expr_type}")
+
+        if expr.expr_type in (LogicalExprType.NAND, LogicalExprType.NOR):
+            return lambda state: not is_true(state)
+        return is_true
+
+    def _compile_effects(self, action: PddlAction) -> Tuple[int, int]:
+        """
+        Returns the bits cleared and the bits set by the action, its effect
+        on a state is `(state & ~cleared) | added`.
+        """
+        cleared, added = 0, 0
+
+        def remove(mask: int) -> None:
+            nonlocal cleared, added
+            cleared |= mask
+            added &= ~mask
+
+        if "nav" in action.name:
+            # Remove the at precondition, since we are walking somewhere else
+            robot_to_nav = action.param_values[-1]
+            remove(
+                self._get_preds_mask(
+                    lambda pred: pred.name == "robot_at"
+                    and pred.arg_values[-1] == robot_to_nav
+                )
+            )
+
+        for p in action.post_cond:
+            # Unfortunately holding and not_holding are negations. The
+            # PDDL system does not currently support negations, so we
+            # have to manually handle this case.
+            if p.name == "holding":
+                remove(
+                    self._get_preds_mask(
+                        lambda other_p: other_p.name == "not_holding"
+                        and other_p.arg_values[0] == p.arg_values[1]
+                    )
+                )
+            if p.name == "not_holding":
+                remove(
+                    self._get_preds_mask(
+                        lambda other_p: other_p.name == "holding"
+                        and p.arg_values[0] == other_p.arg_values[1]
+                    )
+                )
+            added |= 1 << self._get_pred_bit(p)
+        return cleared, added
+
+    def _get_compiled_goal(
+        self, pddl_goal: LogicalExpr
+    ) -> Callable[[int], bool]:
+        if id(pddl_goal) not in self._compiled_goals:
+            # Keep a reference to the goal so its id is not reused.
+            self._compiled_goals[id(pddl_goal)] = (
+                pddl_goal,
+                self._compile_expr(pddl_goal),
+            )
+        return self._compiled_goals[id(pddl_goal)][1]
+
+    def _get_pred_state(self, pred_vals) -> int:
+        """
+        Returns the bitmask of the predicates that are true in `pred_vals`.
+        """
+        if isinstance(pred_vals, torch.Tensor):
+            pred_vals = pred_vals.cpu().numpy()
+        bits = np.packbits(np.asarray(pred_vals) == 1.0, bitorder="little")
+        return int.from_bytes(bits.tobytes(), "little")
+
     def _get_solution_nodes(
         self, pred_vals, pddl_goal: LogicalExpr
     ) -> List[PlanNode]:
@@ -123,83 +285,39 @@ class PlannerHighLevelPolicy(HighLevelPolicy):
         get from the current state to the specified `pddl_goal`.
         """
         assert pddl_goal is not None, "Pddl goal must be set for planning."
+        is_goal = self._get_compiled_goal(pddl_goal)
 
         # The true predicates at the current state
-        start_true_preds = [
-            pred
-            for is_valid, pred in zip(pred_vals, self._predicates_list)
-            if (is_valid == 1.0)
-        ]
-
-        def _is_pred_at(pred, robot_type):
-            return (
-                pred.name == "robot_at" and pred._arg_values[-1] == robot_type
-            )
+        start_state = self._get_pred_state(pred_vals)
 
-        def _get_pred_hash(preds):
-            return ",".join(sorted([p.compact_str for p in preds]))
-
-        stack = deque([PlanNode(start_true_preds, None, 0, None)])
-        visited = {_get_pred_hash(start_true_preds)}
+        stack = deque([PlanNode(start_state, None, 0, None)])
+        visited = {start_state}
         sol_nodes = []
-        shuffled_actions = list(self._all_actions)
-        random.shuffle(shuffled_actions)
+        shuffled_action_idxs = list(range(self._n_actions))
+        random.shuffle(shuffled_action_idxs)
         while len(stack) != 0:
             cur_node = stack.popleft()
 
             if cur_node.depth > self._max_search_depth:
                 break
 
-            for action in shuffled_actions:
-                if not action.is_precond_satisfied_from_predicates(
-                    cur_node.cur_pred_state
-                ):
+            cur_state = cur_node.cur_pred_state
+            for action_idx in shuffled_action_idxs:
+                if not self._action_preconds[action_idx](cur_state):
                     continue
 
-                # Use set so we filter out duplicate predicates.
-                pred_set = list(cur_node.cur_pred_state)
-                if "nav" in action.name:
-                    # Remove the at precondition, since we are walking somewhere else
-                    robot_to_nav = action._param_values[-1]
-                    pred_set = [
-                        pred
-                        for pred in pred_set
-                        if not _is_pred_at(pred, robot_to_nav)
-                    ]
-
-                for p in action.post_cond:
-                    # Unfortunately holding and not_holding are negations. The
-                    # PDDL system does not currently support negations, so we
-                    # have to manually handle this case.
-                    if p.name == "holding":
-                        pred_set = [
-                            other_p
-                            for other_p in pred_set
-                            if not (
-                                other_p.name == "not_holding"
-                                and other_p._arg_values[0] == p._arg_values[1]
-                            )
-                        ]
-                    if p.name == "not_holding":
-                        pred_set = [
-                            other_p
-                            for other_p in pred_set
-                            if not (
-                                other_p.name == "holding"
-                                and p._arg_values[0] == other_p._arg_values[1]
-                            )
-                        ]
-                    if p not in pred_set:
-                        pred_set.append(p)
-
-                pred_hash = _get_pred_hash(pred_set)
-
-                if pred_hash not in visited:
-                    visited.add(pred_hash)
+                cleared, added = self._action_effects[action_idx]
+                pred_state = (cur_state & ~cleared) | added
+
+                if pred_state not in visited:
+                    visited.add(pred_state)
                     add_node = PlanNode(
-                        pred_set, cur_node, cur_node.depth + 1, action
+                        pred_state,
+                        cur_node,
+                        cur_node.depth + 1,
+                        self._all_actions[action_idx],
                     )
-                    if pddl_goal.is_true_from_predicates(pred_set):
+                    if is_goal(pred_state):
                         # Found a goal, we can stop searching.
                         sol_nodes.append(add_node)
                     else:
@@ -222,6 +340,11 @@ class PlannerHighLevelPolicy(HighLevelPolicy):
         :param pred_vals: Shape (num_prds,). NOT batched.
         """
         assert len(pred_vals) == len(self._predicates_list)
+        cache_key = (self._get_pred_state(pred_vals), id(pddl_goal))
+        if self._use_plan_cache and cache_key in self._plan_cache:
+            self._plan_cache.move_to_end(cache_key)
+            return self._plan_cache[cache_key]
+
         sol_nodes = self._get_solution_nodes(pred_vals, pddl_goal)
 
         # Extract the sequence of actions that lead to the goal.
@@ -234,6 +357,11 @@ class PlannerHighLevelPolicy(HighLevelPolicy):
         full_plans = sorted(all_ac_seqs, key=len)
         # Each full plan will be a permutation of the other full plans.
         plans = full_plans[0]
+
+        if self._use_plan_cache:
+            self._plan_cache[cache_key] = plans
+            if len(self._plan_cache) > self._plan_cache_size:
+                self._plan_cache.popitem(last=False)
         return plans
 
     def _replan(self, pred_vals, gen_plan_idx: int):
@@ -293,7 +421,8 @@ class PlannerHighLevelPolicy(HighLevelPolicy):
         log_info,
     ):
         batch_size = masks.shape[0]
-        all_pred_vals = observations["all_predicates"]
+        # Moved to the CPU once for all the environments.
+        all_pred_vals = observations["all_predicates"].cpu().numpy()
         next_skill = torch.zeros(batch_size)
         skill_args_data = [None for _ in range(batch_size)]
         immediate_end = torch.zeros(batch_size, dtype=torch.bool)
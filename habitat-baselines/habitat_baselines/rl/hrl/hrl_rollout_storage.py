@@ -9,7 +9,10 @@ from typing import Iterator, Optional
 import torch
 
 from habitat_baselines.common.baseline_registry import baseline_registry
-from habitat_baselines.common.rollout_storage import RolloutStorage
+from habitat_baselines.common.rollout_storage import (
+    RolloutStorage,
+    compute_gae_returns,
+)
 from habitat_baselines.common.tensor_dict import DictTree, TensorDict
 from habitat_baselines.rl.models.rnn_state_encoder import (
     build_pack_info_from_dones,
@@ -146,6 +149,7 @@ class HrlRolloutStorage(RolloutStorage):
         self.buffers[0] = self.buffers[self._cur_step_idxs, env_idxs]
         self.buffers["masks"][1:] = False
         self.buffers["rewards"][1:] = 0.0
+        self.buffers["loss_mask"].fill_(True)
 
         self._cur_step_idxs[:] = 0
 
@@ -153,20 +157,16 @@ class HrlRolloutStorage(RolloutStorage):
         if not use_gae:
             raise ValueError("Only GAE is supported with HRL trainer")
 
+        num_steps = int(self._cur_step_idxs.max())
         assert isinstance(self.buffers["value_preds"], torch.Tensor)
-        gae = 0.0
-        for step in reversed(range(self._cur_step_idxs.max())):
-            delta = (
-                self.buffers["rewards"][step]
-                + gamma
-                * self.buffers["value_preds"][step + 1]
-                * self.buffers["masks"][step + 1]
-                - self.buffers["value_preds"][step]
-            )
-            gae = delta + gamma * tau * gae * self.buffers["masks"][step + 1]
-            self.buffers["returns"][step] = (  # type: ignore
-                gae + self.buffers["value_preds"][step]  # type: ignore
-            )
+        assert isinstance(self.buffers["masks"], torch.Tensor)
+        self.buffers["returns"][:num_steps] = compute_gae_returns(
+            self.buffers["rewards"][:num_steps],
+            self.buffers["value_preds"][: num_steps + 1],
+            self.buffers["masks"][: num_steps + 1],
+            gamma,
+            tau,
+        )
 
     def data_generator(self, advantages, num_batches) -> Iterator[DictTree]:
         """
@@ -199,6 +199,9 @@ class HrlRolloutStorage(RolloutStorage):
                 batch["loss_mask"][:, i] = batch["loss_mask"][:, i] < (
                     self._cur_step_idxs[env_i] - 1
                 )
+            batch["loss_mask"] &= self.buffers["loss_mask"][
+                0 : self.num_steps, inds
+            ]
 
             batch.map_in_place(lambda v: v.flatten(0, 1))
             batch["rnn_build_seq_info"] = build_rnn_build_seq_info(
@@ -231,6 +234,9 @@ class HrlRolloutStorage(RolloutStorage):
     def get_current_step(self, env_slice, buffer_index):
         return TensorDict(self._current_step)
 
+    def _get_env_step_idxs(self, env_idxs):
+        return self._cur_step_idxs[env_idxs.cpu()]
+
     def insert_first_observations(self, batch):
         super().insert_first_observations(batch)
         self._current_step = self.buffers[0]
@@ -415,6 +415,37 @@ class MultiStorage(Storage):
         buffer_index=0,
         next_masks=None,
         **kwargs,
+    ):
+        self._insert_per_agent(
+            lambda storage, **agent_kwargs: storage.insert(
+                buffer_index=buffer_index, **agent_kwargs
+            ),
+            next_observations,
+            rewards,
+            next_masks,
+            kwargs,
+        )
+
+    def insert_at(
+        self,
+        env_idxs,
+        next_observations=None,
+        rewards=None,
+        next_masks=None,
+        **kwargs,
+    ):
+        self._insert_per_agent(
+            lambda storage, **agent_kwargs: storage.insert_at(
+                env_idxs, **agent_kwargs
+            ),
+            next_observations,
+            rewards,
+            next_masks,
+            kwargs,
+        )
+
+    def _insert_per_agent(
+        self, insert_fn, next_observations, rewards, next_masks, kwargs
     ):
         n_agents = len(self._active_storages)
 
@@ -459,10 +490,10 @@ class MultiStorage(Storage):
                 )
             else:
                 agent_next_observations = None
-            storage.insert(
+            insert_fn(
+                storage,
                 next_observations=agent_next_observations,
                 rewards=rewards,
-                buffer_index=buffer_index,
                 next_masks=next_masks,
                 **{
                     k: v[agent_i] if v is not None else v
@@ -484,6 +515,14 @@ class MultiStorage(Storage):
         for storage in self._active_storages:
             storage.advance_rollout(buffer_index)
 
+    def advance_rollout_at(self, env_idxs):
+        for storage in self._active_storages:
+            storage.advance_rollout_at(env_idxs)
+
+    def mask_interrupted_episodes(self, env_idxs):
+        for storage in self._active_storages:
+            storage.mask_interrupted_episodes(env_idxs)
+
     def compute_returns(self, next_value, use_gae, gamma, tau):
         for storage in self._active_storages:
             storage.compute_returns(next_value, use_gae, gamma, tau)
@@ -531,6 +570,11 @@ class MultiStorage(Storage):
             lambda storage: storage.get_current_step(env_slice, buffer_index)
         )
 
+    def get_current_step_at(self, env_idxs):
+        return self._merge_step_outputs(
+            lambda storage: storage.get_current_step_at(env_idxs)
+        )
+
     def get_last_step(self):
         return self._merge_step_outputs(
             lambda storage: storage.get_last_step()
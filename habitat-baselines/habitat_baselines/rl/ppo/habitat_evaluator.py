@@ -1,6 +1,6 @@
 import os
 from collections import defaultdict
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 import numpy as np
 import torch
@@ -9,6 +9,7 @@ import tqdm
 from habitat import logger
 from habitat.tasks.rearrange.rearrange_sensors import GfxReplayMeasure
 from habitat.tasks.rearrange.utils import write_gfx_replay
+from habitat.utils.visualizations import maps
 from habitat.utils.visualizations.utils import (
     observations_to_image,
     overlay_frame,
@@ -96,6 +97,11 @@ class HabitatEvaluator(Evaluator):
             ]
         else:
             rgb_frames = None
+        # Full top down map of every environment, to which the deltas of the
+        # TopDownMap measure apply
+        top_down_maps: List[Optional[Dict[str, Any]]] = [
+            None
+        ] * config.habitat_baselines.num_environments
 
         if len(config.habitat_baselines.eval.video_option) > 0:
             os.makedirs(config.habitat_baselines.video_dir, exist_ok=True)
@@ -216,6 +222,12 @@ class HabitatEvaluator(Evaluator):
                 ):
                     envs_to_pause.append(i)
 
+                if "top_down_map" in infos[i]:
+                    infos[i]["top_down_map"] = maps.apply_top_down_map_delta(
+                        infos[i]["top_down_map"], top_down_maps[i]
+                    )
+                    top_down_maps[i] = infos[i]["top_down_map"]
+
                 # Exclude the keys from `_rank0_keys` from displaying in the video
                 disp_info = {
                     k: v for k, v in infos[i].items() if k not in rank0_keys
@@ -283,6 +295,11 @@ class HabitatEvaluator(Evaluator):
                         )
 
             not_done_masks = not_done_masks.to(device=device)
+            top_down_maps = [
+                top_down_map
+                for i, top_down_map in enumerate(top_down_maps)
+                if i not in envs_to_pause
+            ]
             (
                 envs,
                 test_recurrent_hidden_states,
@@ -144,9 +144,11 @@ class PPO(nn.Module, Updater):
         if not self.use_normalized_advantage:
             return advantages
 
-        var, mean = self._compute_var_mean(
-            advantages[torch.isfinite(advantages)]
-        )
+        is_valid = torch.isfinite(advantages)
+        if "loss_mask" in rollouts.buffers:
+            # The steps left out of the loss are left out of the statistics.
+            is_valid &= rollouts.buffers["loss_mask"]
+        var, mean = self._compute_var_mean(advantages[is_valid])
 
         advantages -= mean
 
@@ -227,6 +229,10 @@ class PPO(nn.Module, Updater):
             assert isinstance(batch["is_coeffs"], torch.Tensor)
             ver_is_coeffs = batch["is_coeffs"].clamp(max=1.0)
             mean_fn = lambda t: torch.mean(ver_is_coeffs * t)
+        elif "loss_mask" in batch:
+            loss_mask = batch["loss_mask"]
+            n_samples = max(loss_mask.sum(), 1)
+            mean_fn = lambda t: (t * loss_mask).sum() / n_samples
         else:
             mean_fn = torch.mean
 
@@ -9,7 +9,18 @@ import os
 import random
 import time
 from collections import defaultdict, deque
-from typing import TYPE_CHECKING, Dict, List, Optional, Set
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
 
 import hydra
 import numpy as np
@@ -20,6 +31,7 @@ import habitat_baselines.rl.multi_agent  # noqa: F401.
 from habitat import VectorEnv, logger
 from habitat.config import read_write
 from habitat.config.default import get_agent_config
+from habitat.core.vector_env import RESPAWNED_INFO_KEY
 from habitat.utils import profiling_wrapper
 from habitat_baselines.common import VectorEnvFactory
 from habitat_baselines.common.base_trainer import BaseRLTrainer
@@ -30,6 +42,7 @@ from habitat_baselines.common.obs_transformers import (
     apply_obs_transforms_obs_space,
     get_active_obs_transforms,
 )
+from habitat_baselines.common.tensor_dict import TensorDict
 from habitat_baselines.common.tensorboard_utils import (
     TensorboardWriter,
     get_writer,
@@ -50,6 +63,7 @@ if TYPE_CHECKING:
     from omegaconf import DictConfig
 
 from habitat_baselines.rl.ddppo.policy import PointNavResNetNet
+from habitat_baselines.rl.hrl.hrl_rollout_storage import HrlRolloutStorage
 from habitat_baselines.rl.ppo.agent_access_mgr import AgentAccessMgr
 from habitat_baselines.rl.ppo.evaluator import Evaluator
 from habitat_baselines.rl.ppo.single_agent_access_mgr import (  # noqa: F401.
@@ -62,7 +76,7 @@ from habitat_baselines.utils.common import (
 )
 from habitat_baselines.utils.info_dict import (
     NON_SCALAR_METRICS,
-    extract_scalars_from_infos,
+    ScalarInfoExtractor,
 )
 from habitat_baselines.utils.timing import g_timer
 
@@ -89,6 +103,9 @@ class PPOTrainer(BaseRLTrainer):
         self._is_static_encoder = False
         self._encoder = None
         self._env_spec = None
+        # Number of environment workers respawned since the start of the
+        # training, summed over all the ranks
+        self.num_env_respawns = 0
 
         # Distributed if the world size would be
         # greater than 1
@@ -167,7 +184,10 @@ class PPOTrainer(BaseRLTrainer):
         # Information on measures that declared in `self._rank0_keys` or
         # to be only reported on rank0. This is seperately logged from
         # `self.window_episode_stats`.
-        self._single_proc_infos: Dict[str, List[float]] = {}
+        self._single_proc_infos: Dict[str, np.ndarray] = {}
+        self._info_extractor = ScalarInfoExtractor()
+        # Maps (metric name -> whether it is only reported on rank0).
+        self._is_rank0_metric: Dict[str, bool] = {}
 
     def _init_train(self, resume_state=None):
         if resume_state is None:
@@ -262,10 +282,27 @@ class PPOTrainer(BaseRLTrainer):
             not self.config.habitat_baselines.rl.ddppo.train_encoder
         )
         self._ppo_cfg = self.config.habitat_baselines.rl.ppo
+        if self._ppo_cfg.use_first_ready_sampler:
+            if self._agent.nbuffers != 1:
+                raise ValueError(
+                    "The first-ready sampler is not compatible with the double buffered sampler"
+                )
+            if self.config.habitat.simulator.renderer.enable_batch_renderer:
+                raise ValueError(
+                    "The first-ready sampler is not compatible with the batch renderer"
+                )
+            if issubclass(
+                baseline_registry.get_storage(
+                    self.config.habitat_baselines.rollout_storage_name
+                ),
+                HrlRolloutStorage,
+            ):
+                raise ValueError(
+                    "The first-ready sampler is not compatible with the HRL rollout storage"
+                )
 
         observations = self.envs.reset()
-        observations = self.envs.post_step(observations)
-        batch = batch_obs(observations, device=self.device)
+        batch = self._batch_observations(observations)
         batch = apply_obs_transforms_batch(batch, self.obs_transforms)  # type: ignore
 
         if self._is_static_encoder:
@@ -340,6 +377,25 @@ class PPOTrainer(BaseRLTrainer):
         """
         return torch.load(checkpoint_path, *args, **kwargs)
 
+    def _batch_observations(
+        self,
+        observations,
+        env_slice: Union[slice, Sequence[int]] = slice(None),
+    ) -> TensorDict:
+        r"""Batches the observations returned by the envs in env_slice.
+
+        With shared memory observations, the batch is a view of the
+        environments' shared buffers instead of being assembled from the
+        observations of each environment.
+        """
+        if self.envs.has_shared_observations:
+            return TensorDict.from_tree(
+                self.envs.shared_observations(env_slice)
+            ).map(lambda t: t.to(self.device, non_blocking=True))
+
+        observations = self.envs.post_step(observations)
+        return batch_obs(observations, device=self.device)
+
     def _compute_actions_and_step_envs(self, buffer_index: int = 0):
         num_envs = self.envs.num_envs
         env_slice = slice(
@@ -372,20 +428,10 @@ class PPOTrainer(BaseRLTrainer):
         profiling_wrapper.range_pop()  # compute actions
 
         with g_timer.avg_time("trainer.obs_insert"):
-            for index_env, act in zip(
+            self._step_envs(
                 range(env_slice.start, env_slice.stop),
-                action_data.env_actions.cpu().unbind(0),
-            ):
-                if is_continuous_action_space(self._env_spec.action_space):
-                    # Clipping actions to the specified limits
-                    act = np.clip(
-                        act.numpy(),
-                        self._env_spec.action_space.low,
-                        self._env_spec.action_space.high,
-                    )
-                else:
-                    act = act.item()
-                self.envs.async_step_at(index_env, act)
+                action_data.env_actions,
+            )
 
         with g_timer.avg_time("trainer.obs_insert"):
             self._agent.rollouts.insert(
@@ -398,6 +444,57 @@ class PPOTrainer(BaseRLTrainer):
                 action_data=action_data,
             )
 
+    def _compute_actions_and_step_envs_at(self, env_idxs: List[int]):
+        r"""Same as `_compute_actions_and_step_envs` but for an arbitrary
+        subset of the environments, each at its own rollout step.
+        """
+        env_idxs_t = torch.tensor(env_idxs, dtype=torch.long)
+
+        with g_timer.avg_time("trainer.sample_action"), inference_mode():
+            step_batch = self._agent.rollouts.get_current_step_at(env_idxs_t)
+
+            profiling_wrapper.range_push("compute actions")
+
+            step_batch_lens = {
+                k: v
+                for k, v in step_batch.items()
+                if k.startswith("index_len")
+            }
+            action_data = self._agent.actor_critic.act(
+                step_batch["observations"],
+                step_batch["recurrent_hidden_states"],
+                step_batch["prev_actions"],
+                step_batch["masks"],
+                **step_batch_lens,
+            )
+
+        profiling_wrapper.range_pop()  # compute actions
+
+        with g_timer.avg_time("trainer.obs_insert"):
+            self._step_envs(env_idxs, action_data.env_actions)
+
+        with g_timer.avg_time("trainer.obs_insert"):
+            self._agent.rollouts.insert_at(
+                env_idxs_t,
+                next_recurrent_hidden_states=action_data.rnn_hidden_states,
+                actions=action_data.actions,
+                action_log_probs=action_data.action_log_probs,
+                value_preds=action_data.values,
+            )
+
+    def _step_envs(self, env_idxs: Iterable[int], env_actions: torch.Tensor):
+        for index_env, act in zip(env_idxs, env_actions.cpu().unbind(0)):
+            if is_continuous_action_space(self._env_spec.action_space):
+                # Clipping actions to the specified limits
+                act = np.clip(
+                    act.numpy(),
+                    self._env_spec.action_space.low,
+                    self._env_spec.action_space.high,
+                )
+            else:
+                act = act.item()
+            self.envs.async_step_at(index_env, act)
+
     def _collect_environment_result(self, buffer_index: int = 0):
         num_envs = self.envs.num_envs
         env_slice = slice(
@@ -411,13 +508,58 @@ class PPOTrainer(BaseRLTrainer):
                 for index_env in range(env_slice.start, env_slice.stop)
             ]
 
-            observations, rewards_l, dones, infos = [
-                list(x) for x in zip(*outputs)
+        batch, rewards, not_done_masks = self._process_environment_outputs(
+            outputs, env_slice
+        )
+
+        self._agent.rollouts.insert(
+            next_observations=batch,
+            rewards=rewards,
+            next_masks=not_done_masks,
+            buffer_index=buffer_index,
+        )
+
+        self._agent.rollouts.advance_rollout(buffer_index)
+
+        return env_slice.stop - env_slice.start
+
+    def _collect_environment_result_at(self, env_idxs: List[int]):
+        r"""Same as `_collect_environment_result` but for an arbitrary
+        subset of the environments that have finished stepping.
+        """
+        with g_timer.avg_time("trainer.step_env"):
+            outputs = [
+                self.envs.wait_step_at(index_env) for index_env in env_idxs
             ]
 
+        batch, rewards, not_done_masks = self._process_environment_outputs(
+            outputs, env_idxs
+        )
+
+        env_idxs_t = torch.tensor(env_idxs, dtype=torch.long)
+        self._agent.rollouts.insert_at(
+            env_idxs_t,
+            next_observations=batch,
+            rewards=rewards,
+            next_masks=not_done_masks,
+        )
+
+        self._agent.rollouts.advance_rollout_at(env_idxs_t)
+
+        return len(env_idxs)
+
+    def _process_environment_outputs(
+        self, outputs, env_slice: Union[slice, List[int]]
+    ) -> Tuple[TensorDict, torch.Tensor, torch.Tensor]:
+        r"""Batches the step results of the envs in env_slice and updates
+        the episode statistics of those envs.
+        """
+        observations, rewards_l, dones, infos = [
+            list(x) for x in zip(*outputs)
+        ]
+
         with g_timer.avg_time("trainer.update_stats"):
-            observations = self.envs.post_step(observations)
-            batch = batch_obs(observations, device=self.device)
+            batch = self._batch_observations(observations, env_slice)
             batch = apply_obs_transforms_batch(batch, self.obs_transforms)  # type: ignore
 
             rewards = torch.tensor(
@@ -435,32 +577,25 @@ class PPOTrainer(BaseRLTrainer):
             done_masks = torch.logical_not(not_done_masks)
 
             self.current_episode_reward[env_slice] += rewards
-            current_ep_reward = self.current_episode_reward[env_slice]
-            self.running_episode_stats["reward"][env_slice] += current_ep_reward.where(done_masks, current_ep_reward.new_zeros(()))  # type: ignore
-            self.running_episode_stats["count"][env_slice] += done_masks.float()  # type: ignore
-
-            self._single_proc_infos = extract_scalars_from_infos(
-                infos,
-                ignore_keys=set(
-                    k for k in infos[0].keys() if k not in self._rank0_keys
-                ),
-            )
-            extracted_infos = extract_scalars_from_infos(
-                infos, ignore_keys=self._rank0_keys
-            )
-            for k, v_k in extracted_infos.items():
-                v = torch.tensor(
-                    v_k,
-                    dtype=torch.float,
-                    device=self.current_episode_reward.device,
-                ).unsqueeze(1)
-                if k not in self.running_episode_stats:
-                    self.running_episode_stats[k] = torch.zeros_like(
-                        self.running_episode_stats["count"]
-                    )
-                self.running_episode_stats[k][env_slice] += v.where(done_masks, v.new_zeros(()))  # type: ignore
+            (
+                stats_slice,
+                stats_done_masks,
+                stats_infos,
+            ) = self._exclude_respawned_envs(env_slice, done_masks, infos)
+            current_ep_reward = self.current_episode_reward[stats_slice]
+            self.running_episode_stats["reward"][stats_slice] += current_ep_reward.where(stats_done_masks, current_ep_reward.new_zeros(()))  # type: ignore
+            self.running_episode_stats["count"][stats_slice] += stats_done_masks.float()  # type: ignore
+
+            if len(stats_infos) > 0:
+                self._update_info_stats(
+                    stats_infos, stats_slice, stats_done_masks
+                )
 
-            self.current_episode_reward[env_slice].masked_fill_(
+            # Assign rather than fill in place so that this also works
+            # when env_slice is a list of indices.
+            self.current_episode_reward[
+                env_slice
+            ] = self.current_episode_reward[env_slice].masked_fill(
                 done_masks, 0.0
             )
 
@@ -470,16 +605,131 @@ class PPOTrainer(BaseRLTrainer):
                     PointNavResNetNet.PRETRAINED_VISUAL_FEATURES_KEY
                 ] = self._encoder(batch)
 
-        self._agent.rollouts.insert(
-            next_observations=batch,
-            rewards=rewards,
-            next_masks=not_done_masks,
-            buffer_index=buffer_index,
+        return batch, rewards, not_done_masks
+
+    def _update_info_stats(
+        self,
+        infos: List[Dict[str, Any]],
+        env_slice: Union[slice, List[int]],
+        done_masks: torch.Tensor,
+    ) -> None:
+        r"""Adds the scalar metrics of the infos of the done envs to
+        `running_episode_stats` and keeps the metrics of `_rank0_keys` in
+        `_single_proc_infos`.
+        """
+        names, values, found = self._info_extractor.extract(infos)
+        metric_paths = self._info_extractor.metric_paths
+        for name in names:
+            if name not in self._is_rank0_metric:
+                self._is_rank0_metric[name] = (
+                    metric_paths[name][0] in self._rank0_keys
+                )
+
+        self._single_proc_infos = {
+            name: values[found[:, i], i]
+            for i, name in enumerate(names)
+            if self._is_rank0_metric[name]
+        }
+
+        # All the metrics share the episode count of the env, so every done
+        # env must report every metric.
+        if not found.all():
+            done = done_masks.view(-1).cpu().numpy()
+            for i, name in enumerate(names):
+                if not self._is_rank0_metric[name] and not np.all(
+                    found[done, i]
+                ):
+                    raise RuntimeError(
+                        f"Metric '{name}' is not reported by all the envs "
+                        "whose episode ended. Every env must report the same "
+                        "measures."
+                    )
+
+        values_t = torch.from_numpy(values).to(
+            device=self.current_episode_reward.device
         )
+        values_t = values_t.where(done_masks, values_t.new_zeros(()))
+        for i, name in enumerate(names):
+            if self._is_rank0_metric[name]:
+                continue
+            if name not in self.running_episode_stats:
+                self.running_episode_stats[name] = torch.zeros_like(
+                    self.running_episode_stats["count"]
+                )
+            self.running_episode_stats[name][env_slice] += values_t[
+                :, i : i + 1
+            ]
 
-        self._agent.rollouts.advance_rollout(buffer_index)
+    def _exclude_respawned_envs(
+        self,
+        env_slice: Union[slice, List[int]],
+        done_masks: torch.Tensor,
+        infos: List[Dict[str, Any]],
+    ) -> Tuple[Union[slice, List[int]], torch.Tensor, List[Dict[str, Any]]]:
+        r"""Leaves out the envs whose step was interrupted by the respawn of
+        their worker. Their episode ends but must not count towards the
+        episode stats, and the steps of that episode are left out of the
+        loss.
+        """
+        completed = [RESPAWNED_INFO_KEY not in info for info in infos]
+        if all(completed):
+            return env_slice, done_masks, infos
 
-        return env_slice.stop - env_slice.start
+        if isinstance(env_slice, slice):
+            env_idxs = list(range(self.envs.num_envs))[env_slice]
+        else:
+            env_idxs = env_slice
+        self._agent.rollouts.mask_interrupted_episodes(
+            torch.tensor(
+                [i for i, c in zip(env_idxs, completed) if not c],
+                dtype=torch.long,
+            )
+        )
+        return (
+            [i for i, c in zip(env_idxs, completed) if c],
+            done_masks[torch.tensor(completed, device=done_masks.device)],
+            [info for info, c in zip(infos, completed) if c],
+        )
+
+    def _collect_first_ready_rollout(self) -> int:
+        r"""Collects a full rollout, running inference on whichever
+        environments are ready instead of waiting for all of them.
+
+        Every environment collects the same number of steps, so the rollout
+        has the same shape as with the default sampler. That is num_steps
+        unless the rollout ends early, see `should_end_early`.
+        """
+        num_steps = self._ppo_cfg.num_steps
+        min_envs = self._ppo_cfg.first_ready_min_envs
+        env_steps = [0 for _ in range(self.envs.num_envs)]
+        # Number of steps each environment was asked to take.
+        num_issued = [1 for _ in range(self.envs.num_envs)]
+        ended_early = False
+        count_steps_delta = 0
+
+        self._compute_actions_and_step_envs_at(list(range(self.envs.num_envs)))
+        num_stepping = self.envs.num_envs
+        while num_stepping > 0:
+            ready = self.envs.wait_any(min_ready=min(min_envs, num_stepping))
+            count_steps_delta += self._collect_environment_result_at(ready)
+            num_stepping -= len(ready)
+            for index_env in ready:
+                env_steps[index_env] += 1
+
+            if not ended_early and self.should_end_early(max(env_steps)):
+                # The environments that are behind catch up with the one
+                # that is the furthest along and the others stop.
+                ended_early = True
+                num_steps = max(num_issued)
+
+            to_step = [i for i in ready if env_steps[i] < num_steps]
+            if len(to_step) > 0:
+                self._compute_actions_and_step_envs_at(to_step)
+                for index_env in to_step:
+                    num_issued[index_env] += 1
+                num_stepping += len(to_step)
+
+        return count_steps_delta
 
     @profiling_wrapper.RangeContext("_collect_rollout_step")
     def _collect_rollout_step(self):
@@ -534,15 +784,18 @@ class PPOTrainer(BaseRLTrainer):
         for i, k in enumerate(stats_ordering):
             self.window_episode_stats[k].append(stats[i])
 
+        num_env_respawns = self.envs.num_respawns
         if self._is_distributed:
             loss_name_ordering = sorted(losses.keys())
             stats = torch.tensor(
-                [losses[k] for k in loss_name_ordering] + [count_steps_delta],
+                [losses[k] for k in loss_name_ordering]
+                + [count_steps_delta, num_env_respawns],
                 device="cpu",
                 dtype=torch.float32,
             )
             stats = self._all_reduce(stats)
-            count_steps_delta = int(stats[-1].item())
+            count_steps_delta = int(stats[-2].item())
+            num_env_respawns = int(stats[-1].item())
             stats /= torch.distributed.get_world_size()
 
             losses = {
@@ -553,6 +806,7 @@ class PPOTrainer(BaseRLTrainer):
             self.num_rollouts_done_store.set("num_done", "0")
 
         self.num_steps_done += count_steps_delta
+        self.num_env_respawns = num_env_respawns
 
         return losses
 
@@ -596,6 +850,9 @@ class PPOTrainer(BaseRLTrainer):
 
         # Log perf metrics.
         writer.add_scalar("perf/fps", fps, self.num_steps_done)
+        writer.add_scalar(
+            "perf/env_respawns", self.num_env_respawns, self.num_steps_done
+        )
 
         for timer_name, timer_val in g_timer.items():
             writer.add_scalar(
@@ -740,35 +997,45 @@ class PPOTrainer(BaseRLTrainer):
 
                 profiling_wrapper.range_push("_collect_rollout_step")
                 with g_timer.avg_time("trainer.rollout_collect"):
-                    for buffer_index in range(self._agent.nbuffers):
-                        self._compute_actions_and_step_envs(buffer_index)
-
-                    for step in range(self._ppo_cfg.num_steps):
-                        is_last_step = (
-                            self.should_end_early(step + 1)
-                            or (step + 1) == self._ppo_cfg.num_steps
+                    if self._ppo_cfg.use_first_ready_sampler:
+                        count_steps_delta += (
+                            self._collect_first_ready_rollout()
                         )
-
+                        profiling_wrapper.range_pop()  # _collect_rollout_step
+                    else:
                         for buffer_index in range(self._agent.nbuffers):
-                            count_steps_delta += (
-                                self._collect_environment_result(buffer_index)
+                            self._compute_actions_and_step_envs(buffer_index)
+
+                        for step in range(self._ppo_cfg.num_steps):
+                            is_last_step = (
+                                self.should_end_early(step + 1)
+                                or (step + 1) == self._ppo_cfg.num_steps
                             )
 
-                            if (buffer_index + 1) == self._agent.nbuffers:
-                                profiling_wrapper.range_pop()  # _collect_rollout_step
+                            for buffer_index in range(self._agent.nbuffers):
+                                count_steps_delta += (
+                                    self._collect_environment_result(
+                                        buffer_index
+                                    )
+                                )
 
-                            if not is_last_step:
                                 if (buffer_index + 1) == self._agent.nbuffers:
-                                    profiling_wrapper.range_push(
-                                        "_collect_rollout_step"
+                                    profiling_wrapper.range_pop()  # _collect_rollout_step
+
+                                if not is_last_step:
+                                    if (
+                                        buffer_index + 1
+                                    ) == self._agent.nbuffers:
+                                        profiling_wrapper.range_push(
+                                            "_collect_rollout_step"
+                                        )
+
+                                    self._compute_actions_and_step_envs(
+                                        buffer_index
                                     )
 
-                                self._compute_actions_and_step_envs(
-                                    buffer_index
-                                )
-
-                        if is_last_step:
-                            break
+                            if is_last_step:
+                                break
 
                 profiling_wrapper.range_pop()  # rollouts loop
 
@@ -9,7 +9,10 @@ from typing import Any, Dict, Iterator, List, Optional, Tuple
 import numpy as np
 import torch
 
-from habitat_baselines.common.rollout_storage import RolloutStorage
+from habitat_baselines.common.rollout_storage import (
+    RolloutStorage,
+    reverse_discounted_scan,
+)
 from habitat_baselines.common.tensor_dict import DictTree, TensorDict
 from habitat_baselines.rl.models.rnn_state_encoder import (
     _np_invert_permutation,
@@ -504,45 +507,47 @@ class VERRolloutStorage(RolloutStorage):
         returns = returns_t.view(-1, 1).numpy()
         returns[:] = returns[self.select_inds]
 
-        gae = np.zeros((self.num_seqs_at_step[0], 1))
-        last_values = gae.copy()
-        ptr = returns.size
-        for len_minus_1, n_seqs in reversed(
-            list(enumerate(self.num_seqs_at_step))
-        ):
-            curr_slice = slice(ptr - n_seqs, ptr)
-            q_est = rewards[curr_slice] + gamma * last_values[:n_seqs]
-            delta = q_est - values[curr_slice]
-            gae[:n_seqs] = delta + (tau * gamma) * gae[:n_seqs]
-
-            is_last_step = self.sequence_lengths == (len_minus_1 + 1)
-            is_last_step_for_env = (
-                is_last_step & self.last_sequence_in_batch_mask
-            )
-
-            # For the last step from each worker, we do an extra loop
-            # to fill last_values with the bootstrap.  So we re-zero
-            # the GAE value here
-            gae[is_last_step_for_env] = 0.0
-
-            # If the step isn't stale or we don't have a return
-            # calculate, use the newly calculated return value,
-            # otherwise keep the current one
-            use_new_value = is_not_stale[curr_slice] | np.logical_not(
-                np.isfinite(returns[curr_slice])
-            )
-            returns[curr_slice][use_new_value] = (
-                gae[:n_seqs] + values[curr_slice]
-            )[use_new_value]
-
-            # We also mark these with a nan
-            returns[curr_slice][is_last_step_for_env[:n_seqs]] = float("nan")
-
-            last_values[:n_seqs] = values[curr_slice]
-
-            ptr -= n_seqs
-
-        assert ptr == 0
+        # The steps are in PackedSequence order, i.e. the n-th step of
+        # every sequence, longest sequence first. Scatter them into a
+        # (max_sequence_length, num_sequences) grid padded with zeros so the
+        # returns of all the steps can be computed at once.
+        num_seqs = self.num_seqs_at_step[0]
+        seq_step_ids = np.arange(len(self.num_seqs_at_step))[:, np.newaxis]
+        is_valid = np.arange(num_seqs) < self.num_seqs_at_step[:, np.newaxis]
+
+        def _to_grid(packed: np.ndarray) -> np.ndarray:
+            grid = np.zeros(is_valid.shape, dtype=np.float64)
+            grid[is_valid] = packed[:, 0]
+            return grid
+
+        rewards_grid = _to_grid(rewards)
+        values_grid = _to_grid(values)
+        # The value after the last step of a sequence is zero: either the
+        # episode ended or, for the last sequence of an environment, the
+        # step only provides the bootstrap value for the previous one.
+        next_values_grid = np.zeros_like(values_grid)
+        next_values_grid[:-1] = values_grid[1:]
+
+        # The last step from each worker has no return of its own, so its
+        # GAE is zero.
+        is_last_step_for_env = (
+            self.sequence_lengths == seq_step_ids + 1
+        ) & self.last_sequence_in_batch_mask
+        deltas = rewards_grid + gamma * next_values_grid - values_grid
+        deltas[is_last_step_for_env] = 0.0
+        gae = reverse_discounted_scan(
+            torch.from_numpy(deltas),
+            torch.tensor(tau * gamma, dtype=torch.float64),
+        ).numpy()
+        new_returns = (gae + values_grid)[is_valid][:, np.newaxis]
+
+        # If the step isn't stale or we don't have a return calculate, use
+        # the newly calculated return value, otherwise keep the current one
+        use_new_value = is_not_stale | np.logical_not(np.isfinite(returns))
+        returns[use_new_value] = new_returns[use_new_value]
+
+        # We also mark the last steps from each worker with a nan
+        returns[is_last_step_for_env[is_valid]] = float("nan")
 
         returns[:] = returns[_np_invert_permutation(self.select_inds)]
 
@@ -190,12 +190,153 @@ def linear_decay(epoch: int, total_num_updates: int) -> float:
     return 1 - (epoch / float(total_num_updates))
 
 
+# Alignment in bytes of the sensors in the staging buffer of
+# _ObservationBatchingSchema, enough for any dtype.
+_STAGING_ALIGNMENT = 64
+
+
+@attr.s(auto_attribs=True, slots=True)
+class _ObservationBatchingSchema:
+    r"""Layout of a batch of flat observation dicts with the same sensors in
+    one staging buffer. Every sensor is stored contiguously for all the
+    observations, so that it is written with a single copy, and the whole
+    buffer is uploaded to the device at once.
+    """
+    keys: List[str]
+    shapes: List[Tuple[int, ...]]
+    dtypes: List[np.dtype]
+    torch_dtypes: List[torch.dtype]
+    # Number of observations the staging buffer has room for.
+    capacity: int
+    offsets: List[int]
+    obs_nbytes: List[int]
+    staging: torch.Tensor
+    staging_np: np.ndarray
+
+    @classmethod
+    def create(
+        cls,
+        observation: Dict[str, np.ndarray],
+        capacity: int,
+        pin_memory: bool,
+    ) -> "_ObservationBatchingSchema":
+        keys = list(observation.keys())
+        shapes = [observation[k].shape for k in keys]
+        dtypes = [observation[k].dtype for k in keys]
+        # Raises a TypeError if torch does not support the dtype.
+        torch_dtypes = [
+            torch.from_numpy(np.empty(0, dtype=dtype)).dtype
+            for dtype in dtypes
+        ]
+
+        offsets = []
+        obs_nbytes = []
+        total_nbytes = 0
+        for shape, dtype in zip(shapes, dtypes):
+            offsets.append(total_nbytes)
+            obs_nbytes.append(int(np.prod(shape)) * dtype.itemsize)
+            sensor_nbytes = capacity * obs_nbytes[-1]
+            total_nbytes += -(-sensor_nbytes // _STAGING_ALIGNMENT) * (
+                _STAGING_ALIGNMENT
+            )
+
+        staging = torch.empty(total_nbytes, dtype=torch.uint8)
+        if pin_memory:
+            staging = staging.pin_memory()
+        return cls(
+            keys,
+            shapes,
+            dtypes,
+            torch_dtypes,
+            capacity,
+            offsets,
+            obs_nbytes,
+            staging,
+            staging.numpy(),
+        )
+
+    def batch_obs(
+        self,
+        observations: List[Dict[str, np.ndarray]],
+        device: Optional[torch.device] = None,
+    ) -> TensorDict:
+        num_obs = len(observations)
+        tensors: List[torch.Tensor] = []
+        for k, offset, obs_nbytes, shape, dtype in zip(
+            self.keys, self.offsets, self.obs_nbytes, self.shapes, self.dtypes
+        ):
+            staging_view = (
+                self.staging_np[offset : offset + num_obs * obs_nbytes]
+                .view(dtype)
+                .reshape(num_obs, *shape)
+            )
+            np.stack([o[k] for o in observations], out=staging_view)
+            tensors.append(torch.from_numpy(staging_view))
+
+        if device is not None and device.type != "cpu":
+            # A single upload of all the sensors, then views of the sensors
+            # on the device.
+            staging = self.staging.to(device, non_blocking=True)
+            tensors = [
+                staging[offset : offset + num_obs * obs_nbytes]
+                .view(torch_dtype)
+                .view(num_obs, *shape)
+                for offset, obs_nbytes, shape, torch_dtype in zip(
+                    self.offsets,
+                    self.obs_nbytes,
+                    self.shapes,
+                    self.torch_dtypes,
+                )
+            ]
+
+        return TensorDict.from_flattened([(k,) for k in self.keys], tensors)
+
+
 @attr.s(auto_attribs=True, slots=True)
 class _ObservationBatchingCache(metaclass=Singleton):
     r"""Helper for batching observations that maintains a cpu-side tensor
     that is the right size and is pinned to cuda memory
     """
     _pool: Dict[Any, Union[torch.Tensor, np.ndarray]] = {}
+    # Maps the sensors of flat observation dicts and whether the memory is
+    # pinned to their batching schema, None if the observations can not be
+    # batched with a schema.
+    _schemas: Dict[Any, Optional[_ObservationBatchingSchema]] = {}
+
+    def _get_schema(
+        self,
+        observations: List[DictTree],
+        device: Optional[torch.device],
+    ) -> Optional[_ObservationBatchingSchema]:
+        first_obs = observations[0]
+        if not isinstance(first_obs, dict):
+            return None
+        sensors = []
+        for k, v in first_obs.items():
+            if not isinstance(v, np.ndarray):
+                return None
+            sensors.append((k, v.shape, v.dtype))
+        pin_memory = device is not None and device.type == "cuda"
+        key = (tuple(sensors), pin_memory)
+        schema = self._schemas.get(key)
+        if key not in self._schemas or (
+            schema is not None and schema.capacity < len(observations)
+        ):
+            try:
+                schema = _ObservationBatchingSchema.create(
+                    first_obs, len(observations), pin_memory
+                )
+            except TypeError:
+                schema = None
+            self._schemas[key] = schema
+        if schema is None:
+            return None
+
+        num_sensors = len(sensors)
+        for obs in observations:
+            if not isinstance(obs, dict) or len(obs) != num_sensors:
+                return None
+        return schema
 
     def get(
         self,
@@ -248,6 +389,17 @@ class _ObservationBatchingCache(metaclass=Singleton):
         observations: List[DictTree],
         device: Optional[torch.device] = None,
     ) -> TensorDict:
+        # Flat observation dicts of numpy arrays, as returned by the envs,
+        # are batched through a schema of their sensors.
+        schema = self._get_schema(observations, device)
+        if schema is not None:
+            try:
+                return schema.batch_obs(observations, device)  # type: ignore
+            except (KeyError, ValueError, TypeError):
+                # The other observations do not have the sensors of the first
+                # one, use the generic path.
+                pass
+
         observations = [
             TensorOrNDArrayDict.from_tree(o).map(
                 lambda t: t.numpy()
@@ -1,5 +1,5 @@
 from collections import defaultdict
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 import numpy as np
 
@@ -25,26 +25,67 @@ def extract_scalars_from_info(
     if ignore_keys is None:
         ignore_keys = set()
     ignore_keys.update(NON_SCALAR_METRICS)
-    result = {}
+    scalar_paths, _ = _get_scalar_paths(info, ignore_keys)
+    return {k: float(_get_path(info, p)) for k, p in scalar_paths.items()}
+
+
+def _get_scalar_paths(
+    info: Dict[str, Any], ignore_keys: Set[str]
+) -> Tuple[Dict[str, Tuple[str, ...]], List[Tuple[str, ...]]]:
+    """
+    Walks `info` like `extract_scalars_from_info`.
+
+    :returns: A tuple containing the following in order
+    - The path of keys to every scalar in `info` by flattened name.
+    - The paths of the entries that are not scalars but could become scalars
+      in another info with the same keys.
+    """
+    scalar_paths: Dict[str, Tuple[str, ...]] = {}
+    non_scalar_paths: List[Tuple[str, ...]] = []
     for k, v in info.items():
         if not isinstance(k, str) or k in ignore_keys:
             continue
 
         if isinstance(v, dict):
-            result.update(
+            sub_scalar_paths, sub_non_scalar_paths = _get_scalar_paths(
+                v, set(NON_SCALAR_METRICS)
+            )
+            scalar_paths.update(
                 {
-                    k + "." + subk: subv
-                    for subk, subv in extract_scalars_from_info(v).items()
-                    if isinstance(subk, str)
-                    and k + "." + subk not in ignore_keys
+                    k + "." + subk: (k, *subp)
+                    for subk, subp in sub_scalar_paths.items()
+                    if k + "." + subk not in ignore_keys
                 }
             )
+            non_scalar_paths.extend(
+                (k, *subp) for subp in sub_non_scalar_paths
+            )
         # Things that are scalar-like will have an np.size of 1.
         # Strings also have an np.size of 1, so explicitly ban those
-        elif np.size(v) == 1 and not isinstance(v, str):
-            result[k] = float(v)
+        elif isinstance(v, str):
+            continue
+        elif np.size(v) == 1:
+            scalar_paths[k] = (k,)
+        else:
+            non_scalar_paths.append((k,))
+
+    return scalar_paths, non_scalar_paths
+
+
+def _get_path(info: Dict[str, Any], path: Tuple[str, ...]) -> Any:
+    for k in path:
+        info = info[k]
+    return info
+
 
-    return result
+def _get_keys_layout(info: Dict[str, Any]) -> Tuple:
+    """
+    Hashable description of the keys of a nested info dictionary.
+    """
+    return tuple(
+        (k, _get_keys_layout(v) if isinstance(v, dict) else None)
+        for k, v in info.items()
+    )
 
 
 def extract_scalars_from_infos(
@@ -68,3 +109,108 @@ def extract_scalars_from_infos(
             results[k].append(v)
 
     return results
+
+
+class ScalarInfoExtractor:
+    r"""Extracts the same scalars as `extract_scalars_from_infos` as one
+    array. Walking the nested info dictionaries to find the scalars is only
+    done once per layout of info keys. Every other info with the same keys is
+    read through the cached key paths, so per-step infos with a fixed set of
+    measures are flattened without checking every value.
+
+    The columns of the returned arrays keep their index across calls in the
+    order the metrics are first seen, see `metric_names`.
+    """
+
+    def __init__(self, ignore_keys: Optional[Set[str]] = None):
+        """
+        :param ignore_keys: The info key names to exclude from the result.
+        """
+        self._ignore_keys = set(NON_SCALAR_METRICS)
+        if ignore_keys is not None:
+            self._ignore_keys.update(ignore_keys)
+        self._metric_names: List[str] = []
+        self._metric_paths: Dict[str, Tuple[str, ...]] = {}
+        self._metric_cols: Dict[str, int] = {}
+        # Maps (info keys layout -> (scalar key paths and their columns,
+        # non-scalar key paths)).
+        self._layouts: Dict[
+            Tuple,
+            Tuple[List[Tuple[Tuple[str, ...], int]], List[Tuple[str, ...]]],
+        ] = {}
+
+    @property
+    def metric_names(self) -> List[str]:
+        """
+        The names of all the metrics seen so far in the order of their column.
+        """
+        return self._metric_names
+
+    @property
+    def metric_paths(self) -> Dict[str, Tuple[str, ...]]:
+        """
+        The path of keys in the info dictionaries to every metric.
+        """
+        return self._metric_paths
+
+    def _add_layout(self, info: Dict[str, Any], layout: Tuple):
+        scalar_paths, non_scalar_paths = _get_scalar_paths(
+            info, self._ignore_keys
+        )
+        cols = []
+        for name, path in scalar_paths.items():
+            if name not in self._metric_cols:
+                self._metric_cols[name] = len(self._metric_names)
+                self._metric_names.append(name)
+                self._metric_paths[name] = path
+            cols.append((path, self._metric_cols[name]))
+        self._layouts[layout] = (cols, non_scalar_paths)
+
+    def _get_layout(self, info: Dict[str, Any]):
+        layout = _get_keys_layout(info)
+        if layout not in self._layouts:
+            self._add_layout(info, layout)
+        else:
+            # A value that was not a scalar when the layout was added could
+            # be one now.
+            _, non_scalar_paths = self._layouts[layout]
+            for path in non_scalar_paths:
+                v = _get_path(info, path)
+                if np.size(v) == 1 and not isinstance(v, str):
+                    self._add_layout(info, layout)
+                    break
+        return layout
+
+    def extract(
+        self, infos: List[Dict[str, Any]]
+    ) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """
+        :returns: A tuple containing the following in order
+        - The names of the metrics found in `infos`.
+        - A (len(infos), len(names)) array of the metric values, 0 where an
+          info does not have a metric.
+        - A (len(infos), len(names)) boolean array of whether an info has a
+          metric.
+        """
+        layouts = [self._get_layout(info) for info in infos]
+        values = np.zeros(
+            (len(infos), len(self._metric_names)), dtype=np.float32
+        )
+        found = np.zeros((len(infos), len(self._metric_names)), dtype=bool)
+        for i, (info, layout) in enumerate(zip(infos, layouts)):
+            cols, _ = self._layouts[layout]
+            row = values[i]
+            for path, col in cols:
+                v = info
+                for k in path:
+                    v = v[k]
+                row[col] = float(v)
+                found[i, col] = True
+        found_cols = np.nonzero(found.any(axis=0))[0]
+        if len(found_cols) == len(self._metric_names):
+            return list(self._metric_names), values, found
+        return (
+            [self._metric_names[i] for i in found_cols],
+            values[:, found_cols],
+            found[:, found_cols],
+        )
@@ -15,9 +15,15 @@ from habitat.articulated_agent_controllers.humanoid_rearrange_controller import
 from habitat.articulated_agent_controllers.humanoid_seq_pose_controller import (
     HumanoidSeqPoseController,
 )
+from habitat.articulated_agent_controllers.motion_library import (
+    MotionLibrary,
+    load_motion_library,
+)
 
 __all__ = [
     "HumanoidBaseController",
     "HumanoidRearrangeController",
     "HumanoidSeqPoseController",
+    "MotionLibrary",
+    "load_motion_library",
 ]
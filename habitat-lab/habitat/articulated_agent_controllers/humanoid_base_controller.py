@@ -4,6 +4,7 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
+from typing import Sequence
 
 import magnum as mn
 import numpy as np
@@ -23,6 +24,28 @@ class Pose:
         self.root_transform = root_transform
 
 
+class _MotionPoses(Sequence):
+    """
+    The poses of a Motion, built on access from its arrays so that the arrays
+    can stay shared between controllers.
+    """
+
+    def __init__(self, joints_quat_array, transform_array):
+        self._joints_quat_array = joints_quat_array
+        self._transform_array = transform_array
+
+    def __len__(self):
+        return self._joints_quat_array.shape[0]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return Pose(
+            self._joints_quat_array[index].reshape(-1),
+            mn.Matrix4(self._transform_array[index]),
+        )
+
+
 class Motion:
     """
     Contains a sequential motion, corresponding to a sequence of poses
@@ -36,15 +59,9 @@ class Motion:
     def __init__(self, joints_quat_array, transform_array, displacement, fps):
         num_poses = joints_quat_array.shape[0]
         self.num_poses = num_poses
-        poses = []
-        for index in range(num_poses):
-            pose = Pose(
-                joints_quat_array[index].reshape(-1),
-                mn.Matrix4(transform_array[index]),
-            )
-            poses.append(pose)
-
-        self.poses = poses
+        self.joints_quat_array = joints_quat_array
+        self.transform_array = transform_array
+        self.poses = _MotionPoses(joints_quat_array, transform_array)
         self.fps = fps
         self.displacement = displacement
 
@@ -4,9 +4,8 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
-import math
-import os
-import pickle as pkl
+import functools
+from typing import Dict, Tuple
 
 import magnum as mn
 import numpy as np
@@ -16,6 +15,9 @@ from habitat.articulated_agent_controllers import (
     Motion,
     Pose,
 )
+from habitat.articulated_agent_controllers.motion_library import (
+    load_motion_library,
+)
 
 MIN_ANGLE_TURN = 5  # If we turn less than this amount, we can just rotate the base and keep walking motion the same as if we had not rotated
 TURNING_STEP_AMOUNT = (
@@ -48,13 +50,10 @@ class HumanoidRearrangeController(HumanoidBaseController):
         self.turning_step_amount = TURNING_STEP_AMOUNT
         self.threshold_rotate_not_move = THRESHOLD_ROTATE_NOT_MOVE
 
-        if not os.path.isfile(walk_pose_path):
-            raise RuntimeError(
-                f"Path does {walk_pose_path} not exist. Reach out to the paper authors to obtain this data."
-            )
-
-        with open(walk_pose_path, "rb") as f:
-            walk_data = pkl.load(f)
+        # The motion data is shared with the other controllers using the
+        # same file, so it must not be modified.
+        self._motion_library = load_motion_library(walk_pose_path)
+        walk_data = self._motion_library.tree()
         walk_info = walk_data["walk_motion"]
 
         self.walk_motion = Motion(
@@ -90,7 +89,7 @@ class HumanoidRearrangeController(HumanoidBaseController):
                 #   to compute the target poses
                 hand_data = walk_data[hand_name]
                 nposes = hand_data["pose_motion"]["transform_array"].shape[0]
-                self.vpose_info = hand_data["coord_info"].item()
+                self.vpose_info = hand_data["coord_info"]
                 hand_motion = Motion(
                     hand_data["pose_motion"]["joints_array"].reshape(
                         nposes, -1, 4
@@ -99,12 +98,45 @@ class HumanoidRearrangeController(HumanoidBaseController):
                     None,
                     1,
                 )
-                self.hand_processed_data[hand_name] = self.build_ik_vectors(
-                    hand_motion
+                # The reach poses only depend on the motion file, so they are
+                # built once per process for all the controllers.
+                self.hand_processed_data[
+                    hand_name
+                ] = self._motion_library.get_derived(
+                    f"{hand_name}/ik_vectors",
+                    lambda: self.build_ik_vectors(hand_motion),
                 )
             else:
                 self.hand_processed_data[hand_name] = None
 
+        # Each row holds the flattened joint quaternions, root translation
+        # and root rotation quaternion of one hand pose, so that all of them
+        # are interpolated in a single pass.
+        self._hand_pose_tables: Dict[str, np.ndarray] = {}
+        for hand_name, hand_data in self.hand_processed_data.items():
+            if hand_data is None:
+                continue
+            self._hand_pose_tables[
+                hand_name
+            ] = self._motion_library.get_derived(
+                f"{hand_name}/pose_table",
+                functools.partial(self._build_hand_pose_table, *hand_data),
+            )
+
+    @staticmethod
+    def _build_hand_pose_table(joints, rotations, translations):
+        """
+        Concatenates the joints, translations and rotations of the hand poses
+        into a single table of floats, one row per pose.
+        """
+        return np.ascontiguousarray(
+            np.concatenate(
+                [joints.reshape(len(joints), -1), translations, rotations],
+                axis=1,
+            ),
+            dtype=np.float64,
+        )
+
     def set_framerate_for_linspeed(self, lin_speed, ang_speed, ctrl_freq):
         """Set the speed of the humanoid according to the simulator speed"""
         seconds_per_step = 1.0 / ctrl_freq
@@ -300,135 +332,99 @@ class HumanoidRearrangeController(HumanoidBaseController):
             np.array(list(quat_Rot.vector) + [quat_Rot.scalar])[None, ...]
         )
         translations.append(np.array(curr_transform.translation)[None, ...])
-        return (joints, rotations, translations)
+        return (
+            np.concatenate(joints),
+            np.concatenate(rotations),
+            np.concatenate(translations),
+        )
 
-    def _trilinear_interpolate_pose(self, position, hand_data):
+    def _trilinear_interpolate_pose(
+        self, positions: np.ndarray, pose_table: np.ndarray
+    ) -> np.ndarray:
         """
-        Given a 3D coordinate position, computes humanoid's joints, rotations and
-        translations to reach that position, doing trilinear interpolation.
+        Given (N, 3) coordinates, computes the rows of pose_table, with
+        humanoid's joints, rotations and translations, to reach those
+        positions, doing trilinear interpolation.
         """
-        joints, rotations, translations = hand_data
-
-        def find_index_quant(minv, maxv, num_bins, value, interp=False):
-            # Find the quantization bins where a given value falls
-            # E.g. if we have 3 points, min=0, max=1, value=0.75, it
-            # will fall between 1 and 2
-            if interp:
-                value = max(min(value, maxv), 0)
-            else:
-                value = max(min(value, maxv), minv)
-            value = min(value, maxv)
-            value_norm = (value - minv) / (maxv - minv)
-
-            index = value_norm * (num_bins - 1)
-
-            lower = min(math.floor(index), num_bins - 1)
-            upper = max(min(math.ceil(index), num_bins - 1), 0)
-            value_norm_t = index - lower
-            if lower < 0:
-                min_poss_val = 0.0
-                lower = (min_poss_val - minv) * (num_bins - 1) / (maxv - minv)
-                value_norm_t = (index - lower) / -lower
-                lower = -1
-
-            return lower, upper, value_norm_t
-
-        def comp_inter(x_i, y_i, z_i):
-            # Given an integer index from 0 to num_bins - 1
-            # on each dimension, compute the final index
-
-            if y_i < 0 or x_i < 0 or z_i < 0:
-                return -1
-            index = (
-                y_i
-                * self.vpose_info["num_bins"][0]
-                * self.vpose_info["num_bins"][2]
-                + x_i * self.vpose_info["num_bins"][2]
-                + z_i
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        minv = np.asarray(self.vpose_info["min"], dtype=np.float64)
+        maxv = np.asarray(self.vpose_info["max"], dtype=np.float64)
+        num_bins = np.asarray(self.vpose_info["num_bins"], dtype=np.int64)
+
+        # Find the quantization bins where the values fall on each dimension
+        # E.g. if we have 3 points, min=0, max=1, value=0.75, it
+        # will fall between 1 and 2. The z coordinate is clamped to 0 instead
+        # of its min value and interpolated with the default pose below it.
+        lowest = np.array([minv[0], minv[1], 0.0])
+        value = np.maximum(np.minimum(positions, maxv), lowest)
+        value_norm = (value - minv) / (maxv - minv)
+
+        index = value_norm * (num_bins - 1)
+
+        lower = np.minimum(np.floor(index), num_bins - 1)
+        upper = np.maximum(np.minimum(np.ceil(index), num_bins - 1), 0)
+        value_norm_t = index - lower
+        is_below = lower < 0
+        if is_below.any():
+            min_poss_val = 0.0
+            lower_below = (
+                (min_poss_val - minv) * (num_bins - 1) / (maxv - minv)
             )
-            return index
+            value_norm_t = np.divide(
+                index - lower_below,
+                -lower_below,
+                out=value_norm_t,
+                where=is_below,
+            )
+            lower[is_below] = -1
+
+        # (N, 3, 2) lower and upper bin of each dimension, the final index of
+        # the 8 corners is -1 (the default pose) if any of them is negative.
+        bins = np.stack([lower, upper], axis=-1).astype(np.int64)
+        x_i = bins[:, 0, :, None, None]
+        y_i = bins[:, 1, None, :, None]
+        z_i = bins[:, 2, None, None, :]
+        corners = y_i * num_bins[0] * num_bins[2] + x_i * num_bins[2] + z_i
+        corners[(x_i < 0) | (y_i < 0) | (z_i < 0)] = -1
+
+        # (N, 2, 2, 2, D) values at the corners indexed by x, y, z bins.
+        c = pose_table[corners]
+        xd, yd, zd = (value_norm_t[:, ind, None, None] for ind in range(3))
+        c = c[:, 0] * (1 - xd[..., None]) + c[:, 1] * xd[..., None]
+        c = c[:, 0] * (1 - yd) + c[:, 1] * yd
+        return c[:, 0] * (1 - zd[:, 0]) + c[:, 1] * zd[:, 0]
+
+    def interpolate_reach_poses(
+        self, relative_positions: np.ndarray, index_hand: int = 0
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Computes the humanoid poses to reach many positions at once with the
+        hand. index_hand is 0 or 1 corresponding to the left or right hand.
+
+        :param relative_positions: (N, 3) positions in the reach pose frame,
+            see calculate_reach_pose.
+        :return: The (N, J, 4) joint quaternions, (N, 3) root translations
+            and (N, 4) root rotation quaternions (vector, scalar) of the poses.
+        """
+        assert index_hand < 2
+        hand_name = self._hand_names[index_hand]
+        assert hand_name in self._hand_pose_tables
+        res = self._trilinear_interpolate_pose(
+            relative_positions, self._hand_pose_tables[hand_name]
+        )
 
         def normalize_quat(quat_tens):
             # The last dimension contains the quaternion
             return quat_tens / np.linalg.norm(quat_tens, axis=-1)[..., None]
 
-        def inter_data(x_i, y_i, z_i, dat, is_quat=False):
-            """
-            General trilinear interpolation function. Performs trilinear interpolation,
-            normalizing the result if the values are repsented as quaternions (is_quat)
-            :param x_i, y_i, z_i: For the x,y,z dimensions, specifies the lower, upper, and normalized value
-            so that we can perform interpolation in 3 dimensions
-            :param data: the values we want to interpolate.
-            :param is_quat: used to normalize the value in case we are interpolating quaternions
-
-            """
-            x0, y0, z0 = x_i[0], y_i[0], z_i[0]
-            x1, y1, z1 = x_i[1], y_i[1], z_i[1]
-            xd, yd, zd = x_i[2], y_i[2], z_i[2]
-            c000 = dat[comp_inter(x0, y0, z0)]
-            c001 = dat[comp_inter(x0, y0, z1)]
-            c010 = dat[comp_inter(x0, y1, z0)]
-            c011 = dat[comp_inter(x0, y1, z1)]
-            c100 = dat[comp_inter(x1, y0, z0)]
-            c101 = dat[comp_inter(x1, y0, z1)]
-            c110 = dat[comp_inter(x1, y1, z0)]
-            c111 = dat[comp_inter(x1, y1, z1)]
-
-            c00 = c000 * (1 - xd) + c100 * xd
-            c01 = c001 * (1 - xd) + c101 * xd
-            c10 = c010 * (1 - xd) + c110 * xd
-            c11 = c011 * (1 - xd) + c111 * xd
-
-            c0 = c00 * (1 - yd) + c10 * yd
-            c1 = c01 * (1 - yd) + c11 * yd
-
-            c = c0 * (1 - zd) + c1 * zd
-            if is_quat:
-                c = normalize_quat(c)
-
-            return c
-
-        relative_pos = position
-        x_diff, y_diff, z_diff = relative_pos.x, relative_pos.y, relative_pos.z
-        coord_diff = [x_diff, y_diff, z_diff]
-        coord_data = [
-            (
-                self.vpose_info["min"][ind_diff],
-                self.vpose_info["max"][ind_diff],
-                self.vpose_info["num_bins"][ind_diff],
-                coord_diff[ind_diff],
-            )
-            for ind_diff in range(3)
-        ]
-        # each value contains the lower, upper index and distance
-        interp = [False, False, True]
-        x_ind, y_ind, z_ind = [
-            find_index_quant(*data, interp)
-            for interp, data in zip(interp, coord_data)
-        ]
-
-        data_trans = np.concatenate(translations)
-        data_rot = np.concatenate(rotations)
-        data_joint = np.concatenate(joints)
-        res_joint = inter_data(x_ind, y_ind, z_ind, data_joint, is_quat=True)
-        res_trans = inter_data(x_ind, y_ind, z_ind, data_trans)
-        res_rot = inter_data(x_ind, y_ind, z_ind, data_rot, is_quat=True)
-        quat_rot = mn.Quaternion(mn.Vector3(res_rot[:3]), res_rot[-1])
-        joint_list = list(res_joint.reshape(-1))
-        transform = mn.Matrix4.from_(
-            quat_rot.to_matrix(), mn.Vector3(res_trans)
-        )
-        return joint_list, transform
+        joints = normalize_quat(res[:, :-7].reshape(len(res), -1, 4))
+        return joints, res[:, -7:-4], normalize_quat(res[:, -4:])
 
     def calculate_reach_pose(self, obj_pos: mn.Vector3, index_hand=0):
         """
         Updates the humanoid position to reach position obj_pos with the hand.
         index_hand is 0 or 1 corresponding to the left or right hand
         """
-        assert index_hand < 2
-        hand_name = self._hand_names[index_hand]
-        assert hand_name in self.hand_processed_data
-        hand_data = self.hand_processed_data[hand_name]
         root_pos = self.obj_transform_base.translation
         inv_T = (
             mn.Matrix4.rotation_y(mn.Rad(-np.pi / 2.0))
@@ -437,9 +433,16 @@ class HumanoidRearrangeController(HumanoidBaseController):
         )
         relative_pos = inv_T.transform_vector(obj_pos - root_pos)
 
-        curr_poses, curr_transform = self._trilinear_interpolate_pose(
-            mn.Vector3(relative_pos), hand_data
+        joints, translations, rotations = self.interpolate_reach_poses(
+            np.array(relative_pos)[None], index_hand
+        )
+        quat_rot = mn.Quaternion(
+            mn.Vector3(rotations[0, :3]), rotations[0, -1]
+        )
+        curr_transform = mn.Matrix4.from_(
+            quat_rot.to_matrix(), mn.Vector3(translations[0])
         )
+        curr_poses = list(joints[0].reshape(-1))
 
         self.obj_transform_offset = (
             mn.Matrix4.rotation_y(mn.Rad(-np.pi / 2.0))
@@ -4,15 +4,15 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
-import os
-
 import magnum as mn
-import numpy as np
 
 from habitat.articulated_agent_controllers import (
     HumanoidBaseController,
     Motion,
 )
+from habitat.articulated_agent_controllers.motion_library import (
+    load_motion_library,
+)
 
 
 class HumanoidSeqPoseController(HumanoidBaseController):
@@ -31,12 +31,9 @@ class HumanoidSeqPoseController(HumanoidBaseController):
     ):
         super().__init__(motion_fps, base_offset)
 
-        if not os.path.isfile(motion_pose_path):
-            raise RuntimeError(
-                f"Path does {motion_pose_path} not exist. Reach out to the paper authors to obtain this data."
-            )
-
-        motion_info = np.load(motion_pose_path, allow_pickle=True)
+        # The motion data is shared with the other controllers using the
+        # same file, so it must not be modified.
+        motion_info = load_motion_library(motion_pose_path).tree()
         motion_info = motion_info["pose_motion"]
         self.humanoid_motion = Motion(
             motion_info["joints_array"],
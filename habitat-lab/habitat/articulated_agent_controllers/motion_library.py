@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+r"""Humanoid motion files shared as read-only, memory-mapped arrays.
+
+The motion files of the humanoids are pickled dicts of arrays, which every
+controller used to load and copy on its own. :ref:`load_motion_library`
+converts a motion file once into a single ``.npy`` file next to it, that
+packs all the arrays of the motion file, and memory maps it. The pages of
+the memory map are shared by all the processes that load the same motion
+file, and the loaded libraries are cached per process.
+"""
+
+import json
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from habitat.core.logging import logger
+
+# Suffix of the converted motion library, next to its motion file
+MOTION_LIBRARY_SUFFIX = ".motionlib.npy"
+_MOTION_LIBRARY_VERSION = 1
+# Arrays are aligned to this many bytes in the packed buffer
+_ALIGNMENT = 64
+# Bytes holding the length of the json header at the start of the buffer
+_HEADER_LENGTH_BYTES = 8
+
+
+def _flatten_motion_data(
+    data: Any, prefix: str = ""
+) -> Dict[str, Optional[np.ndarray]]:
+    """
+    Flattens the nested dicts of a motion file into arrays keyed by their
+    "/" joined path. Dicts wrapped in 0-d object arrays are unwrapped.
+    """
+    if isinstance(data, np.ndarray) and data.dtype.hasobject:
+        if data.ndim != 0:
+            raise ValueError(
+                f"Cannot store the object array at '{prefix}' in a motion library."
+            )
+        data = data.item()
+    if isinstance(data, dict):
+        arrays: Dict[str, Optional[np.ndarray]] = {}
+        for key, value in data.items():
+            arrays.update(
+                _flatten_motion_data(
+                    value, f"{prefix}/{key}" if prefix else str(key)
+                )
+            )
+        return arrays
+    if data is None:
+        return {prefix: None}
+    array = np.asarray(data)
+    if array.dtype.hasobject:
+        raise ValueError(
+            f"Cannot store the object array at '{prefix}' in a motion library."
+        )
+    return {prefix: array}
+
+
+def _source_signature(path: str) -> Tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class MotionLibrary:
+    """
+    Read-only arrays of a humanoid motion file, keyed by their "/" joined
+    path in the file, e.g. "walk_motion/joints_array". Entries that are None
+    in the motion file are kept as None.
+
+    :param arrays: The arrays of the motion file.
+    :param source_signature: Modification time and size of the motion file
+        the arrays were loaded from.
+    """
+
+    def __init__(
+        self,
+        arrays: Dict[str, Optional[np.ndarray]],
+        source_signature: Optional[Tuple[int, int]] = None,
+    ):
+        for array in arrays.values():
+            if array is not None:
+                array.setflags(write=False)
+        self._arrays = arrays
+        self.source_signature = source_signature
+        self._derived: Dict[str, Any] = {}
+
+    @classmethod
+    def from_motion_file(cls, motion_path: str) -> "MotionLibrary":
+        """
+        Loads a pickled or .npz motion file, without converting it.
+        """
+        signature = _source_signature(motion_path)
+        data = np.load(motion_path, allow_pickle=True)
+        if isinstance(data, np.lib.npyio.NpzFile):
+            with data:
+                data = dict(data)
+        return cls(_flatten_motion_data(data), signature)
+
+    @classmethod
+    def load(cls, library_path: str) -> "MotionLibrary":
+        """
+        Memory maps a library written by `save`.
+        """
+        buffer = np.load(library_path, mmap_mode="r")
+        header_length = int(buffer[:_HEADER_LENGTH_BYTES].view("<u8")[0])
+        header = json.loads(
+            bytes(
+                buffer[
+                    _HEADER_LENGTH_BYTES : _HEADER_LENGTH_BYTES + header_length
+                ]
+            )
+        )
+        if header["version"] != _MOTION_LIBRARY_VERSION:
+            raise ValueError(
+                f"Unsupported motion library version {header['version']}."
+            )
+        arrays: Dict[str, Optional[np.ndarray]] = {
+            key: None for key in header["none_keys"]
+        }
+        for key, (dtype, shape, offset) in header["arrays"].items():
+            dtype = np.dtype(dtype)
+            size = int(np.prod(shape)) * dtype.itemsize
+            arrays[key] = (
+                buffer[offset : offset + size].view(dtype).reshape(shape)
+            )
+        signature = header["source_signature"]
+        return cls(arrays, None if signature is None else tuple(signature))
+
+    def save(self, library_path: str) -> None:
+        """
+        Packs the arrays into a single uint8 array, with a json header, saved
+        as a .npy file that `load` memory maps.
+        """
+        layout: Dict[str, List[Any]] = {}
+        none_keys: List[str] = []
+        offset = 0
+        for key, array in self._arrays.items():
+            if array is None:
+                none_keys.append(key)
+                continue
+            layout[key] = [array.dtype.str, list(array.shape), offset]
+            offset += -(-array.nbytes // _ALIGNMENT) * _ALIGNMENT
+
+        def encode_header(data_start: int) -> bytes:
+            return json.dumps(
+                {
+                    "version": _MOTION_LIBRARY_VERSION,
+                    "source_signature": self.source_signature,
+                    "none_keys": none_keys,
+                    "arrays": {
+                        key: [dtype, shape, data_start + array_offset]
+                        for key, (dtype, shape, array_offset) in layout.items()
+                    },
+                }
+            ).encode()
+
+        # The offsets in the header depend on the header length, so it is
+        # encoded until the start of the data stops moving.
+        data_start = 0
+        while True:
+            header = encode_header(data_start)
+            new_data_start = (
+                -(-(_HEADER_LENGTH_BYTES + len(header)) // _ALIGNMENT)
+                * _ALIGNMENT
+            )
+            if new_data_start == data_start:
+                break
+            data_start = new_data_start
+
+        buffer = np.zeros(data_start + offset, dtype=np.uint8)
+        buffer[:_HEADER_LENGTH_BYTES] = np.frombuffer(
+            np.array([len(header)], dtype="<u8").tobytes(), dtype=np.uint8
+        )
+        buffer[
+            _HEADER_LENGTH_BYTES : _HEADER_LENGTH_BYTES + len(header)
+        ] = np.frombuffer(header, dtype=np.uint8)
+        for key, (_, _, array_offset) in layout.items():
+            array = np.ascontiguousarray(self._arrays[key])
+            start = data_start + array_offset
+            buffer[start : start + array.nbytes] = np.frombuffer(
+                array.tobytes(), dtype=np.uint8
+            )
+
+        # Written to a temporary file first so that concurrent readers never
+        # see a partial library
+        tmp_path = f"{library_path}.{os.getpid()}.tmp.npy"
+        np.save(tmp_path, buffer)
+        os.replace(tmp_path, library_path)
+
+    def keys(self) -> List[str]:
+        return list(self._arrays.keys())
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._arrays
+
+    def __getitem__(self, key: str) -> Optional[np.ndarray]:
+        return self._arrays[key]
+
+    def tree(self) -> Dict[str, Any]:
+        """
+        The arrays nested in dicts with the layout of the motion file. 0-d
+        arrays are returned as Python scalars.
+        """
+        root: Dict[str, Any] = {}
+        for key, array in self._arrays.items():
+            *parents, name = key.split("/")
+            node = root
+            for parent in parents:
+                node = node.setdefault(parent, {})
+            node[name] = (
+                array.item()
+                if array is not None and array.ndim == 0
+                else array
+            )
+        return root
+
+    def get_derived(self, name: str, build_fn: Callable[[], Any]) -> Any:
+        """
+        Returns the data computed from the library by `build_fn`, computed
+        once per process and library. The returned data must not be modified.
+        """
+        if name not in self._derived:
+            self._derived[name] = build_fn()
+        return self._derived[name]
+
+
+# cache of the loaded motion libraries by real path of their motion file
+_motion_library_cache: Dict[str, MotionLibrary] = {}
+
+
+def load_motion_library(
+    motion_path: str, library_path: Optional[str] = None
+) -> MotionLibrary:
+    """
+    Returns the library of a pickled motion file. The motion file is
+    converted on the first load and the library is reused until the motion
+    file changes. If the library cannot be written, the motion file is
+    loaded in memory instead.
+
+    :param motion_path: The pickled motion file.
+    :param library_path: Where the converted library is stored, next to the
+        motion file by default.
+    """
+    if not os.path.isfile(motion_path):
+        raise RuntimeError(
+            f"Path does {motion_path} not exist. Reach out to the paper authors to obtain this data."
+        )
+    real_path = os.path.realpath(motion_path)
+    signature = _source_signature(real_path)
+    library = _motion_library_cache.get(real_path)
+    if library is not None and library.source_signature == signature:
+        return library
+
+    if library_path is None:
+        library_path = real_path + MOTION_LIBRARY_SUFFIX
+    library = None
+    if os.path.isfile(library_path):
+        try:
+            library = MotionLibrary.load(library_path)
+        except (ValueError, KeyError, OSError):
+            library = None
+        if library is not None and library.source_signature != signature:
+            library = None
+
+    if library is None:
+        library = MotionLibrary.from_motion_file(real_path)
+        try:
+            library.save(library_path)
+            library = MotionLibrary.load(library_path)
+        except OSError as e:
+            logger.warning(
+                f"Could not write the motion library {library_path}, "
+                f"{motion_path} is loaded in memory: {e}"
+            )
+
+    _motion_library_cache[real_path] = library
+    return library
@@ -2,13 +2,15 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
-import pickle as pkl
 from typing import List
 
 import magnum as mn
 import numpy as np
 
 import habitat_sim
+from habitat.articulated_agent_controllers.motion_library import (
+    load_motion_library,
+)
 from habitat.articulated_agents.mobile_manipulator import (
     ArticulatedAgentCameraParams,
     MobileManipulator,
@@ -92,10 +94,8 @@ class KinematicHumanoid(MobileManipulator):
         _get_X_params, which is used to set parameters of the robots, but the parameters are so large that
         it is better to put that on a file
         """
-        with open(rest_pose_path, "rb") as f:
-            rest_pose = pkl.load(f)
-            rest_pose = rest_pose["stop_pose"]
-        self.rest_joints = list(rest_pose["joints"].reshape(-1))
+        rest_joints = load_motion_library(rest_pose_path)["stop_pose/joints"]
+        self.rest_joints = list(rest_joints.reshape(-1))
 
     @property
     def inverse_offset_transform(self):
@@ -790,6 +790,17 @@ class TopDownMapMeasurementConfig(MeasurementConfig):
     # axes aligned bounding boxes
     draw_goal_aabbs: bool = True
     fog_of_war: FogOfWarConfig = FogOfWarConfig()
+    # How the map is output every step. "full": the whole map. "delta": the
+    # whole map on the first step of an episode, then only the region that
+    # changed, see maps.apply_top_down_map_delta. "downsampled": the map max
+    # pooled to output_map_resolution.
+    output_mode: str = "full"
+    output_map_resolution: int = 256
+    # Optional directory the top down maps of the scene floors are cached in
+    # as .npz files, shared by all the processes using the same directory.
+    map_cache_dir: Optional[str] = None
+    # Size in meters of the bands of agent heights that share a top down map.
+    map_height_band: float = 0.01
 
 
 @dataclass
@@ -1351,9 +1362,19 @@ class DistanceToGoalMeasurementConfig(MeasurementConfig):
     In Navigation tasks only, measures the geodesic distance to the goal.
 
     :property distance_to: If 'POINT' measures the distance to the closest episode goal. If 'VIEW_POINTS' measures the distance to the episode's goal's viewpoint.
+    :property use_geodesic_cache: If True, the distance is looked up in a precomputed distance field over the navmesh to the goals of the episode instead of searching a path on every step. The field is shared by the episodes of a scene with the same goals. Distances in the field are approximated on a grid, distances at the start of the episode and closer than `geodesic_cache_exact_distance` are still computed exactly. SPL and SoftSPL read this measure and go through the same field, the shortest path drawn by TopDownMap is still searched once per episode since it needs the points of the path.
+    :property geodesic_cache_meters_per_pixel: Size of the cells of the distance fields.
+    :property geodesic_cache_size: Number of distance fields kept in memory.
+    :property geodesic_cache_dir: Optional directory where the distance fields are persisted and shared between processes and runs.
+    :property geodesic_cache_exact_distance: Distances below this value are computed exactly, so that the success of an episode does not depend on the approximation.
     """
     type: str = "DistanceToGoal"
     distance_to: str = "POINT"
+    use_geodesic_cache: bool = False
+    geodesic_cache_meters_per_pixel: float = 0.05
+    geodesic_cache_size: int = 16
+    geodesic_cache_dir: Optional[str] = None
+    geodesic_cache_exact_distance: float = 1.0
 
 
 @dataclass
@@ -1741,6 +1762,10 @@ class SimulatorConfig(HabitatBaseConfig):
     ctrl_freq: float = 120.0
     ac_freq_ratio: int = 4
     load_objs: bool = True
+    # Number of targets whose navigable agent spawn candidates are reused
+    # across spawns, 0 to sample new candidates on every spawn. Reusing the
+    # candidates makes the spawns around a target less diverse.
+    spawn_candidate_cache_size: int = 0
     # Rearrange agent grasping
     hold_thresh: float = 0.15
     grasp_impulse: float = 10000.0
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+r"""Columnar, memory mapped storage for the episodes of a dataset.
+
+A store is a directory, named with the :py:`COLUMNAR_EPISODES_EXT`
+extension, that holds the episodes as typed column arrays. Every field whose
+values are scalars, or lists of scalars of the same length, of a single type
+across the episodes, like the start positions, is a column. The other, ragged,
+fields, like goals and shortest paths, are JSON encoded per episode into a
+single binary blob. The arrays and the blob are memory mapped, so opening a
+store does not read the episodes, the processes that open the same store
+share its pages, and an episode is only decoded when it is accessed.
+Selecting the episodes of some scenes or splitting a dataset only touches the
+scene and episode id columns.
+
+Stores are converted from the JSON datasets with
+:py:`python -m habitat.datasets.convert_episodes_to_columnar`, the
+:py:`data_path` of the dataset config then points to the store.
+"""
+
+import copy
+import json
+import os
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    TypeVar,
+    Union,
+    overload,
+)
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from habitat.core.dataset import Episode
+
+COLUMNAR_EPISODES_EXT = ".episodes"
+
+_VERSION = 2
+_META_FILE = "meta.json"
+_DATASET_STATE_FILE = "dataset.json"
+_RAGGED_FILE = "ragged.bin"
+_RAGGED_OFFSETS_FILE = "ragged_offsets.npy"
+_SCENE_CODES_FILE = "scene_codes.npy"
+_EPISODE_IDS_FILE = "episode_ids.npy"
+_COLUMNS_DIR = "columns"
+
+_COLUMN_DTYPES = {
+    bool: np.bool_,
+    int: np.int64,
+    float: np.float64,
+    str: np.str_,
+}
+
+T = TypeVar("T", bound="Episode")
+
+
+def is_columnar_episodes(path: str) -> bool:
+    r"""Whether path is a columnar episode store."""
+    return path.endswith(COLUMNAR_EPISODES_EXT) and os.path.isfile(
+        os.path.join(path, _META_FILE)
+    )
+
+
+def _get_column_dtype(values: Sequence[Any]) -> Optional[type]:
+    types = {type(v) for v in values}
+    if types == {int, float}:
+        # Coordinates are often written as integers when they are round
+        return np.float64
+    if len(types) != 1:
+        return None
+    return _COLUMN_DTYPES.get(types.pop())
+
+
+def _to_column(values: Sequence[Any]) -> Optional[np.ndarray]:
+    r"""Returns the values as a typed array, or :py:`None` if they are not
+    scalars, or non-empty lists of scalars of the same length, of a single
+    type. Integers mixed with floats are stored as floats. Converting the
+    rows of the array back with :py:`tolist()` gives the values.
+    """
+    if all(isinstance(v, list) for v in values):
+        lengths = {len(v) for v in values}
+        if len(lengths) != 1 or 0 in lengths:
+            return None
+        items = [x for v in values for x in v]
+        shape: tuple = (len(values), lengths.pop())
+    else:
+        items = list(values)
+        shape = (len(values),)
+    dtype = _get_column_dtype(items)
+    if dtype is None:
+        return None
+    try:
+        return np.array(items, dtype=dtype).reshape(shape)
+    except OverflowError:
+        # Integers that do not fit in 64 bits
+        return None
+
+
+def write_columnar_episodes(
+    path: str,
+    episodes: Sequence[Dict[str, Any]],
+    dataset_state: Optional[Dict[str, Any]] = None,
+) -> None:
+    r"""Writes episodes to a new columnar episode store.
+
+    :param path: directory of the store, ending with
+        :py:`COLUMNAR_EPISODES_EXT`.
+    :param episodes: the fields of the episodes to store, as JSON compatible
+        dicts with a :py:`scene_id` and an :py:`episode_id`. Their
+        :py:`scene_id` should not include the scenes directory, see
+        :ref:`ColumnarEpisodes`.
+    :param dataset_state: JSON compatible attributes of the dataset, other
+        than its episodes, that are restored when the store is loaded.
+    """
+    assert path.endswith(
+        COLUMNAR_EPISODES_EXT
+    ), f"The path of the store must end with {COLUMNAR_EPISODES_EXT}"
+    os.makedirs(os.path.join(path, _COLUMNS_DIR), exist_ok=True)
+
+    scene_codes_by_id: Dict[str, int] = {}
+    scene_codes = np.array(
+        [
+            scene_codes_by_id.setdefault(
+                ep["scene_id"], len(scene_codes_by_id)
+            )
+            for ep in episodes
+        ],
+        dtype=np.int32,
+    )
+    np.save(os.path.join(path, _SCENE_CODES_FILE), scene_codes)
+    np.save(
+        os.path.join(path, _EPISODE_IDS_FILE),
+        np.array([str(ep["episode_id"]) for ep in episodes], dtype=np.str_),
+    )
+
+    field_names = {
+        k for ep in episodes for k in ep if k not in {"scene_id", "episode_id"}
+    }
+    column_names = []
+    for name in sorted(field_names):
+        if not all(name in ep for ep in episodes):
+            continue
+        column = _to_column([ep[name] for ep in episodes])
+        if column is not None:
+            np.save(os.path.join(path, _COLUMNS_DIR, f"{name}.npy"), column)
+            column_names.append(name)
+
+    ragged_names = field_names.difference(column_names)
+    offsets = np.zeros(len(episodes) + 1, dtype=np.int64)
+    with open(os.path.join(path, _RAGGED_FILE), "wb") as f:
+        for i, episode in enumerate(episodes):
+            ragged = json.dumps(
+                {k: v for k, v in episode.items() if k in ragged_names}
+            ).encode()
+            f.write(ragged)
+            offsets[i + 1] = offsets[i] + len(ragged)
+    np.save(os.path.join(path, _RAGGED_OFFSETS_FILE), offsets)
+
+    with open(os.path.join(path, _DATASET_STATE_FILE), "w") as f:
+        json.dump(dataset_state or {}, f)
+    # The metadata is written last, it marks the store as complete
+    with open(os.path.join(path, _META_FILE), "w") as f:
+        json.dump(
+            dict(
+                version=_VERSION,
+                num_episodes=len(episodes),
+                scene_ids=list(scene_codes_by_id.keys()),
+                columns=column_names,
+            ),
+            f,
+        )
+
+
+def read_columnar_dataset_state(path: str) -> Dict[str, Any]:
+    r"""Reads the dataset attributes saved with the episodes of a store."""
+    with open(os.path.join(path, _DATASET_STATE_FILE)) as f:
+        return json.load(f)
+
+
+class ColumnarEpisodesIterator(Iterator[T]):
+    r"""Iterator over :ref:`ColumnarEpisodes` that can return the episodes
+    it has not reached yet without materializing them.
+    """
+
+    def __init__(self, episodes: "ColumnarEpisodes[T]") -> None:
+        self._episodes = episodes
+        self._position = 0
+
+    def __next__(self) -> T:
+        if self._position >= len(self._episodes):
+            raise StopIteration
+        episode = self._episodes[self._position]
+        self._position += 1
+        return episode
+
+    def remaining(self) -> "ColumnarEpisodes[T]":
+        r"""Returns the episodes the iterator has not reached yet."""
+        return self._episodes.take(
+            np.arange(self._position, len(self._episodes))
+        )
+
+
+class ColumnarEpisodes(Sequence[T]):
+    r"""Read-only sequence of the episodes of a columnar episode store.
+
+    Indexing with an integer decodes the episode, all the other operations
+    work on the column arrays. Selecting episodes with :ref:`take` returns a
+    view that shares the memory mapped arrays.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        episode_fn: Callable[[Dict[str, Any]], T],
+        scene_id_fn: Optional[Callable[[str], str]] = None,
+    ) -> None:
+        r"""..
+
+        :param path: directory of the store.
+        :param episode_fn: builds an episode from its fields when it is
+            materialized, e.g. the episode class. Must be picklable for the
+            episodes to be.
+        :param scene_id_fn: maps the scene ids stored with the episodes to the
+            scene ids of the loaded episodes, e.g. to prepend the scenes
+            directory. Only applied once per scene.
+        """
+        with open(os.path.join(path, _META_FILE)) as f:
+            meta = json.load(f)
+        if meta["version"] != _VERSION:
+            raise ValueError(
+                f"Unsupported columnar episode store version {meta['version']}"
+            )
+
+        self._path = path
+        self._scene_ids: List[str] = meta["scene_ids"]
+        if scene_id_fn is not None:
+            self._scene_ids = [scene_id_fn(s) for s in self._scene_ids]
+        self._column_names: List[str] = meta["columns"]
+        self._episode_fn = episode_fn
+        self._indices: Optional[np.ndarray] = None
+        self._open()
+
+    def _open(self) -> None:
+        self._ragged_offsets = np.load(
+            os.path.join(self._path, _RAGGED_OFFSETS_FILE), mmap_mode="r"
+        )
+        self._base_columns = {
+            name: np.load(
+                os.path.join(self._path, _COLUMNS_DIR, f"{name}.npy"),
+                mmap_mode="r",
+            )
+            for name in self._column_names
+        }
+        self._base_scene_codes = np.load(
+            os.path.join(self._path, _SCENE_CODES_FILE), mmap_mode="r"
+        )
+        self._base_episode_ids = np.load(
+            os.path.join(self._path, _EPISODE_IDS_FILE), mmap_mode="r"
+        )
+        ragged_path = os.path.join(self._path, _RAGGED_FILE)
+        if os.path.getsize(ragged_path) > 0:
+            self._ragged = np.memmap(ragged_path, dtype=np.uint8, mode="r")
+        else:
+            # An empty file cannot be memory mapped
+            self._ragged = np.empty(0, dtype=np.uint8)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The arrays are mapped again instead of being copied
+        return {
+            k: v
+            for k, v in self.__dict__.items()
+            if k
+            not in {
+                "_ragged_offsets",
+                "_base_columns",
+                "_base_scene_codes",
+                "_base_episode_ids",
+                "_ragged",
+            }
+        }
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._open()
+
+    def __len__(self) -> int:
+        if self._indices is None:
+            return len(self._base_scene_codes)
+        return len(self._indices)
+
+    @overload
+    def __getitem__(self, index: int) -> T:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "ColumnarEpisodes[T]":
+        ...
+
+    def __getitem__(
+        self, index: Union[int, slice]
+    ) -> Union[T, "ColumnarEpisodes[T]"]:
+        if isinstance(index, slice):
+            return self.take(np.arange(len(self))[index])
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("episode index out of range")
+        if self._indices is not None:
+            index = int(self._indices[index])
+        return self._materialize(index)
+
+    def __iter__(self) -> ColumnarEpisodesIterator[T]:
+        return ColumnarEpisodesIterator(self)
+
+    def _materialize(self, base_index: int) -> T:
+        start = self._ragged_offsets[base_index]
+        end = self._ragged_offsets[base_index + 1]
+        fields = json.loads(self._ragged[start:end].tobytes())
+        for name, column in self._base_columns.items():
+            fields[name] = column[base_index].tolist()
+        fields["episode_id"] = str(self._base_episode_ids[base_index])
+        fields["scene_id"] = self._scene_ids[
+            self._base_scene_codes[base_index]
+        ]
+        return self._episode_fn(fields)
+
+    def take(
+        self, indices: Union[np.ndarray, List[int]]
+    ) -> "ColumnarEpisodes[T]":
+        r"""Returns a view on the episodes at indices, in that order."""
+        indices = np.asarray(indices, dtype=np.int64)
+        view = copy.copy(self)
+        view._indices = (
+            indices if self._indices is None else self._indices[indices]
+        )
+        return view
+
+    def _column(self, base_column: np.ndarray) -> np.ndarray:
+        if self._indices is None:
+            return np.asarray(base_column)
+        return base_column[self._indices]
+
+    @property
+    def scene_codes(self) -> np.ndarray:
+        r"""Code of the scene of every episode, an index into
+        :ref:`scene_id_vocabulary`.
+        """
+        return self._column(self._base_scene_codes)
+
+    @property
+    def scene_id_vocabulary(self) -> List[str]:
+        r"""Scene ids of the whole store, indexed by scene code."""
+        return self._scene_ids
+
+    @property
+    def episode_ids(self) -> np.ndarray:
+        r"""Id of every episode, as a string array."""
+        return self._column(self._base_episode_ids)
@@ -22,6 +22,7 @@ from typing import (
     List,
     Optional,
     Sequence,
+    Tuple,
     TypeVar,
     Union,
 )
@@ -30,6 +31,10 @@ import attr
 import numpy as np
 from numpy import ndarray
 
+from habitat.core.columnar_episodes import (
+    ColumnarEpisodes,
+    ColumnarEpisodesIterator,
+)
 from habitat.core.utils import DatasetJSONEncoder, not_none_validator
 
 if TYPE_CHECKING:
@@ -107,8 +112,156 @@ class Episode(BaseEpisode):
 T = TypeVar("T", bound=Episode)
 
 
+def _scene_grouping_order(scene_codes: np.ndarray) -> np.ndarray:
+    r"""Returns the order that groups episodes by scene code. Scenes are
+    ordered by their first episode and the episodes of a scene keep their
+    order.
+    """
+    _, first_positions, scene_of_episode = np.unique(
+        scene_codes, return_index=True, return_inverse=True
+    )
+    scene_rank = np.argsort(np.argsort(first_positions))
+    return np.argsort(scene_rank[scene_of_episode], kind="stable")
+
+
+class SceneEpisodeIndex:
+    r"""Index of a sequence of episodes by scene.
+
+    Every episode is given the code of its scene, an index into
+    :ref:`scene_id_vocabulary`, so that selecting, grouping and splitting
+    episodes by scene works on the code array instead of the episodes.
+    Episodes appended to the indexed list are added by :ref:`update`.
+    """
+
+    def __init__(
+        self,
+        episodes: Sequence[Episode],
+        scene_id_vocabulary: Optional[List[str]] = None,
+        scene_codes: Optional[np.ndarray] = None,
+    ) -> None:
+        r"""..
+
+        :param episodes: the indexed episodes.
+        :param scene_id_vocabulary: scene ids of known codes.
+        :param scene_codes: codes of the scenes of the first episodes, if
+            already known. The other episodes are indexed from their
+            :py:`scene_id`.
+        """
+        self.episodes = episodes
+        self._vocabulary: List[str] = list(scene_id_vocabulary or [])
+        self._codes_by_scene_id = {
+            scene_id: code for code, scene_id in enumerate(self._vocabulary)
+        }
+        self._codes = (
+            np.empty(0, dtype=np.int32)
+            if scene_codes is None
+            else np.asarray(scene_codes, dtype=np.int32)
+        )
+        self._new_codes: List[int] = []
+        self._episode_indices: Optional[List[np.ndarray]] = None
+        self.update()
+
+    def __len__(self) -> int:
+        return len(self._codes) + len(self._new_codes)
+
+    def update(self) -> None:
+        r"""Indexes the episodes appended since the last update."""
+        num_indexed = len(self)
+        for i in range(num_indexed, len(self.episodes)):
+            scene_id = self.episodes[i].scene_id
+            code = self._codes_by_scene_id.get(scene_id)
+            if code is None:
+                code = len(self._vocabulary)
+                self._codes_by_scene_id[scene_id] = code
+                self._vocabulary.append(scene_id)
+            self._new_codes.append(code)
+        if len(self) != num_indexed:
+            self._episode_indices = None
+
+    @property
+    def scene_codes(self) -> np.ndarray:
+        r"""Code of the scene of every episode."""
+        if self._new_codes:
+            self._codes = np.concatenate(
+                [self._codes, np.array(self._new_codes, dtype=np.int32)]
+            )
+            self._new_codes = []
+        return self._codes
+
+    @property
+    def scene_id_vocabulary(self) -> List[str]:
+        r"""Scene ids indexed by scene code, it can include scenes without
+        episodes.
+        """
+        return self._vocabulary
+
+    def scene_ids(self) -> List[str]:
+        r"""Sorted unique scene ids of the episodes."""
+        counts = np.bincount(self.scene_codes, minlength=len(self._vocabulary))
+        return sorted(
+            self._vocabulary[code] for code in np.flatnonzero(counts)
+        )
+
+    def episode_indices(self, scene_id: str) -> np.ndarray:
+        r"""Indices of the episodes of :p:`scene_id`, in episode order."""
+        code = self._codes_by_scene_id.get(scene_id)
+        if code is None:
+            return np.empty(0, dtype=np.int64)
+        if self._episode_indices is None:
+            codes = self.scene_codes
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(
+                codes[order], np.arange(len(self._vocabulary) + 1)
+            )
+            self._episode_indices = [
+                order[start:end] for start, end in zip(bounds, bounds[1:])
+            ]
+        return self._episode_indices[code]
+
+    def select_scenes(
+        self, scene_filter_fn: Callable[[str], bool]
+    ) -> np.ndarray:
+        r"""Indices of the episodes whose scene id passes
+        :p:`scene_filter_fn`, which is called once per scene.
+        """
+        codes = [
+            code
+            for code, scene_id in enumerate(self._vocabulary)
+            if scene_filter_fn(scene_id)
+        ]
+        return np.flatnonzero(np.isin(self.scene_codes, codes))
+
+    def scene_grouping_order(
+        self, indices: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        r"""Returns the order that groups the episodes, or the episodes at
+        :p:`indices`, by scene. Scenes are ordered by their first episode and
+        the episodes of a scene keep their order.
+        """
+        codes = self.scene_codes
+        if indices is not None:
+            codes = codes[indices]
+        return _scene_grouping_order(codes)
+
+    def take(
+        self, indices: np.ndarray, episodes: Sequence[Episode]
+    ) -> "SceneEpisodeIndex":
+        r"""Returns the index of :p:`episodes`, the indexed episodes at
+        :p:`indices`.
+        """
+        return SceneEpisodeIndex(
+            episodes, self._vocabulary, self.scene_codes[indices]
+        )
+
+
 class Dataset(Generic[T]):
-    r"""Base class for dataset specification."""
+    r"""Base class for dataset specification.
+
+    The episodes are either a list or, for datasets loaded from a columnar
+    episode store, a :ref:`ColumnarEpisodes` that materializes them lazily.
+    The dataset keeps an index of its episodes by scene, see
+    :ref:`scene_index`.
+    """
     episodes: List[T]
 
     @staticmethod
@@ -151,6 +304,75 @@ class Dataset(Generic[T]):
 
         return _filter
 
+    def _apply_content_scenes_filter(self, config: "DictConfig") -> None:
+        r"""Keeps the episodes that are valid under the content_scenes field
+        of config, like :ref:`build_content_scenes_filter`, but checks each
+        scene only once.
+        """
+        scenes_to_load = set(config.content_scenes)
+        if ALL_SCENES_MASK in scenes_to_load:
+            return
+        self._set_episodes(
+            *self._take_episodes(
+                self.scene_index.select_scenes(
+                    lambda scene_id: self.scene_from_scene_path(scene_id)
+                    in scenes_to_load
+                )
+            )
+        )
+
+    @property
+    def scene_index(self) -> SceneEpisodeIndex:
+        r"""Index of the episodes by scene.
+
+        Episodes appended to :ref:`episodes` are indexed incrementally, the
+        index is rebuilt when the episodes are assigned or shrink. Assign the
+        episodes again after modifying them in any other way.
+        """
+        index = self.__dict__.get("_scene_index")
+        if (
+            index is None
+            or index.episodes is not self.episodes
+            or len(index) > len(self.episodes)
+        ):
+            if isinstance(self.episodes, ColumnarEpisodes):
+                index = SceneEpisodeIndex(
+                    self.episodes,
+                    self.episodes.scene_id_vocabulary,
+                    self.episodes.scene_codes,
+                )
+            else:
+                index = SceneEpisodeIndex(self.episodes)
+            self._scene_index = index
+        else:
+            index.update()
+        return index
+
+    def _episodes_at(self, indices: np.ndarray) -> Sequence[T]:
+        if isinstance(self.episodes, ColumnarEpisodes):
+            return self.episodes.take(indices)
+        return [self.episodes[i] for i in indices]
+
+    def _take_episodes(
+        self, indices: np.ndarray
+    ) -> Tuple[Sequence[T], SceneEpisodeIndex]:
+        r"""Returns the episodes at indices and their scene index."""
+        episodes = self._episodes_at(indices)
+        return episodes, self.scene_index.take(indices, episodes)
+
+    def _set_episodes(
+        self, episodes: Sequence[T], scene_index: SceneEpisodeIndex
+    ) -> None:
+        self.episodes = episodes  # type: ignore[assignment]
+        self._scene_index = scene_index
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The index is rebuilt when needed rather than serialized
+        return {k: v for k, v in self.__dict__.items() if k != "_scene_index"}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+
     @property
     def num_episodes(self) -> int:
         r"""number of episodes in the dataset"""
@@ -159,7 +381,7 @@ class Dataset(Generic[T]):
     @property
     def scene_ids(self) -> List[str]:
         r"""unique scene ids present in the dataset."""
-        return sorted({episode.scene_id for episode in self.episodes})
+        return self.scene_index.scene_ids()
 
     def get_scene_episodes(self, scene_id: str) -> List[T]:
         r"""..
@@ -168,7 +390,7 @@ class Dataset(Generic[T]):
         :return: list of episodes for the :p:`scene_id`.
         """
         return list(
-            filter(lambda x: x.scene_id == scene_id, iter(self.episodes))
+            self._episodes_at(self.scene_index.episode_indices(scene_id))
         )
 
     def get_episodes(self, indexes: List[int]) -> List[T]:
@@ -191,6 +413,7 @@ class Dataset(Generic[T]):
         subclass, create a customized iterator class like
         :ref:`EpisodeIterator` and override this method.
         """
+        kwargs.setdefault("scene_codes", self.scene_index.scene_codes)
         return EpisodeIterator(self.episodes, *args, **kwargs)
 
     def to_json(self) -> str:
@@ -218,12 +441,13 @@ class Dataset(Generic[T]):
         :param filter_fn: function used to filter the episodes.
         :return: the new dataset.
         """
-        new_episodes = []
-        for episode in self.episodes:
-            if filter_fn(episode):
-                new_episodes.append(episode)
+        keep = np.fromiter(
+            (bool(filter_fn(episode)) for episode in self.episodes),
+            dtype=bool,
+            count=len(self.episodes),
+        )
         new_dataset = copy.copy(self)
-        new_dataset.episodes = new_episodes
+        new_dataset._set_episodes(*self._take_episodes(np.flatnonzero(keep)))
         return new_dataset
 
     def get_splits(
@@ -280,8 +504,6 @@ class Dataset(Generic[T]):
                     "Not enough episodes to create those many splits."
                 )
 
-        new_datasets = []
-
         if episodes_per_split is not None:
             stride = episodes_per_split
         else:
@@ -297,32 +519,44 @@ class Dataset(Generic[T]):
 
         rand_items = np.random.choice(
             self.num_episodes, num_episodes, replace=False
-        ).tolist()
+        )
         if collate_scene_ids:
-            scene_ids: Dict[str, List[int]] = {}
-            for rand_ind in rand_items:
-                scene = self.episodes[rand_ind].scene_id
-                if scene not in scene_ids:
-                    scene_ids[scene] = []
-                scene_ids[scene].append(rand_ind)
-            rand_items = []
-            list(map(rand_items.extend, scene_ids.values()))
-        ep_ind = 0
-        new_episodes = []
-        for nn in range(num_splits):
+            rand_items = rand_items[
+                self.scene_index.scene_grouping_order(rand_items)
+            ]
+
+        new_datasets = []
+        split_indices = []
+        start = 0
+        for split_length in split_lengths:
+            indices = rand_items[start : start + split_length]
+            start += split_length
+            if sort_by_episode_id:
+                indices = indices[self._episode_id_order(indices)]
             new_dataset = copy.copy(self)  # Creates a shallow copy
-            new_dataset.episodes = []
+            new_dataset._set_episodes(*self._take_episodes(indices))
             new_datasets.append(new_dataset)
-            for _ii in range(split_lengths[nn]):
-                new_dataset.episodes.append(self.episodes[rand_items[ep_ind]])
-                ep_ind += 1
-            if sort_by_episode_id:
-                new_dataset.episodes.sort(key=lambda ep: ep.episode_id)
-            new_episodes.extend(new_dataset.episodes)
+            split_indices.append(indices)
         if remove_unused_episodes:
-            self.episodes = new_episodes
+            self._set_episodes(
+                *self._take_episodes(np.concatenate(split_indices))
+            )
         return new_datasets
 
+    def _episode_id_order(self, indices: np.ndarray) -> np.ndarray:
+        r"""Returns the stable order that sorts the episodes at indices by
+        episode id.
+        """
+        if isinstance(self.episodes, ColumnarEpisodes):
+            return np.argsort(
+                self.episodes.episode_ids[indices], kind="stable"
+            )
+        episode_ids = [self.episodes[i].episode_id for i in indices]
+        return np.array(
+            sorted(range(len(indices)), key=episode_ids.__getitem__),
+            dtype=np.int64,
+        )
+
 
 class EpisodeIterator(Iterator[T]):
     r"""Episode Iterator class that gives options for how a list of episodes
@@ -363,6 +597,7 @@ class EpisodeIterator(Iterator[T]):
         num_episode_sample: int = -1,
         step_repetition_range: float = 0.2,
         seed: int = None,
+        scene_codes: Optional[np.ndarray] = None,
     ) -> None:
         r"""..
 
@@ -384,6 +619,9 @@ class EpisodeIterator(Iterator[T]):
             [1 - step_repeat_range, 1 + step_repeat_range] * max_scene_repeat_steps
             on each scene switch.  This stops all workers from swapping scenes at
             the same time
+        :param scene_codes: codes identifying the scene of each episode, e.g.
+            from :ref:`SceneEpisodeIndex`, that avoid reading the scene ids of
+            all the episodes to group them.
         """
         if seed:
             random.seed(seed)
@@ -391,23 +629,33 @@ class EpisodeIterator(Iterator[T]):
 
         # sample episodes
         if num_episode_sample >= 0:
-            episodes = np.random.choice(  # type: ignore[assignment]
-                episodes, num_episode_sample, replace=False  # type: ignore[arg-type]
+            sample = np.random.choice(
+                len(episodes), num_episode_sample, replace=False
             )
-
-        if not isinstance(episodes, list):
+            if isinstance(episodes, ColumnarEpisodes):
+                episodes = episodes.take(sample)
+            else:
+                episodes = [episodes[i] for i in sample]
+            if scene_codes is not None:
+                scene_codes = scene_codes[sample]
+
+        # Columnar episodes are kept as is so that they are only
+        # materialized when they are iterated
+        if not isinstance(episodes, (list, ColumnarEpisodes)):
             episodes = list(episodes)
 
-        self.episodes = episodes
+        self.episodes = episodes  # type: ignore[assignment]
         self.cycle = cycle
         self.group_by_scene = group_by_scene
         self.shuffle = shuffle
 
         if shuffle:
-            random.shuffle(self.episodes)
+            self.episodes, scene_codes = self._shuffled(
+                self.episodes, scene_codes
+            )
 
         if group_by_scene:
-            self.episodes = self._group_scenes(self.episodes)
+            self.episodes = self._group_scenes(self.episodes, scene_codes)
 
         self.max_scene_repetition_episodes = max_scene_repeat_episodes
         self.max_scene_repetition_steps = max_scene_repeat_steps
@@ -457,6 +705,19 @@ class EpisodeIterator(Iterator[T]):
         r"""Internal method to switch the scene. Moves remaining episodes
         from current scene to the end and switch to next scene episodes.
         """
+        if isinstance(self._iterator, ColumnarEpisodesIterator):
+            remaining = self._iterator.remaining()
+            codes = remaining.scene_codes
+            scene_changes = np.flatnonzero(codes != codes[:1])
+            if len(scene_changes) > 0:
+                # Move the current scene group to the end
+                first_group_len = scene_changes[0]
+                remaining = remaining.take(
+                    np.roll(np.arange(len(remaining)), -first_group_len)
+                )
+            self._iterator = iter(remaining)
+            return
+
         grouped_episodes = [
             list(g)
             for k, g in groupby(self._iterator, key=lambda x: x.scene_id)
@@ -473,17 +734,39 @@ class EpisodeIterator(Iterator[T]):
         If self.group_by_scene is true, then shuffle groups of scenes.
         """
         assert self.shuffle
-        episodes = list(self._iterator)
+        if isinstance(self._iterator, ColumnarEpisodesIterator):
+            episodes = self._iterator.remaining()
+        else:
+            episodes = list(self._iterator)
 
-        random.shuffle(episodes)
+        episodes, _ = self._shuffled(episodes)
 
         if self.group_by_scene:
             episodes = self._group_scenes(episodes)
 
         self._iterator = iter(episodes)
 
+    @staticmethod
+    def _shuffled(
+        episodes, scene_codes: Optional[np.ndarray] = None
+    ) -> Tuple[Sequence[T], Optional[np.ndarray]]:
+        r"""Internal method that shuffles a list of episodes in place or
+        returns a shuffled view of columnar episodes. The scene codes of the
+        episodes, if given, are shuffled alike.
+        """
+        if isinstance(episodes, ColumnarEpisodes):
+            return episodes.take(np.random.permutation(len(episodes))), None
+        if scene_codes is None:
+            random.shuffle(episodes)
+            return episodes, None
+        order = list(range(len(episodes)))
+        random.shuffle(order)
+        return [episodes[i] for i in order], scene_codes[order]
+
     def _group_scenes(
-        self, episodes: Union[Sequence[Episode], List[Episode], ndarray]
+        self,
+        episodes: Union[Sequence[Episode], List[Episode], ndarray],
+        scene_codes: Optional[np.ndarray] = None,
     ) -> List[T]:
         r"""Internal method that groups episodes by scene
         Groups will be ordered by the order the first episode of a given
@@ -494,12 +777,15 @@ class EpisodeIterator(Iterator[T]):
         """
         assert self.group_by_scene
 
-        scene_sort_keys: Dict[str, int] = {}
-        for e in episodes:
-            if e.scene_id not in scene_sort_keys:
-                scene_sort_keys[e.scene_id] = len(scene_sort_keys)
+        if isinstance(episodes, ColumnarEpisodes):
+            return episodes.take(  # type: ignore[return-value]
+                _scene_grouping_order(episodes.scene_codes)
+            )
+
+        if scene_codes is None:
+            scene_codes = SceneEpisodeIndex(episodes).scene_codes
 
-        return sorted(episodes, key=lambda e: scene_sort_keys[e.scene_id])  # type: ignore[arg-type]
+        return [episodes[i] for i in _scene_grouping_order(scene_codes)]
 
     def step_taken(self) -> None:
         self._step_count += 1
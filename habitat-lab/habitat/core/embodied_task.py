@@ -9,7 +9,17 @@ r"""Implements task and measurements needed for training and benchmarking of
 
 import time
 from collections import OrderedDict
-from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
 import numpy as np
 from omegaconf import OmegaConf
@@ -93,11 +103,19 @@ class Measure:
     :ref:`update_metric()` method and the user is also required to set the
     :ref:`uuid <Measure.uuid>` and :ref:`_metric` attributes.
 
+    A measure whose metric only depends on the current step can set
+    :ref:`is_lazy`, then :ref:`update_metric()` is only called on the steps
+    where the metric is read, by another measure or through
+    :ref:`get_metric()`, which must then happen before the next step.
+
     .. (uuid is a builtin Python module, so just :ref:`uuid` would link there)
     """
 
     _metric: Any
     uuid: str
+    is_lazy: bool = False
+    # Arguments of the deferred update of a lazy measure
+    _pending_update: Optional[Tuple[Tuple[Any, ...], Dict[str, Any]]] = None
 
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         self.uuid = self._get_uuid(*args, **kwargs)
@@ -123,6 +141,12 @@ class Measure:
 
         :return: the current metric for :ref:`Measure`.
         """
+        if self._pending_update is not None:
+            args, kwargs = self._pending_update
+            self._pending_update = None
+            t_start = time.time()
+            self.update_metric(*args, **kwargs)
+            kwargs["task"].add_perf_timing(f"measures.{self.uuid}", t_start)
         return self._metric
 
 
@@ -141,12 +165,38 @@ class Metrics(dict):
         super().__init__(data)
 
 
+class MeasureStepContext:
+    r"""Values shared by the measures during one update of the measures, such
+    as simulator queries read by several measures. Each value is computed the
+    first time it is requested after an update or reset of the measures.
+    """
+
+    def __init__(self) -> None:
+        self._values: Dict[str, Any] = {}
+
+    def get(self, key: str, compute_fn: Callable[[], Any]) -> Any:
+        r"""Returns the value of key for the current step, computed with
+        :py:`compute_fn` if it was not requested yet. The value is shared and
+        must not be modified.
+        """
+        if key not in self._values:
+            self._values[key] = compute_fn()
+        return self._values[key]
+
+    def clear(self) -> None:
+        self._values.clear()
+
+
 class Measurements:
     r"""Represents a set of Measures, with each :ref:`Measure` being
     identified through a unique id.
+
+    :data step_context: values shared by the measures during the current
+        update of the measures.
     """
 
     measures: Dict[str, Measure]
+    step_context: MeasureStepContext
 
     def __init__(self, measures: Iterable[Measure]) -> None:
         """Constructor
@@ -160,13 +210,26 @@ class Measurements:
                 measure.uuid not in self.measures
             ), "'{}' is duplicated measure uuid".format(measure.uuid)
             self.measures[measure.uuid] = measure
+        self.step_context = MeasureStepContext()
 
     def reset_measures(self, *args: Any, **kwargs: Any) -> None:
+        self.step_context.clear()
+        for measure in self.measures.values():
+            measure._pending_update = None
         for measure in self.measures.values():
             measure.reset_metric(*args, **kwargs)
 
     def update_measures(self, *args: Any, task, **kwargs: Any) -> None:
+        self.step_context.clear()
+        # Lazy measures are only updated when their metric is read, so the
+        # update of the previous step is dropped if nothing read it.
+        for measure in self.measures.values():
+            measure._pending_update = (
+                (args, dict(kwargs, task=task)) if measure.is_lazy else None
+            )
         for measure in self.measures.values():
+            if measure.is_lazy:
+                continue
             t_start = time.time()
             measure.update_metric(*args, task=task, **kwargs)
             measure_name = measure._get_uuid(*args, task=task, **kwargs)
@@ -15,6 +15,7 @@ import numpy as np
 import quaternion  # noqa: F401
 from omegaconf import OmegaConf
 
+from habitat.core.columnar_episodes import ColumnarEpisodes
 from habitat.utils.geometry_utils import quaternion_to_list
 
 # Internals from inner json library needed for patching functionality in
@@ -126,6 +127,8 @@ class DatasetJSONEncoder(json.JSONEncoder):
             return OmegaConf.to_container(obj)
         if dataclasses.is_dataclass(obj):
             return dataclasses.asdict(obj)
+        if isinstance(obj, ColumnarEpisodes):
+            return list(obj)
 
         return (
             obj.__getstate__()
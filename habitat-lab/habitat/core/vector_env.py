@@ -5,8 +5,12 @@
 # LICENSE file in the root directory of this source tree.
 
 import signal
+import time
 import warnings
+from collections import deque
+from functools import partial
 from multiprocessing.connection import Connection
+from multiprocessing.connection import wait as wait_connections
 from multiprocessing.context import BaseContext
 from queue import Queue
 from threading import Thread
@@ -14,6 +18,7 @@ from typing import (
     TYPE_CHECKING,
     Any,
     Callable,
+    Deque,
     Dict,
     Iterator,
     List,
@@ -65,6 +70,9 @@ RENDER_COMMAND = "render"
 CLOSE_COMMAND = "close"
 CALL_COMMAND = "call"
 COUNT_EPISODES_COMMAND = "count_episodes"
+SET_OBSERVATION_BUFFERS_COMMAND = "set_observation_buffers"
+HANDSHAKE_COMMAND = "handshake"
+SKIP_EPISODES_COMMAND = "skip_episodes"
 
 EPISODE_OVER_NAME = "episode_over"
 GET_METRICS_NAME = "get_metrics"
@@ -73,6 +81,11 @@ NUMBER_OF_EPISODE_NAME = "number_of_episodes"
 ACTION_SPACE_NAME = "action_space"
 ORIG_ACTION_SPACE_NAME = "original_action_space"
 OBSERVATION_SPACE_NAME = "observation_space"
+# Key set in the info of a step that was interrupted by the respawn of the
+# worker hosting the env
+RESPAWNED_INFO_KEY = "vector_env_respawned"
+# Number of times a worker is respawned in a row before giving up
+MAX_RESPAWN_ATTEMPTS = 3
 
 
 def _make_env_fn(
@@ -92,6 +105,213 @@ def _make_env_fn(
     return habitat_env
 
 
+def _write_observation_buffers(
+    observation_buffers: Dict[str, np.ndarray], observations: Dict[str, Any]
+) -> None:
+    r"""Copies the observations of a worker into its slice of the shared
+    observation buffers. The observations are then sent as :py:`None` as the
+    parent process reads them from the shared memory directly.
+    """
+    for sensor_name, buffer in observation_buffers.items():
+        buffer[...] = observations[sensor_name]
+
+
+def _skip_episodes(env: Any, num_episodes: int) -> None:
+    r"""Moves the episode iterator of a newly created env past the
+    num_episodes episodes already started by the env it replaces, so that
+    its next reset starts the following episode.
+
+    The env already took its first episode from the iterator when it was
+    created, and keeps it for its first reset. So num_episodes - 1 episodes
+    are skipped and the next one is set as the current episode.
+    """
+    if num_episodes == 0:
+        return
+    unwrapped = getattr(env, "unwrapped", env)
+    habitat_env = getattr(unwrapped, "habitat_env", unwrapped)
+    episode_iterator = getattr(habitat_env, "episode_iterator", None)
+    if episode_iterator is None:
+        logger.warning(
+            "Respawned env has no episode iterator, it restarts from its"
+            " first episode"
+        )
+        return
+    try:
+        for _ in range(num_episodes - 1):
+            next(episode_iterator)
+        habitat_env.current_episode = next(episode_iterator)
+    except StopIteration:
+        return
+
+
+@attr.s(auto_attribs=True, slots=True)
+class _InFlight:
+    r"""Message sent to a worker whose reply has not been read yet."""
+    messages: List[Tuple[int, str, Any]]
+    sent_time: float
+    # Whether the message was replayed on a respawned worker, in which case
+    # steps were replaced by resets
+    replayed: bool = False
+
+
+@attr.s(auto_attribs=True, slots=True)
+class _WorkerGroup:
+    r"""Connection to a worker process that hosts one or more environments.
+
+    The commands for the environments of the group are queued and sent as a
+    single message once every active environment of the group has one,
+    or when the result of a queued command is needed. The worker answers
+    each message with a single reply holding the result of every command.
+
+    If the worker dies or does not reply within timeout seconds, it is
+    replaced by calling respawn_fn and the messages that were not answered
+    are sent again to the new worker, with steps replaced by resets.
+    """
+    read_fn: Callable[[], Any]
+    write_fn: Callable[[Any], None]
+    num_envs: int
+    # Object to wait on for the replies of the worker, see
+    # :ref:`VectorEnv._wait_for_replies`
+    connection: Any = None
+    process: Any = None
+    num_paused: int = 0
+    respawn_fn: Optional[Callable[["_WorkerGroup"], None]] = None
+    timeout: Optional[float] = None
+    auto_reset_done: bool = True
+    num_respawns: int = attr.ib(init=False, default=0)
+    _queued: List[Tuple[int, str, Any]] = attr.ib(init=False, factory=list)
+    _in_flight: Deque[_InFlight] = attr.ib(init=False, factory=deque)
+    _results: Dict[int, Any] = attr.ib(init=False, factory=dict)
+    # Number of episodes started by the env in each slot
+    _episodes_started: Dict[int, int] = attr.ib(init=False, factory=dict)
+
+    def send(self, slot: int, command_data: Tuple[str, Any]) -> None:
+        command, data = command_data
+        self._queued.append((slot, command, data))
+        if len(self._queued) == self.num_envs - self.num_paused:
+            self.flush()
+
+    def flush(self) -> None:
+        if len(self._queued) == 0:
+            return
+
+        messages = self._queued
+        self._queued = []
+        self._in_flight.append(_InFlight(messages, time.monotonic()))
+        try:
+            self.write_fn(messages)
+        except OSError:
+            if self.respawn_fn is None:
+                raise
+            self._respawn()
+
+    def has_result(self, slot: int) -> bool:
+        return slot in self._results
+
+    def reply_deadline(self) -> Optional[float]:
+        r"""Time by which the oldest reply must be received before the
+        worker is considered hung, None if there is no such limit.
+        """
+        if self.timeout is None or len(self._in_flight) == 0:
+            return None
+        return self._in_flight[0].sent_time + self.timeout
+
+    def read_reply(self) -> None:
+        r"""Reads the oldest reply of the worker and stores its results."""
+        try:
+            deadline = self.reply_deadline()
+            if deadline is not None and not self.connection.poll(
+                max(deadline - time.monotonic(), 0.0)
+            ):
+                raise TimeoutError(
+                    f"Worker did not reply within {self.timeout} seconds"
+                )
+            results = self.read_fn()
+        except (EOFError, OSError):
+            if self.respawn_fn is None:
+                raise
+            self._respawn()
+            return
+
+        in_flight = self._in_flight.popleft()
+        for (slot, command, _), result in zip(in_flight.messages, results):
+            if in_flight.replayed and command == STEP_COMMAND:
+                # The step was replaced by a reset, report it as the end of
+                # the interrupted episode
+                result = (result, 0.0, True, {RESPAWNED_INFO_KEY: True})
+            if command == RESET_COMMAND or (
+                command == STEP_COMMAND
+                and (
+                    in_flight.replayed or (self.auto_reset_done and result[2])
+                )
+            ):
+                self._episodes_started[slot] = (
+                    self._episodes_started.get(slot, 0) + 1
+                )
+            self._results[slot] = result
+
+    def _respawn(self) -> None:
+        r"""Replaces the worker and sends it the messages that were not
+        answered.
+        """
+        assert self.respawn_fn is not None
+        for _ in range(MAX_RESPAWN_ATTEMPTS):
+            self.num_respawns += 1
+            try:
+                self.respawn_fn(self)
+                self.write_fn(
+                    [
+                        (
+                            slot,
+                            SKIP_EPISODES_COMMAND,
+                            self._episodes_started.get(slot, 0),
+                        )
+                        for slot in range(self.num_envs)
+                    ]
+                )
+                if self.timeout is not None and not self.connection.poll(
+                    self.timeout
+                ):
+                    raise TimeoutError(
+                        f"Respawned worker did not reply within {self.timeout} seconds"
+                    )
+                self.read_fn()
+
+                for in_flight in self._in_flight:
+                    self.write_fn(
+                        [
+                            (slot, RESET_COMMAND, None)
+                            if command == STEP_COMMAND
+                            else (slot, command, data)
+                            for slot, command, data in in_flight.messages
+                        ]
+                    )
+            except (EOFError, OSError):
+                # The new worker died too, try again with another one
+                continue
+
+            for in_flight in self._in_flight:
+                in_flight.sent_time = time.monotonic()
+                in_flight.replayed = True
+            return
+
+        raise RuntimeError(
+            f"Could not respawn the worker in {MAX_RESPAWN_ATTEMPTS} attempts"
+        )
+
+    def recv(self, slot: int) -> Any:
+        if slot not in self._results:
+            self.flush()
+        while slot not in self._results:
+            self.read_reply()
+
+        return self._results.pop(slot)
+
+    def close(self) -> None:
+        self.flush()
+        self.write_fn([(0, CLOSE_COMMAND, None)])
+
+
 @attr.s(auto_attribs=True, slots=True)
 class _ReadWrapper:
     r"""Convenience wrapper to track if a connection to a worker process
@@ -150,7 +370,12 @@ class VectorEnv:
     _mp_ctx: BaseContext
     _connection_read_fns: List[_ReadWrapper]
     _connection_write_fns: List[_WriteWrapper]
+    _worker_groups: List[_WorkerGroup]
+    _env_groups: List[Tuple[_WorkerGroup, int]]
+    _envs_per_worker: int
     _batch_renderer: Optional[EnvBatchRenderer] = None
+    _observation_buffers: Optional[Dict[str, "torch.Tensor"]] = None
+    _observation_views: List[Dict[str, np.ndarray]]
 
     def __init__(
         self,
@@ -159,6 +384,10 @@ class VectorEnv:
         auto_reset_done: bool = True,
         multiprocessing_start_method: str = "forkserver",
         workers_ignore_signals: bool = False,
+        shared_memory_observations: bool = False,
+        envs_per_worker: int = 1,
+        respawn_workers: bool = False,
+        worker_timeout: Optional[float] = None,
     ) -> None:
         """..
 
@@ -176,6 +405,27 @@ class VectorEnv:
             used, the subproccess  must be started before any other GPU usage.
         :param workers_ignore_signals: Whether or not workers will ignore SIGINT and SIGTERM
             and instead will only exit when :ref:`close` is called
+        :param shared_memory_observations: Whether or not workers write their
+            observations directly into shared memory buffers laid out from
+            the observation space. Only the reward, done and info are then
+            sent through the pipe and the observations returned by
+            :ref:`step` and :ref:`reset` are views into these buffers that
+            are only valid until the env is stepped again. Requires torch
+            and an observation space made of :ref:`spaces.Box`.
+        :param envs_per_worker: number of environments hosted by each worker
+            process. The commands sent to the environments of a worker are
+            batched into a single message, which cuts down the number of
+            processes and messages when running many environments.
+        :param respawn_workers: Whether or not a worker that dies or hangs is
+            replaced by a new one, created from the same env_fn_args, instead
+            of raising an error. A step interrupted by the respawn returns
+            the first observation of the next episode, a reward of 0, done
+            and :py:`{RESPAWNED_INFO_KEY: True}` as info.
+            See :ref:`num_respawns`.
+        :param worker_timeout: maximum time in seconds to wait for the
+            reply of a worker before it is considered hung. It must cover the
+            slowest command, e.g. a reset that loads a new scene, but the
+            creation of the environments is not timed. None waits forever.
         """
         self._is_closed = True
 
@@ -185,10 +435,15 @@ class VectorEnv:
 
         self._num_envs = len(env_fn_args)
 
+        assert envs_per_worker > 0, "envs_per_worker must be strictly positive"
+        self._envs_per_worker = envs_per_worker
+
         assert multiprocessing_start_method in self._valid_start_methods, (
             "multiprocessing_start_method must be one of {}. Got '{}'"
         ).format(self._valid_start_methods, multiprocessing_start_method)
         self._auto_reset_done = auto_reset_done
+        self._respawn_workers = respawn_workers
+        self._worker_timeout = worker_timeout
         self._mp_ctx = mp.get_context(multiprocessing_start_method)
         self._workers = []
         (
@@ -201,48 +456,146 @@ class VectorEnv:
         )
 
         self._is_closed = False
+        self._paused: List[Tuple] = []
 
         for write_fn in self._connection_write_fns:
-            write_fn((CALL_COMMAND, (OBSERVATION_SPACE_NAME, None)))
+            write_fn((HANDSHAKE_COMMAND, None))
+        handshakes = [read_fn() for read_fn in self._connection_read_fns]
         self.observation_spaces = [
-            read_fn() for read_fn in self._connection_read_fns
-        ]
-        for write_fn in self._connection_write_fns:
-            write_fn((CALL_COMMAND, (ACTION_SPACE_NAME, None)))
-        self.action_spaces = [
-            read_fn() for read_fn in self._connection_read_fns
+            h[OBSERVATION_SPACE_NAME] for h in handshakes
         ]
-
-        for write_fn in self._connection_write_fns:
-            write_fn((CALL_COMMAND, (ORIG_ACTION_SPACE_NAME, None)))
+        self.action_spaces = [h[ACTION_SPACE_NAME] for h in handshakes]
         self.orig_action_spaces = [
-            read_fn() for read_fn in self._connection_read_fns
+            h[ORIG_ACTION_SPACE_NAME] for h in handshakes
         ]
-
-        for write_fn in self._connection_write_fns:
-            write_fn((CALL_COMMAND, (NUMBER_OF_EPISODE_NAME, None)))
         self.number_of_episodes = [
-            read_fn() for read_fn in self._connection_read_fns
+            h[NUMBER_OF_EPISODE_NAME] for h in handshakes
         ]
-        self._paused: List[Tuple] = []
+
+        if shared_memory_observations:
+            self._init_observation_buffers()
+
+        # Creating the environments can take long, so the workers are only
+        # timed from now on
+        for group in self._worker_groups:
+            group.timeout = worker_timeout
 
     @property
     def num_envs(self):
         r"""number of individual environments."""
         return self._num_envs - len(self._paused)
 
+    @property
+    def num_respawns(self) -> int:
+        r"""Number of workers that were respawned after dying or hanging."""
+        return sum(group.num_respawns for group in self._worker_groups)
+
+    @property
+    def has_shared_observations(self) -> bool:
+        r"""Whether the observations are transported through shared memory.
+        See :ref:`shared_observations`.
+        """
+        return self._observation_buffers is not None
+
+    def _init_observation_buffers(self) -> None:
+        r"""Allocates one shared memory buffer per sensor, with room for the
+        observations of every env, and hands each worker its slice.
+        """
+        if torch is None:
+            raise RuntimeError(
+                "Shared memory observations require torch to be installed"
+            )
+
+        observation_buffers = {}
+        for sensor_name, space in self.observation_spaces[0].spaces.items():
+            if not isinstance(space, spaces.Box):
+                raise ValueError(
+                    "Shared memory observations only support Box spaces, but"
+                    f" '{sensor_name}' is a {type(space).__name__} space"
+                )
+            observation_buffers[sensor_name] = torch.from_numpy(
+                np.zeros((self._num_envs, *space.shape), dtype=space.dtype)
+            ).share_memory_()
+
+        self._observation_buffers = observation_buffers
+        numpy_buffers = {k: v.numpy() for k, v in observation_buffers.items()}
+        self._observation_views = [
+            {k: v[rank] for k, v in numpy_buffers.items()}
+            for rank in range(self._num_envs)
+        ]
+
+        for write_fn in self._connection_write_fns:
+            rank = write_fn.read_wrapper.rank
+            write_fn(
+                (
+                    SET_OBSERVATION_BUFFERS_COMMAND,
+                    {k: v[rank] for k, v in observation_buffers.items()},
+                )
+            )
+        for read_fn in self._connection_read_fns:
+            read_fn()
+
+    def shared_observations(
+        self, index: Union[slice, Sequence[int]] = slice(None)
+    ) -> Dict[str, "torch.Tensor"]:
+        r"""Returns the batched observations of the active envs as tensors.
+
+        When no env is paused this is a view into the shared memory buffers,
+        so no copy is made, and it is only valid until the envs are stepped
+        again. Requires the :py:`shared_memory_observations` mode.
+
+        :param index: slice or indices of the active envs to return the
+            observations of.
+        """
+        assert (
+            self._observation_buffers is not None
+        ), "VectorEnv was not created with shared_memory_observations=True"
+        if isinstance(index, slice):
+            read_fns = self._connection_read_fns[index]
+        else:
+            read_fns = [self._connection_read_fns[i] for i in index]
+        ranks = [read_fn.rank for read_fn in read_fns]
+        rank_index: Union[slice, "torch.Tensor"]
+        if len(ranks) == 0 or ranks == list(
+            range(ranks[0], ranks[0] + len(ranks))
+        ):
+            start = ranks[0] if len(ranks) > 0 else 0
+            rank_index = slice(start, start + len(ranks))
+        else:
+            rank_index = torch.tensor(ranks, dtype=torch.long)
+
+        return {k: v[rank_index] for k, v in self._observation_buffers.items()}
+
+    def _read_observations_at(self, index_env: int) -> Any:
+        r"""Reads a reply holding observations from the index_env environment
+        and substitutes the shared memory views if observations are not sent
+        through the pipe.
+        """
+        read_fn = self._connection_read_fns[index_env]
+        result = read_fn()
+        if self._observation_buffers is None:
+            return result
+
+        observations = self._observation_views[read_fn.rank]
+        if isinstance(result, tuple):
+            return (observations, *result[1:])
+        else:
+            return observations
+
     @staticmethod
     def _worker_env(
         connection_read_fn: Callable,
         connection_write_fn: Callable,
         env_fn: Callable,
-        env_fn_args: Tuple[Any],
+        env_fn_args: Sequence[Tuple],
         auto_reset_done: bool,
         mask_signals: bool = False,
         child_pipe: Optional[Connection] = None,
         parent_pipe: Optional[Connection] = None,
     ) -> None:
-        r"""process worker for creating and interacting with the environment."""
+        r"""process worker for creating and interacting with the environments
+        of a worker group.
+        """
         if mask_signals:
             signal.signal(signal.SIGINT, signal.SIG_IGN)
             signal.signal(signal.SIGTERM, signal.SIG_IGN)
@@ -250,55 +603,110 @@ class VectorEnv:
             signal.signal(signal.SIGUSR1, signal.SIG_IGN)
             signal.signal(signal.SIGUSR2, signal.SIG_IGN)
 
-        env = EnvCountEpisodeWrapper(EnvObsDictWrapper(env_fn(*env_fn_args)))
+        envs = [
+            EnvCountEpisodeWrapper(EnvObsDictWrapper(env_fn(*args)))
+            for args in env_fn_args
+        ]
         if parent_pipe is not None:
             parent_pipe.close()
+        observation_buffers: List[Optional[Dict[str, np.ndarray]]] = [
+            None for _ in envs
+        ]
         try:
-            command, data = connection_read_fn()
-            while command != CLOSE_COMMAND:
-                if command == STEP_COMMAND:
-                    observations, reward, done, info = env.step(data)
+            commands = connection_read_fn()
+            while commands[0][1] != CLOSE_COMMAND:
+                results = []
+                for slot, command, data in commands:
+                    if command == SET_OBSERVATION_BUFFERS_COMMAND:
+                        observation_buffers[slot] = {
+                            k: v.numpy() for k, v in data.items()
+                        }
+                        results.append(None)
+                    else:
+                        results.append(
+                            VectorEnv._worker_run_command(
+                                envs[slot],
+                                command,
+                                data,
+                                auto_reset_done,
+                                observation_buffers[slot],
+                            )
+                        )
 
-                    if auto_reset_done and done:
-                        observations = env.reset()
+                connection_write_fn(results)
 
-                    connection_write_fn((observations, reward, done, info))
+                commands = connection_read_fn()
 
-                elif command == RESET_COMMAND:
-                    observations = env.reset()
-                    connection_write_fn(observations)
+        except KeyboardInterrupt:
+            logger.info("Worker KeyboardInterrupt")
+        finally:
+            if child_pipe is not None:
+                child_pipe.close()
+            for env in envs:
+                env.close()
 
-                elif command == RENDER_COMMAND:
-                    connection_write_fn(env.render(*data[0], **data[1]))
+    @staticmethod
+    def _worker_run_command(
+        env: EnvCountEpisodeWrapper,
+        command: str,
+        data: Any,
+        auto_reset_done: bool,
+        observation_buffers: Optional[Dict[str, np.ndarray]],
+    ) -> Any:
+        r"""Runs a single command on one of the environments of a worker and
+        returns its result.
+        """
+        if command == STEP_COMMAND:
+            observations, reward, done, info = env.step(data)
 
-                elif command == CALL_COMMAND:
-                    function_name, function_args = data
-                    if function_args is None:
-                        function_args = {}
+            if auto_reset_done and done:
+                observations = env.reset()
 
-                    result_or_fn = getattr(env, function_name)
+            if observation_buffers is not None:
+                _write_observation_buffers(observation_buffers, observations)
+                observations = None
 
-                    if len(function_args) > 0 or callable(result_or_fn):
-                        result = result_or_fn(**function_args)
-                    else:
-                        result = result_or_fn
+            return observations, reward, done, info
 
-                    connection_write_fn(result)
+        elif command == RESET_COMMAND:
+            observations = env.reset()
+            if observation_buffers is not None:
+                _write_observation_buffers(observation_buffers, observations)
+                observations = None
+            return observations
 
-                elif command == COUNT_EPISODES_COMMAND:
-                    connection_write_fn(len(env.episodes))
+        elif command == RENDER_COMMAND:
+            return env.render(*data[0], **data[1])
 
-                else:
-                    raise NotImplementedError(f"Unknown command {command}")
+        elif command == CALL_COMMAND:
+            function_name, function_args = data
+            if function_args is None:
+                function_args = {}
 
-                command, data = connection_read_fn()
+            result_or_fn = getattr(env, function_name)
 
-        except KeyboardInterrupt:
-            logger.info("Worker KeyboardInterrupt")
-        finally:
-            if child_pipe is not None:
-                child_pipe.close()
-            env.close()
+            if len(function_args) > 0 or callable(result_or_fn):
+                return result_or_fn(**function_args)
+            else:
+                return result_or_fn
+
+        elif command == COUNT_EPISODES_COMMAND:
+            return len(env.episodes)
+
+        elif command == SKIP_EPISODES_COMMAND:
+            _skip_episodes(env, data)
+            return None
+
+        elif command == HANDSHAKE_COMMAND:
+            return {
+                OBSERVATION_SPACE_NAME: env.observation_space,
+                ACTION_SPACE_NAME: env.action_space,
+                ORIG_ACTION_SPACE_NAME: env.original_action_space,
+                NUMBER_OF_EPISODE_NAME: env.number_of_episodes,
+            }
+
+        else:
+            raise NotImplementedError(f"Unknown command {command}")
 
     def _spawn_workers(
         self,
@@ -306,41 +714,155 @@ class VectorEnv:
         make_env_fn: Callable[..., Union[Env, RLEnv]] = _make_env_fn,
         workers_ignore_signals: bool = False,
     ) -> Tuple[List[_ReadWrapper], List[_WriteWrapper]]:
-        parent_connections, worker_connections = zip(
-            *[
-                [ConnectionWrapper(c) for c in self._mp_ctx.Pipe(duplex=True)]
-                for _ in range(self._num_envs)
-            ]
-        )
+        env_fn_args_groups = self._group_env_fn_args(env_fn_args)
+        self._env_fn = make_env_fn
+        self._env_fn_args_groups = env_fn_args_groups
+        self._workers_ignore_signals = workers_ignore_signals
         self._workers = []
-        for worker_conn, parent_conn, env_args in zip(
-            worker_connections, parent_connections, env_fn_args
+        group_connections = []
+        for group_env_args in env_fn_args_groups:
+            ps, parent_conn = self._start_worker(group_env_args)
+            self._workers.extend(
+                [cast(mp.Process, ps) for _ in group_env_args]
+            )
+            group_connections.append(
+                (parent_conn.recv, parent_conn.send, parent_conn, ps)
+            )
+
+        return self._connect_worker_groups(
+            group_connections, env_fn_args_groups
+        )
+
+    def _start_worker(
+        self, group_env_args: Sequence[Tuple]
+    ) -> Tuple[mp.Process, ConnectionWrapper]:
+        r"""Starts a worker process hosting the environments created from
+        group_env_args and returns it with the parent end of its pipe.
+        """
+        parent_conn, worker_conn = [
+            ConnectionWrapper(c) for c in self._mp_ctx.Pipe(duplex=True)
+        ]
+        ps = self._mp_ctx.Process(  # type: ignore[attr-defined]
+            target=self._worker_env,
+            args=(
+                worker_conn.recv,
+                worker_conn.send,
+                CloudpickleWrapper(self._env_fn),
+                group_env_args,
+                self._auto_reset_done,
+                self._workers_ignore_signals,
+                worker_conn,
+                parent_conn,
+            ),
+        )
+        ps.daemon = True
+        ps.start()
+        worker_conn.close()
+        return ps, parent_conn
+
+    def _respawn_worker_group(self, group: _WorkerGroup) -> None:
+        r"""Replaces the dead or hung worker of group by a new worker hosting
+        newly created environments.
+        """
+        group_index = next(
+            i for i, g in enumerate(self._worker_groups) if g is group
+        )
+        logger.warning(
+            f"Worker {group_index} died or hung, respawning its"
+            f" {group.num_envs} environment(s)"
+        )
+        old_process = group.process
+        if old_process.is_alive():
+            old_process.kill()
+        old_process.join()
+        group.connection.close()
+
+        ps, parent_conn = self._start_worker(
+            self._env_fn_args_groups[group_index]
+        )
+        group.read_fn = parent_conn.recv
+        group.write_fn = parent_conn.send
+        group.connection = parent_conn
+        group.process = ps
+        self._workers = [
+            ps if worker is old_process else worker for worker in self._workers
+        ]
+        self._paused = [
+            (index, read_fn, write_fn, ps if worker is old_process else worker)
+            for index, read_fn, write_fn, worker in self._paused
+        ]
+
+        if self._observation_buffers is not None:
+            ranks = [
+                rank
+                for rank, (g, _) in enumerate(self._env_groups)
+                if g is group
+            ]
+            group.write_fn(
+                [
+                    (
+                        slot,
+                        SET_OBSERVATION_BUFFERS_COMMAND,
+                        {
+                            k: v[rank]
+                            for k, v in self._observation_buffers.items()
+                        },
+                    )
+                    for slot, rank in enumerate(ranks)
+                ]
+            )
+            group.read_fn()
+
+    def _group_env_fn_args(
+        self, env_fn_args: Sequence[Tuple]
+    ) -> List[Sequence[Tuple]]:
+        r"""Splits the env_fn_args into the args of each worker group."""
+        return [
+            env_fn_args[i : i + self._envs_per_worker]
+            for i in range(0, len(env_fn_args), self._envs_per_worker)
+        ]
+
+    def _connect_worker_groups(
+        self,
+        group_connections: List[
+            Tuple[Callable[[], Any], Callable[[Any], None], Any, Any]
+        ],
+        env_fn_args_groups: List[Sequence[Tuple]],
+    ) -> Tuple[List[_ReadWrapper], List[_WriteWrapper]]:
+        r"""Creates the :ref:`_WorkerGroup` of each worker and the read and
+        write functions of each environment, which go through the group of
+        the worker hosting the environment.
+        """
+        self._worker_groups = []
+        self._env_groups = []
+        for (read_fn, write_fn, connection, worker), group_env_args in zip(
+            group_connections, env_fn_args_groups
         ):
-            ps = self._mp_ctx.Process(  # type: ignore[attr-defined]
-                target=self._worker_env,
-                args=(
-                    worker_conn.recv,
-                    worker_conn.send,
-                    CloudpickleWrapper(make_env_fn),
-                    env_args,
-                    self._auto_reset_done,
-                    workers_ignore_signals,
-                    worker_conn,
-                    parent_conn,
+            group = _WorkerGroup(
+                read_fn,
+                write_fn,
+                len(group_env_args),
+                connection,
+                worker,
+                respawn_fn=(
+                    self._respawn_worker_group
+                    if self._respawn_workers
+                    else None
                 ),
+                auto_reset_done=self._auto_reset_done,
+            )
+            self._worker_groups.append(group)
+            self._env_groups.extend(
+                [(group, slot) for slot in range(len(group_env_args))]
             )
-            self._workers.append(cast(mp.Process, ps))
-            ps.daemon = True
-            ps.start()
-            worker_conn.close()
 
         read_fns = [
-            _ReadWrapper(p.recv, rank)
-            for rank, p in enumerate(parent_connections)
+            _ReadWrapper(partial(group.recv, slot), rank)
+            for rank, (group, slot) in enumerate(self._env_groups)
         ]
         write_fns = [
-            _WriteWrapper(p.send, read_fn)
-            for p, read_fn in zip(parent_connections, read_fns)
+            _WriteWrapper(partial(group.send, slot), read_fn)
+            for (group, slot), read_fn in zip(self._env_groups, read_fns)
         ]
 
         return read_fns, write_fns
@@ -385,8 +907,8 @@ class VectorEnv:
         for write_fn in self._connection_write_fns:
             write_fn((RESET_COMMAND, None))
         results = []
-        for read_fn in self._connection_read_fns:
-            results.append(read_fn())
+        for index_env in range(self.num_envs):
+            results.append(self._read_observations_at(index_env))
         return results
 
     def reset_at(self, index_env: int):
@@ -396,7 +918,7 @@ class VectorEnv:
         :return: list containing the output of reset method of indexed env.
         """
         self._connection_write_fns[index_env]((RESET_COMMAND, None))
-        results = [self._connection_read_fns[index_env]()]
+        results = [self._read_observations_at(index_env)]
         return results
 
     def async_step_at(
@@ -407,7 +929,7 @@ class VectorEnv:
 
     @profiling_wrapper.RangeContext("wait_step_at")
     def wait_step_at(self, index_env: int) -> Any:
-        return self._connection_read_fns[index_env]()
+        return self._read_observations_at(index_env)
 
     def step_at(self, index_env: int, action: Union[int, np.ndarray]):
         r"""Step in the index_env environment in the vector.
@@ -419,6 +941,92 @@ class VectorEnv:
         self.async_step_at(index_env, action)
         return self.wait_step_at(index_env)
 
+    @profiling_wrapper.RangeContext("wait_any")
+    def wait_any(
+        self, min_ready: int = 1, timeout: Optional[float] = None
+    ) -> List[int]:
+        r"""Waits until the results of at least min_ready of the environments
+        that were sent a command are ready, instead of waiting on them in
+        index order.
+
+        :param min_ready: minimum number of environments to wait for. Clipped
+            to the number of environments that were sent a command.
+        :param timeout: maximum time to wait for, in seconds. If it expires,
+            fewer than min_ready environments may be returned.
+        :return: indices of the environments whose result is ready, in
+            increasing order. Their results can then be read without blocking,
+            for example with :ref:`wait_step_at`.
+        """
+        pending = [
+            index_env
+            for index_env, read_fn in enumerate(self._connection_read_fns)
+            if read_fn.is_waiting
+        ]
+        min_ready = min(min_ready, len(pending))
+        for group in self._worker_groups:
+            group.flush()
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            ready = []
+            waiting_groups = {}
+            for index_env in pending:
+                group, slot = self._env_groups[
+                    self._connection_read_fns[index_env].rank
+                ]
+                if group.has_result(slot):
+                    ready.append(index_env)
+                else:
+                    waiting_groups[id(group)] = group
+
+            remaining = (
+                None if deadline is None else deadline - time.monotonic()
+            )
+            if len(ready) >= min_ready or (
+                remaining is not None and remaining <= 0
+            ):
+                return ready
+
+            # Wake up in time to detect workers that hang
+            reply_deadlines = [
+                d
+                for d in (g.reply_deadline() for g in waiting_groups.values())
+                if d is not None
+            ]
+            wait_timeout = remaining
+            if len(reply_deadlines) > 0:
+                until_deadline = max(
+                    min(reply_deadlines) - time.monotonic(), 0
+                )
+                if wait_timeout is None or until_deadline < wait_timeout:
+                    wait_timeout = until_deadline
+
+            replied = self._wait_for_replies(
+                list(waiting_groups.values()), wait_timeout
+            )
+            now = time.monotonic()
+            for group in waiting_groups.values():
+                group_deadline = group.reply_deadline()
+                if any(group is g for g in replied) or (
+                    group_deadline is not None and group_deadline <= now
+                ):
+                    group.read_reply()
+
+    def _wait_for_replies(
+        self, groups: List[_WorkerGroup], timeout: Optional[float]
+    ) -> List[_WorkerGroup]:
+        r"""Blocks until at least one of the groups has a reply to read, or
+        until the timeout expires, and returns the groups with a reply.
+        """
+        ready_connections = wait_connections(
+            [group.connection for group in groups], timeout
+        )
+        return [
+            group
+            for group in groups
+            if any(group.connection is c for c in ready_connections)
+        ]
+
     def async_step(self, data: Sequence[Union[int, np.ndarray]]) -> None:
         r"""Asynchronously step in the environments.
 
@@ -466,17 +1074,15 @@ class VectorEnv:
             if read_fn.is_waiting:
                 read_fn()
 
-        for write_fn in self._connection_write_fns:
-            write_fn((CLOSE_COMMAND, None))
-
-        for _, _, write_fn, _ in self._paused:
-            write_fn((CLOSE_COMMAND, None))
-
-        for process in self._workers:
-            process.join()
+        for group in self._worker_groups:
+            group.close()
 
-        for _, _, _, process in self._paused:
-            process.join()
+        # Workers hosting several environments appear once per environment
+        joined = set()
+        for process in self._workers + [p for _, _, _, p in self._paused]:
+            if id(process) not in joined:
+                process.join()
+                joined.add(id(process))
 
         self._is_closed = True
 
@@ -496,6 +1102,7 @@ class VectorEnv:
         if self._connection_read_fns[index].is_waiting:
             self._connection_read_fns[index]()
         read_fn = self._connection_read_fns.pop(index)
+        self._env_groups[read_fn.rank][0].num_paused += 1
         write_fn = self._connection_write_fns.pop(index)
         worker = self._workers.pop(index)
         self._paused.append((index, read_fn, write_fn, worker))
@@ -506,6 +1113,7 @@ class VectorEnv:
             self._connection_read_fns.insert(index, read_fn)
             self._connection_write_fns.insert(index, write_fn)
             self._workers.insert(index, worker)
+            self._env_groups[read_fn.rank][0].num_paused -= 1
         self._paused = []
 
     def call_at(
@@ -587,6 +1195,9 @@ class VectorEnv:
 
         :param config: Base configuration."""
         assert config.habitat.simulator.renderer.enable_batch_renderer
+        assert (
+            not self.has_shared_observations
+        ), "The batch renderer does not support shared memory observations"
         self._batch_renderer = EnvBatchRenderer(config, self.num_envs)
 
     @property
@@ -637,13 +1248,19 @@ class ThreadedVectorEnv(VectorEnv):
         make_env_fn: Callable[..., Env] = _make_env_fn,
         workers_ignore_signals: bool = False,
     ) -> Tuple[List[_ReadWrapper], List[_WriteWrapper]]:
+        if self._respawn_workers or self._worker_timeout is not None:
+            raise ValueError(
+                "ThreadedVectorEnv does not support respawning workers"
+            )
+        env_fn_args_groups = self._group_env_fn_args(env_fn_args)
         queues: Iterator[Tuple[Any, ...]] = zip(
-            *[(Queue(), Queue()) for _ in range(self._num_envs)]
+            *[(Queue(), Queue()) for _ in range(len(env_fn_args_groups))]
         )
         parent_read_queues, parent_write_queues = queues
         self._workers = []
-        for parent_read_queue, parent_write_queue, env_args in zip(
-            parent_read_queues, parent_write_queues, env_fn_args
+        threads = []
+        for parent_read_queue, parent_write_queue, group_env_args in zip(
+            parent_read_queues, parent_write_queues, env_fn_args_groups
         ):
             thread = Thread(
                 target=self._worker_env,
@@ -651,20 +1268,33 @@ class ThreadedVectorEnv(VectorEnv):
                     parent_write_queue.get,
                     parent_read_queue.put,
                     make_env_fn,
-                    env_args,
+                    group_env_args,
                     self._auto_reset_done,
                 ),
             )
-            self._workers.append(thread)
+            self._workers.extend([thread for _ in group_env_args])
+            threads.append(thread)
             thread.daemon = True
             thread.start()
 
-        read_fns = [
-            _ReadWrapper(q.get, rank)
-            for rank, q in enumerate(parent_read_queues)
-        ]
-        write_fns = [
-            _WriteWrapper(q.put, read_wrapper)
-            for q, read_wrapper in zip(parent_write_queues, read_fns)
-        ]
-        return read_fns, write_fns
+        return self._connect_worker_groups(
+            [
+                (read_queue.get, write_queue.put, read_queue, thread)
+                for read_queue, write_queue, thread in zip(
+                    parent_read_queues, parent_write_queues, threads
+                )
+            ],
+            env_fn_args_groups,
+        )
+
+    def _wait_for_replies(
+        self, groups: List[_WorkerGroup], timeout: Optional[float]
+    ) -> List[_WorkerGroup]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            ready = [group for group in groups if not group.connection.empty()]
+            if len(ready) > 0 or (
+                deadline is not None and time.monotonic() >= deadline
+            ):
+                return ready
+            time.sleep(1e-4)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Script to convert a JSON episode dataset into a columnar, memory mapped
+episode store, see `habitat.core.columnar_episodes`. For example:
+```
+python -m habitat.datasets.convert_episodes_to_columnar --type ObjectNav-v1 --input data/datasets/objectnav/hm3d/v1/train/train.json.gz --output data/datasets/objectnav/hm3d/v1/train/train.episodes
+```
+The episodes of the per scene content files next to the input are included.
+Point the `data_path` of the dataset config to the output to load it.
+"""
+
+import argparse
+import os
+
+from habitat.core.columnar_episodes import write_columnar_episodes
+from habitat.core.logging import logger
+from habitat.datasets import make_dataset
+
+
+def convert_episodes_to_columnar(
+    dataset_type: str, input_path: str, output_path: str
+) -> None:
+    # Episodes are stored without the scenes directory, it is prepended
+    # when the store is loaded
+    dataset = make_dataset(dataset_type)
+    logger.info(f"Loading {input_path}")
+    dataset._load_from_file(input_path, scenes_dir=None)
+
+    dataset_dir = os.path.dirname(input_path)
+    content_dir = dataset.content_scenes_path.split("{scene}")[0].format(
+        data_path=dataset_dir
+    )
+    if os.path.exists(content_dir):
+        for scene in dataset._get_scenes_from_folder(
+            content_scenes_path=dataset.content_scenes_path,
+            dataset_dir=dataset_dir,
+        ):
+            scene_path = dataset.content_scenes_path.format(
+                data_path=dataset_dir, scene=scene
+            )
+            logger.info(f"Loading {scene_path}")
+            dataset._load_from_file(scene_path, scenes_dir=None)
+
+    write_columnar_episodes(
+        output_path,
+        [dataset.episode_to_columnar(ep) for ep in dataset.episodes],
+        dataset.columnar_dataset_state(),
+    )
+    logger.info(f"Wrote {len(dataset.episodes)} episodes to {output_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--type",
+        required=True,
+        help="Registered name of the dataset, e.g. PointNav-v1",
+    )
+    parser.add_argument("--input", required=True, help="JSON dataset file")
+    parser.add_argument(
+        "--output", required=True, help="Columnar episode store to write"
+    )
+    args = parser.parse_args()
+    convert_episodes_to_columnar(args.type, args.input, args.output)
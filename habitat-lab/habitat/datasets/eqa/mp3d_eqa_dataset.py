@@ -65,9 +65,7 @@ class Matterport3dDatasetV1(Dataset):
         with gzip.open(config.data_path.format(split=config.split), "rt") as f:
             self.from_json(f.read(), scenes_dir=config.scenes_dir)
 
-        self.episodes = list(
-            filter(self.build_content_scenes_filter(config), self.episodes)
-        )
+        self._apply_content_scenes_filter(config)
 
     def from_json(
         self, json_str: str, scenes_dir: Optional[str] = None
@@ -4,16 +4,17 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
+import copy
 import json
-import os
 from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence
 
+from habitat.core.columnar_episodes import ColumnarEpisodes
+from habitat.core.dataset import Episode
 from habitat.core.registry import registry
 from habitat.core.simulator import AgentState, ShortestPathPoint
 from habitat.core.utils import DatasetFloatJSONEncoder
 from habitat.datasets.pointnav.pointnav_dataset import (
     CONTENT_SCENES_PATH_FIELD,
-    DEFAULT_SCENE_PATH_PREFIX,
     PointNavDatasetV1,
 )
 from habitat.tasks.nav.object_nav_task import (
@@ -74,7 +75,42 @@ class ObjectNavDatasetV1(PointNavDatasetV1):
     def __init__(self, config: Optional["DictConfig"] = None) -> None:
         self.goals_by_category = {}
         super().__init__(config)
-        self.episodes = list(self.episodes)
+        if not isinstance(self.episodes, ColumnarEpisodes):
+            self.episodes = list(self.episodes)
+
+    def episode_to_columnar(self, episode: Episode) -> Dict[str, Any]:
+        # The goals are shared by the episodes of a category and stored once
+        # with the dataset
+        episode = copy.copy(episode)
+        episode.goals = []
+        return super().episode_to_columnar(episode)
+
+    def _set_columnar_dataset_state(self, state: Dict[str, Any]) -> None:
+        super()._set_columnar_dataset_state(state)
+        self.goals_by_category = {
+            k: [self.__deserialize_goal(g) for g in v]
+            for k, v in self.goals_by_category.items()
+        }
+
+    def _episode_from_dict(
+        self, episode: Dict[str, Any]
+    ) -> ObjectGoalNavEpisode:
+        nav_episode = ObjectGoalNavEpisode(**episode)
+        nav_episode.goals = self.goals_by_category[nav_episode.goals_key]
+
+        if nav_episode.shortest_paths is not None:
+            for path in nav_episode.shortest_paths:
+                for p_index, point in enumerate(path):
+                    if point is None or isinstance(point, (int, str)):
+                        point = {
+                            "action": point,
+                            "rotation": None,
+                            "position": None,
+                        }
+
+                    path[p_index] = ShortestPathPoint(**point)
+
+        return nav_episode
 
     @staticmethod
     def __deserialize_goal(serialized_goal: Dict[str, Any]) -> ObjectGoal:
@@ -127,29 +163,8 @@ class ObjectNavDatasetV1(PointNavDatasetV1):
             self.goals_by_category[k] = [self.__deserialize_goal(g) for g in v]
 
         for i, episode in enumerate(deserialized["episodes"]):
-            episode = ObjectGoalNavEpisode(**episode)
-            episode.episode_id = str(i)
-
-            if scenes_dir is not None:
-                if episode.scene_id.startswith(DEFAULT_SCENE_PATH_PREFIX):
-                    episode.scene_id = episode.scene_id[
-                        len(DEFAULT_SCENE_PATH_PREFIX) :
-                    ]
-
-                episode.scene_id = os.path.join(scenes_dir, episode.scene_id)
-
-            episode.goals = self.goals_by_category[episode.goals_key]
-
-            if episode.shortest_paths is not None:
-                for path in episode.shortest_paths:
-                    for p_index, point in enumerate(path):
-                        if point is None or isinstance(point, (int, str)):
-                            point = {
-                                "action": point,
-                                "rotation": None,
-                                "position": None,
-                            }
-
-                        path[p_index] = ShortestPathPoint(**point)
-
-            self.episodes.append(episode)  # type: ignore [attr-defined]
+            episode["episode_id"] = str(i)
+            episode["scene_id"] = self._resolve_scene_id(
+                episode["scene_id"], scenes_dir
+            )
+            self.episodes.append(self._episode_from_dict(episode))  # type: ignore [attr-defined]
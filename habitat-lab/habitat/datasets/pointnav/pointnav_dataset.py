@@ -8,11 +8,18 @@ import gzip
 import json
 import os
 import pickle
+from functools import partial
 from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
 from habitat.config import read_write
-from habitat.core.dataset import ALL_SCENES_MASK, Dataset
+from habitat.core.columnar_episodes import (
+    ColumnarEpisodes,
+    is_columnar_episodes,
+    read_columnar_dataset_state,
+)
+from habitat.core.dataset import ALL_SCENES_MASK, Dataset, Episode
 from habitat.core.registry import registry
+from habitat.core.utils import DatasetJSONEncoder
 from habitat.tasks.nav.nav import (
     NavigationEpisode,
     NavigationGoal,
@@ -113,6 +120,10 @@ class PointNavDatasetV1(Dataset):
 
         datasetfile_path = config.data_path.format(split=config.split)
 
+        if is_columnar_episodes(datasetfile_path):
+            self._load_columnar_episodes(datasetfile_path, config)
+            return
+
         self._load_from_file(datasetfile_path, config.scenes_dir)
 
         # Read separate file for each scene
@@ -138,9 +149,69 @@ class PointNavDatasetV1(Dataset):
                 self._load_from_file(scene_filename, config.scenes_dir)
 
         else:
-            self.episodes = list(
-                filter(self.build_content_scenes_filter(config), self.episodes)
+            self._apply_content_scenes_filter(config)
+
+    def _load_columnar_episodes(self, path: str, config: "DictConfig") -> None:
+        r"""Loads the episodes of the content scenes from a columnar episode
+        store, see :ref:`habitat.core.columnar_episodes`. Episodes are only
+        materialized when they are accessed.
+        """
+        self._set_columnar_dataset_state(read_columnar_dataset_state(path))
+        self.episodes = ColumnarEpisodes(
+            path,
+            episode_fn=self._episode_from_dict,
+            scene_id_fn=partial(
+                self._resolve_scene_id, scenes_dir=config.scenes_dir
+            ),
+        )
+        self._apply_content_scenes_filter(config)
+
+    def columnar_dataset_state(self) -> Dict[str, Any]:
+        r"""Attributes of the dataset, other than its episodes, to store with
+        the episodes in a columnar episode store, JSON encoded. Private
+        attributes hold state derived from the episodes and are left out.
+        """
+        return json.loads(
+            DatasetJSONEncoder().encode(
+                {
+                    k: v
+                    for k, v in vars(self).items()
+                    if k not in {"episodes", "config"}
+                    and not k.startswith("_")
+                }
             )
+        )
+
+    def _set_columnar_dataset_state(self, state: Dict[str, Any]) -> None:
+        r"""Restores the attributes of :ref:`columnar_dataset_state`."""
+        self.__dict__.update(state)
+
+    def episode_to_columnar(self, episode: Episode) -> Dict[str, Any]:
+        r"""Returns the JSON encoded fields of the episode to write to a
+        columnar episode store, they are decoded by :ref:`_episode_from_dict`.
+        Parts shared with the dataset can be left out.
+        """
+        return json.loads(DatasetJSONEncoder().encode(episode))
+
+    def _episode_from_dict(self, episode: Dict[str, Any]) -> Episode:
+        r"""Builds an episode from its JSON decoded fields."""
+        nav_episode = NavigationEpisode(**episode)
+        for g_index, goal in enumerate(nav_episode.goals):
+            nav_episode.goals[g_index] = NavigationGoal(**goal)
+        if nav_episode.shortest_paths is not None:
+            for path in nav_episode.shortest_paths:
+                for p_index, point in enumerate(path):
+                    path[p_index] = ShortestPathPoint(**point)
+        return nav_episode
+
+    @staticmethod
+    def _resolve_scene_id(scene_id: str, scenes_dir: Optional[str]) -> str:
+        r"""Returns the path of the scene of an episode in scenes_dir."""
+        if scenes_dir is None:
+            return scene_id
+        if scene_id.startswith(DEFAULT_SCENE_PATH_PREFIX):
+            scene_id = scene_id[len(DEFAULT_SCENE_PATH_PREFIX) :]
+        return os.path.join(scenes_dir, scene_id)
 
     def to_binary(self) -> Dict[str, Any]:
         raise NotImplementedError()
@@ -158,20 +229,8 @@ class PointNavDatasetV1(Dataset):
             self.content_scenes_path = deserialized[CONTENT_SCENES_PATH_FIELD]
 
         for episode in deserialized["episodes"]:
-            episode = NavigationEpisode(**episode)
-
-            if scenes_dir is not None:
-                if episode.scene_id.startswith(DEFAULT_SCENE_PATH_PREFIX):
-                    episode.scene_id = episode.scene_id[
-                        len(DEFAULT_SCENE_PATH_PREFIX) :
-                    ]
-
-                episode.scene_id = os.path.join(scenes_dir, episode.scene_id)
-
-            for g_index, goal in enumerate(episode.goals):
-                episode.goals[g_index] = NavigationGoal(**goal)
-            if episode.shortest_paths is not None:
-                for path in episode.shortest_paths:
-                    for p_index, point in enumerate(path):
-                        path[p_index] = ShortestPathPoint(**point)
+            episode = self._episode_from_dict(episode)
+            episode.scene_id = self._resolve_scene_id(
+                episode.scene_id, scenes_dir
+            )
             self.episodes.append(episode)
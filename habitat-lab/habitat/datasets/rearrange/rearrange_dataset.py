@@ -73,17 +73,25 @@ class RearrangeDatasetV0(PointNavDatasetV1):
 
         super().__init__(config)
 
+    @staticmethod
+    def _resolve_scene_id(scene_id: str, scenes_dir: Optional[str]) -> str:
+        # Rearrange episodes refer to scenes of their scene dataset
+        return scene_id
+
     def from_json(
         self, json_str: str, scenes_dir: Optional[str] = None
     ) -> None:
         deserialized = json.loads(json_str)
 
         for i, episode in enumerate(deserialized["episodes"]):
-            rearrangement_episode = RearrangeEpisode(**episode)
+            rearrangement_episode = self._episode_from_dict(episode)
             rearrangement_episode.episode_id = str(i)
 
             self.episodes.append(rearrangement_episode)
 
+    def _episode_from_dict(self, episode: Dict[str, Any]) -> RearrangeEpisode:
+        return RearrangeEpisode(**episode)
+
     def to_binary(self) -> Dict[str, Any]:
         """
         Serialize the dataset to a pickle compatible Dict.
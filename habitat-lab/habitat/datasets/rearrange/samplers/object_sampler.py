@@ -27,6 +27,9 @@ from habitat.datasets.rearrange.samplers.receptacle import (
 )
 from habitat.sims.habitat_simulator.debug_visualizer import DebugVisualizer
 
+# Number of placement points sampled at once when placing an object
+PLACEMENT_SAMPLE_CHUNK_SIZE = 10
+
 
 class ObjectSampler:
     """
@@ -256,16 +259,28 @@ class ObjectSampler:
                 sim.pathfinder, sim, allow_outdoor=False
             )
 
+        local_samples = None
         while num_placement_tries < self.max_placement_attempts:
-            num_placement_tries += 1
+            # sample the local object locations of the next attempts at once,
+            # most placements succeed within the first attempts
+            chunk_index = num_placement_tries % PLACEMENT_SAMPLE_CHUNK_SIZE
+            if chunk_index == 0:
+                local_samples = receptacle.sample_uniform_local_batch(
+                    min(
+                        PLACEMENT_SAMPLE_CHUNK_SIZE,
+                        self.max_placement_attempts - num_placement_tries,
+                    ),
+                    self.sample_region_ratio[receptacle.name],
+                )
 
             # sample the object location
             target_object_position = (
-                receptacle.sample_uniform_global(
-                    sim, self.sample_region_ratio[receptacle.name]
+                receptacle.get_global_transform(sim).transform_point(
+                    mn.Vector3(local_samples[chunk_index])
                 )
                 + self._translation_up_offset * receptacle.up
             )
+            num_placement_tries += 1
 
             # instance the new potential object from the handle
             if new_object == None:
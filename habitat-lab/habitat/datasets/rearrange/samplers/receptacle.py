@@ -6,11 +6,11 @@
 
 import json
 import os
-import random
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 from copy import deepcopy
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Union
+from typing import Dict, List, Optional, Tuple, Union
 
 import corrade as cr
 import magnum as mn
@@ -20,7 +20,6 @@ import habitat_sim
 from habitat.core.logging import logger
 from habitat.datasets.rearrange.navmesh_utils import is_accessible
 from habitat.tasks.rearrange.utils import get_ao_link_aabb, get_rigid_aabb
-from habitat.utils.geometry_utils import random_triangle_point
 from habitat_sim.utils.common import quat_from_two_vectors as qf2v
 from habitat_sim.utils.common import quat_to_magnum as qtm
 
@@ -95,6 +94,26 @@ class Receptacle(ABC):
         :param sample_region_scale: defines a XZ scaling of the sample region around its center. For example to constrain object spawning toward the center of a receptacle.
         """
 
+    def sample_uniform_local_batch(
+        self, num_samples: int, sample_region_scale: float = 1.0
+    ) -> np.ndarray:
+        """
+        Sample many uniform random points within Receptacle in local space at once.
+        Default implementation calls sample_uniform_local for each point. Subclasses may override with a vectorized version.
+
+        :param num_samples: The number of points to sample.
+        :param sample_region_scale: defines a XZ scaling of the sample region around its center.
+
+        :return: (num_samples, 3) array of points.
+        """
+        return np.array(
+            [
+                self.sample_uniform_local(sample_region_scale)
+                for _ in range(num_samples)
+            ],
+            dtype=np.float64,
+        ).reshape(num_samples, 3)
+
     def get_global_transform(self, sim: habitat_sim.Simulator) -> mn.Matrix4:
         """
         Isolates boilerplate necessary to extract receptacle global transform of the Receptacle at the current state.
@@ -228,6 +247,27 @@ class AABBReceptacle(Receptacle):
 
         return np.random.uniform(sample_range[0], sample_range[1])
 
+    def sample_uniform_local_batch(
+        self, num_samples: int, sample_region_scale: float = 1.0
+    ) -> np.ndarray:
+        """
+        Sample many uniform random points in the local AABB at once.
+
+        :param num_samples: The number of points to sample.
+        :param sample_region_scale: defines a XZ scaling of the sample region around its center. For example to constrain object spawning toward the center of a receptacle.
+        """
+        scaled_region = mn.Range3D.from_center(
+            self.bounds.center(), sample_region_scale * self.bounds.size() / 2
+        )
+
+        # NOTE: does not scale the "up" direction
+        low = np.array(scaled_region.min)
+        high = np.array(scaled_region.max)
+        low[self.up_axis] = self.bounds.min[self.up_axis]
+        high[self.up_axis] = self.bounds.max[self.up_axis]
+
+        return np.random.uniform(low, high, size=(num_samples, 3))
+
     def get_global_transform(self, sim: habitat_sim.Simulator) -> mn.Matrix4:
         """
         Isolates boilerplate necessary to extract receptacle global transform of the Receptacle at the current state.
@@ -291,6 +331,93 @@ def assert_triangles(indices: List[int]) -> None:
     ), "TriangleMeshReceptacles must be exclusively composed of triangles. The provided mesh_data is not."
 
 
+@dataclass
+class TriangleMeshSamplingData:
+    """
+    NumPy copy of a triangle mesh with the normalized cumulative area of its faces for area weighted point sampling.
+    Built once per receptacle mesh and shared by every TriangleMeshReceptacle instanced from it, see import_receptacle_meshes.
+
+    :property vertices: (num_vertices, 3) vertex positions.
+    :property indices: (num_faces, 3) vertex indices of each triangle.
+    :property area_cdf: (num_faces,) normalized cumulative area of the triangles, the last value is 1.
+    :property total_area: The total area of the mesh.
+    """
+
+    vertices: np.ndarray
+    indices: np.ndarray
+    area_cdf: np.ndarray
+    total_area: float
+
+    @classmethod
+    def from_arrays(
+        cls, vertices: np.ndarray, indices: np.ndarray
+    ) -> "TriangleMeshSamplingData":
+        """
+        Pre-compute the area weighted sampling data of a triangle mesh.
+
+        :param vertices: The vertex positions.
+        :param indices: The flat vertex indices of the triangles (len divisible by 3).
+        """
+        assert_triangles(indices)
+        vertices = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1, 3)
+        v = vertices[indices]
+        areas = 0.5 * np.linalg.norm(
+            np.cross(v[:, 1] - v[:, 0], v[:, 2] - v[:, 1]), axis=1
+        )
+        area_cdf = np.cumsum(areas, dtype=np.float64)
+        total_area = float(area_cdf[-1])
+        return cls(
+            vertices=vertices,
+            indices=indices,
+            area_cdf=area_cdf / total_area,
+            total_area=total_area,
+        )
+
+    @classmethod
+    def from_mesh_data(
+        cls, mesh_data: mn.trade.MeshData
+    ) -> "TriangleMeshSamplingData":
+        """
+        Pre-compute the area weighted sampling data of a magnum triangle mesh.
+        """
+        return cls.from_arrays(
+            np.array(
+                mesh_data.attribute(mn.trade.MeshAttribute.POSITION),
+                dtype=np.float32,
+            ),
+            np.array(mesh_data.indices, dtype=np.int64),
+        )
+
+    def sample_triangles(self, num_samples: int) -> np.ndarray:
+        """
+        Sample random triangle indices with area weighting.
+        """
+        return np.minimum(
+            np.searchsorted(self.area_cdf, np.random.random(num_samples)),
+            len(self.area_cdf) - 1,
+        )
+
+    def sample_points(self, num_samples: int) -> np.ndarray:
+        """
+        Sample uniform random points from the mesh surface.
+
+        :return: (num_samples, 3) array of points.
+        """
+        v = self.vertices[self.indices[self.sample_triangles(num_samples)]]
+
+        # reference: https://mathworld.wolfram.com/TrianglePointPicking.html
+        coefs = np.random.random((num_samples, 2))
+        # transform "outside" points back inside
+        outside = coefs.sum(axis=1) >= 1
+        coefs[outside] = 1 - coefs[outside]
+        return (
+            v[:, 0]
+            + coefs[:, 0:1] * (v[:, 1] - v[:, 0])
+            + coefs[:, 1:2] * (v[:, 2] - v[:, 0])
+        )
+
+
 class TriangleMeshReceptacle(Receptacle):
     """
     Defines a Receptacle surface as a triangle mesh.
@@ -304,6 +431,7 @@ class TriangleMeshReceptacle(Receptacle):
         parent_object_handle: str = None,
         parent_link: Optional[int] = None,
         up: Optional[mn.Vector3] = None,
+        sampling_data: Optional[TriangleMeshSamplingData] = None,
     ) -> None:
         """
         Initialize the TriangleMeshReceptacle from mesh data and pre-compute the area weighted accumulator.
@@ -313,41 +441,21 @@ class TriangleMeshReceptacle(Receptacle):
         :param parent_object_handle: The rigid or articulated object instance handle for the parent object to which the Receptacle is attached. None for globally defined stage Receptacles.
         :param parent_link: Index of the link to which the Receptacle is attached if the parent is an ArticulatedObject. -1 denotes the base link. None for rigid objects and stage Receptables.
         :param up: The "up" direction of the Receptacle in local AABB space. Used for optionally culling receptacles in un-supportive states such as inverted surfaces.
+        :param sampling_data: Optionally provide the pre-computed sampling data of mesh_data, e.g. cached by import_receptacle_meshes. Computed from mesh_data if not provided.
         """
         super().__init__(name, parent_object_handle, parent_link, up)
         self.mesh_data = mesh_data
-        self.area_weighted_accumulator = (
-            []
-        )  # normalized float weights for each triangle for sampling
-        assert_triangles(mesh_data.indices)
-
-        # pre-compute the normalized cumulative area of all triangle faces for later sampling
-        self.total_area = 0.0
-        triangles = []
-        for f_ix in range(int(len(mesh_data.indices) / 3)):
-            v = self.get_face_verts(f_ix)
-            w1 = v[1] - v[0]
-            w2 = v[2] - v[1]
-            triangles.append(v)
-            self.area_weighted_accumulator.append(
-                0.5 * mn.math.cross(w1, w2).length()
-            )
-            self.total_area += self.area_weighted_accumulator[-1]
-        for f_ix in range(len(self.area_weighted_accumulator)):
-            self.area_weighted_accumulator[f_ix] = (
-                self.area_weighted_accumulator[f_ix] / self.total_area
-            )
-            if f_ix > 0:
-                self.area_weighted_accumulator[
-                    f_ix
-                ] += self.area_weighted_accumulator[f_ix - 1]
-        minv = mn.Vector3(mn.math.inf)
-        maxv = mn.Vector3(-mn.math.inf)
-        for v in self.mesh_data.attribute(mn.trade.MeshAttribute.POSITION):
-            minv = mn.math.min(minv, v)
-            maxv = mn.math.max(maxv, v)
-        minmax = (minv, maxv)
-        self._bounds = mn.Range3D(minmax)
+        if sampling_data is None:
+            sampling_data = TriangleMeshSamplingData.from_mesh_data(mesh_data)
+        self.sampling_data = sampling_data
+        # normalized cumulative float weights for each triangle for sampling
+        self.area_weighted_accumulator = sampling_data.area_cdf
+        self.total_area = sampling_data.total_area
+
+        vertices = sampling_data.vertices
+        self._bounds = mn.Range3D(
+            mn.Vector3(vertices.min(axis=0)), mn.Vector3(vertices.max(axis=0))
+        )
 
     @property
     def bounds(self) -> mn.Range3D:
@@ -362,14 +470,12 @@ class TriangleMeshReceptacle(Receptacle):
 
         :param f_ix: The index of the mesh triangle.
         """
-        verts: List[mn.Vector3] = []
-        for ix in range(3):
-            index = int(f_ix * 3 + ix)
-            v_ix = self.mesh_data.indices[index]
-            verts.append(
-                self.mesh_data.attribute(mn.trade.MeshAttribute.POSITION)[v_ix]
-            )
-        return verts
+        return [
+            mn.Vector3(v)
+            for v in self.sampling_data.vertices[
+                self.sampling_data.indices[f_ix]
+            ]
+        ]
 
     def sample_area_weighted_triangle(self) -> int:
         """
@@ -377,22 +483,7 @@ class TriangleMeshReceptacle(Receptacle):
 
         Returns a random triangle index sampled with area weighting.
         """
-
-        def find_ge(a: List[Any], x) -> Any:
-            "Find leftmost item greater than or equal to x"
-            from bisect import bisect_left
-
-            i = bisect_left(a, x)
-            if i != len(a):
-                return i
-            raise ValueError(
-                f"Value '{x}' is greater than all items in the list. Maximum value should be <1."
-            )
-
-        # first area weighted sampling of a triangle
-        sample_val = random.random()
-        tri_index = find_ge(self.area_weighted_accumulator, sample_val)
-        return tri_index
+        return int(self.sampling_data.sample_triangles(1)[0])
 
     def sample_uniform_local(
         self, sample_region_scale: float = 1.0
@@ -400,6 +491,19 @@ class TriangleMeshReceptacle(Receptacle):
         """
         Sample a uniform random point from the mesh.
 
+        :param sample_region_scale: defines a XZ scaling of the sample region around its center. For example to constrain object spawning toward the center of a receptacle.
+        """
+        return mn.Vector3(
+            self.sample_uniform_local_batch(1, sample_region_scale)[0]
+        )
+
+    def sample_uniform_local_batch(
+        self, num_samples: int, sample_region_scale: float = 1.0
+    ) -> np.ndarray:
+        """
+        Sample many uniform random points from the mesh at once.
+
+        :param num_samples: The number of points to sample.
         :param sample_region_scale: defines a XZ scaling of the sample region around its center. For example to constrain object spawning toward the center of a receptacle.
         """
 
@@ -408,13 +512,7 @@ class TriangleMeshReceptacle(Receptacle):
                 "TriangleMeshReceptacle does not support 'sample_region_scale' != 1.0."
             )
 
-        tri_index = self.sample_area_weighted_triangle()
-
-        # then sample a random point in the triangle
-        v = self.get_face_verts(f_ix=tri_index)
-        rand_point = random_triangle_point(v[0], v[1], v[2])
-
-        return rand_point
+        return self.sampling_data.sample_points(num_samples)
 
     def debug_draw(
         self, sim: habitat_sim.Simulator, color: Optional[mn.Color4] = None
@@ -576,6 +674,40 @@ def import_tri_mesh(mesh_file: str) -> List[mn.trade.MeshData]:
     return mesh_data
 
 
+# The meshes of a receptacle mesh file with their sampling data
+ReceptacleMeshes = List[Tuple[mn.trade.MeshData, TriangleMeshSamplingData]]
+# Number of receptacle mesh files whose meshes are kept in memory
+RECEPTACLE_MESH_CACHE_SIZE = 256
+# cache of the imported receptacle meshes and their sampling data by mesh
+# file identity, see import_receptacle_meshes
+_receptacle_mesh_cache: "OrderedDict[Tuple[str, int, int], ReceptacleMeshes]" = (
+    OrderedDict()
+)
+
+
+def import_receptacle_meshes(mesh_file: str) -> ReceptacleMeshes:
+    """
+    Returns the MeshData objects of a receptacle mesh asset with their pre-computed sampling data.
+    The result is cached by the real path, modification time and size of the mesh file, so each receptacle template mesh is only imported and processed once until it changes.
+    The meshes of the RECEPTACLE_MESH_CACHE_SIZE most recently used files are kept.
+
+    :param mesh_file: The input meshes file. NOTE: must contain only triangles.
+    """
+    real_path = os.path.realpath(mesh_file)
+    stat = os.stat(real_path)
+    key = (real_path, stat.st_mtime_ns, stat.st_size)
+    if key in _receptacle_mesh_cache:
+        _receptacle_mesh_cache.move_to_end(key)
+    else:
+        _receptacle_mesh_cache[key] = [
+            (mesh_data, TriangleMeshSamplingData.from_mesh_data(mesh_data))
+            for mesh_data in import_tri_mesh(mesh_file)
+        ]
+        if len(_receptacle_mesh_cache) > RECEPTACLE_MESH_CACHE_SIZE:
+            _receptacle_mesh_cache.popitem(last=False)
+    return _receptacle_mesh_cache[key]
+
+
 def parse_receptacles_from_user_config(
     user_subconfig: habitat_sim._ext.habitat_sim_bindings.Configuration,
     parent_object_handle: Optional[str] = None,
@@ -680,9 +812,9 @@ def parse_receptacles_from_user_config(
                     mesh_file
                 ), f"Configured receptacle mesh asset '{mesh_file}' not found."
                 # TODO: build the mesh_data entry from scale and mesh
-                mesh_data: List[mn.trade.MeshData] = import_tri_mesh(mesh_file)
-
-                for mix, single_mesh_data in enumerate(mesh_data):
+                for mix, (single_mesh_data, sampling_data) in enumerate(
+                    import_receptacle_meshes(mesh_file)
+                ):
                     single_receptacle_name = (
                         receptacle_name + "." + str(mix).rjust(4, "0")
                     )
@@ -693,6 +825,7 @@ def parse_receptacles_from_user_config(
                             up=up,
                             parent_object_handle=parent_object_handle,
                             parent_link=parent_link_ix,
+                            sampling_data=sampling_data,
                         )
                     )
             else:
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+r"""Precomputed geodesic distance fields to the goals of navigation episodes.
+
+A :ref:`GeodesicDistanceField` holds the geodesic distance from every cell of
+a floor of the navmesh to a set of goals, so that the distance from the agent
+to the goals is a grid lookup rather than a multi goal path search. The
+distances are approximated by shortest paths on the grid of navigable cells,
+see :ref:`compute_distance_field`. :ref:`GeodesicDistanceCache` keeps the
+fields of the recently used scenes and goal sets, which are shared by the
+episodes with the same goals, and can persist them to disk.
+"""
+
+import hashlib
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from habitat.utils.npz_cache import NpzCache, get_navmesh_hash
+
+# Moves between grid cells as (row, column) offsets, with the cells a move
+# goes through, which must be navigable too. Knight moves bring the error of
+# grid distances on straight lines from 8% down to 3%.
+_MOVES: Sequence[Tuple[Tuple[int, int], Sequence[Tuple[int, int]]]] = (
+    ((0, 1), ()),
+    ((1, 0), ()),
+    ((1, 1), ((0, 1), (1, 0))),
+    ((1, -1), ((0, -1), (1, 0))),
+    ((1, 2), ((0, 1), (1, 1))),
+    ((2, 1), ((1, 0), (1, 1))),
+    ((1, -2), ((0, -1), (1, -1))),
+    ((2, -1), ((1, 0), (1, -1))),
+)
+# Goals are seeded in the nearest navigable cell within this many cells
+_GOAL_SEARCH_RADIUS = 2
+# Positions further than this from the height of the floor of a field are
+# on another floor
+_FLOOR_HEIGHT_TOLERANCE = 0.5
+
+
+def _shifted(mask: np.ndarray, dr: int, dc: int) -> np.ndarray:
+    r"""Returns the values of mask at (row + dr, column + dc) for every cell,
+    False outside of the grid.
+    """
+    rows, cols = mask.shape
+    result = np.zeros_like(mask)
+    result[
+        max(0, -dr) : rows - max(0, dr), max(0, -dc) : cols - max(0, dc)
+    ] = mask[max(0, dr) : rows + min(0, dr), max(0, dc) : cols + min(0, dc)]
+    return result
+
+
+def compute_distance_field(
+    navigable: np.ndarray,
+    goal_cells: np.ndarray,
+    goal_offsets: np.ndarray,
+    meters_per_pixel: float,
+) -> np.ndarray:
+    r"""Computes the distance from every cell of a grid to the closest goal.
+
+    :param navigable: boolean grid of the navigable cells.
+    :param goal_cells: (row, column) of the navigable cells of the goals.
+    :param goal_offsets: distance from each goal to its cell.
+    :param meters_per_pixel: size of the cells.
+    :return: distances, :py:`np.inf` for the cells from which no goal can be
+        reached.
+    """
+    num_cells = int(navigable.sum())
+    cell_ids = np.full(navigable.shape, -1, dtype=np.int64)
+    cell_ids[navigable] = np.arange(num_cells)
+
+    sources, targets, weights = [], [], []
+    for (dr, dc), through in _MOVES:
+        valid = navigable & _shifted(navigable, dr, dc)
+        for tr, tc in through:
+            valid &= _shifted(navigable, tr, tc)
+        rows, cols = np.nonzero(valid)
+        sources.append(cell_ids[rows, cols])
+        targets.append(cell_ids[rows + dr, cols + dc])
+        weights.append(np.full(len(rows), np.hypot(dr, dc) * meters_per_pixel))
+
+    # A virtual node linked to the goal cells makes a single search find the
+    # distance to the closest goal. Edges of zero weight would be dropped.
+    goal_ids = cell_ids[goal_cells[:, 0], goal_cells[:, 1]]
+    sources.append(np.full(len(goal_ids), num_cells))
+    targets.append(goal_ids)
+    weights.append(np.maximum(goal_offsets, 1e-6))
+
+    graph = csr_matrix(
+        (
+            np.concatenate(weights),
+            (np.concatenate(sources), np.concatenate(targets)),
+        ),
+        shape=(num_cells + 1, num_cells + 1),
+    )
+    distances = dijkstra(graph, directed=False, indices=num_cells)
+
+    field = np.full(navigable.shape, np.inf, dtype=np.float32)
+    field[navigable] = distances[:num_cells]
+    return field
+
+
+class GeodesicDistanceField:
+    r"""Geodesic distances from the cells of a floor of the navmesh to a set
+    of goals.
+
+    :param distances: distance of every cell, :py:`np.inf` where the goals
+        cannot be reached.
+    :param origin: (x, z) of the corner of the grid.
+    :param height: height of the floor.
+    :param meters_per_pixel: size of the cells.
+    """
+
+    def __init__(
+        self,
+        distances: np.ndarray,
+        origin: Tuple[float, float],
+        height: float,
+        meters_per_pixel: float,
+    ) -> None:
+        self.distances = distances
+        self.origin = origin
+        self.height = height
+        self.meters_per_pixel = meters_per_pixel
+
+    @classmethod
+    def from_pathfinder(
+        cls,
+        pathfinder: Any,
+        goals: np.ndarray,
+        height: float,
+        meters_per_pixel: float,
+    ) -> Optional["GeodesicDistanceField"]:
+        r"""Computes the field to goals of the floor at height of the navmesh
+        of pathfinder. Returns :py:`None` if no goal is on that floor.
+        """
+        lower_bound, _ = pathfinder.get_bounds()
+        origin = (float(lower_bound[0]), float(lower_bound[2]))
+        navigable = np.asarray(
+            pathfinder.get_topdown_view(meters_per_pixel, height), dtype=bool
+        )
+        field = cls(
+            np.zeros(navigable.shape, dtype=np.float32),
+            origin,
+            height,
+            meters_per_pixel,
+        )
+
+        goal_cells, goal_offsets = [], []
+        for goal in goals:
+            snapped = np.asarray(pathfinder.snap_point(goal), dtype=np.float32)
+            if (
+                np.isnan(snapped).any()
+                or abs(snapped[1] - height) > _FLOOR_HEIGHT_TOLERANCE
+            ):
+                continue
+            cell = field._nearest_navigable_cell(navigable, snapped)
+            if cell is None:
+                continue
+            goal_cells.append(cell)
+            goal_offsets.append(
+                np.hypot(*(field._cell_center(cell) - snapped[[0, 2]]))
+            )
+        if len(goal_cells) == 0:
+            return None
+
+        field.distances = compute_distance_field(
+            navigable,
+            np.array(goal_cells, dtype=np.int64),
+            np.array(goal_offsets, dtype=np.float64),
+            meters_per_pixel,
+        )
+        return field
+
+    def _cell(self, position: Sequence[float]) -> Tuple[int, int]:
+        return (
+            int((position[2] - self.origin[1]) / self.meters_per_pixel),
+            int((position[0] - self.origin[0]) / self.meters_per_pixel),
+        )
+
+    def _cell_center(self, cell: Tuple[int, int]) -> np.ndarray:
+        return np.array(
+            [
+                self.origin[0] + (cell[1] + 0.5) * self.meters_per_pixel,
+                self.origin[1] + (cell[0] + 0.5) * self.meters_per_pixel,
+            ]
+        )
+
+    def _nearest_navigable_cell(
+        self, navigable: np.ndarray, position: Sequence[float]
+    ) -> Optional[Tuple[int, int]]:
+        row, col = self._cell(position)
+        r = _GOAL_SEARCH_RADIUS
+        rows = np.arange(max(0, row - r), min(navigable.shape[0], row + r + 1))
+        cols = np.arange(max(0, col - r), min(navigable.shape[1], col + r + 1))
+        candidates = [
+            (abs(rr - row) + abs(cc - col), (int(rr), int(cc)))
+            for rr in rows
+            for cc in cols
+            if navigable[rr, cc]
+        ]
+        if len(candidates) == 0:
+            return None
+        return min(candidates)[1]
+
+    def lookup(self, position: Sequence[float]) -> Optional[float]:
+        r"""Returns the distance from position to the goals, or :py:`None` if
+        position is not on a reachable cell of the floor of the field.
+        """
+        if abs(position[1] - self.height) > _FLOOR_HEIGHT_TOLERANCE:
+            return None
+        row, col = self._cell(position)
+        if not (
+            0 <= row < self.distances.shape[0]
+            and 0 <= col < self.distances.shape[1]
+        ):
+            return None
+        distance = self.distances[row, col]
+        if not np.isfinite(distance):
+            return None
+        return float(distance)
+
+    def to_arrays(self) -> Dict[str, Any]:
+        r"""The arrays the field is persisted as, see :ref:`from_arrays`."""
+        return dict(
+            distances=self.distances,
+            origin=np.array(self.origin),
+            height=self.height,
+            meters_per_pixel=self.meters_per_pixel,
+        )
+
+    @classmethod
+    def from_arrays(
+        cls, data: Dict[str, np.ndarray]
+    ) -> "GeodesicDistanceField":
+        return cls(
+            data["distances"],
+            tuple(data["origin"].tolist()),  # type: ignore[arg-type]
+            float(data["height"]),
+            float(data["meters_per_pixel"]),
+        )
+
+
+class GeodesicDistanceCache:
+    r"""LRU cache of the :ref:`GeodesicDistanceField` of scenes and goal
+    sets, optionally persisted to disk.
+
+    :param max_fields: number of fields kept in memory.
+    :param meters_per_pixel: size of the cells of the fields.
+    :param cache_dir: optional directory where the fields are persisted.
+    """
+
+    def __init__(
+        self,
+        max_fields: int,
+        meters_per_pixel: float,
+        cache_dir: Optional[str] = None,
+    ) -> None:
+        self._meters_per_pixel = meters_per_pixel
+        self._fields: NpzCache[GeodesicDistanceField] = NpzCache(
+            max_fields,
+            to_arrays=GeodesicDistanceField.to_arrays,
+            from_arrays=GeodesicDistanceField.from_arrays,
+            cache_dir=cache_dir,
+            file_prefix="geodesic_distance_field_",
+        )
+
+    def _key(
+        self,
+        pathfinder: Any,
+        scene_id: str,
+        goals: np.ndarray,
+        height: float,
+    ) -> Tuple[str, str, str, float, float]:
+        # The scene path and the navmesh are part of the key, so that scenes
+        # with the same name in other datasets and recomputed navmeshes do
+        # not share their fields.
+        goals_hash = hashlib.sha1(
+            np.round(goals, 3).astype(np.float32).tobytes()
+        ).hexdigest()[:16]
+        return (
+            scene_id,
+            get_navmesh_hash(pathfinder),
+            goals_hash,
+            float(np.float32(height)),
+            self._meters_per_pixel,
+        )
+
+    def get(
+        self,
+        pathfinder: Any,
+        scene_id: str,
+        goals: Sequence[Sequence[float]],
+        height: float,
+    ) -> Optional[GeodesicDistanceField]:
+        r"""Returns the field to goals of the floor at height of the scene,
+        computing it if needed. Returns :py:`None` if the goals are not on
+        that floor.
+        """
+        goals = np.asarray(goals, dtype=np.float32).reshape(-1, 3)
+        return self._fields.get(
+            self._key(pathfinder, scene_id, goals, height),
+            lambda: GeodesicDistanceField.from_pathfinder(
+                pathfinder, goals, height, self._meters_per_pixel
+            ),
+        )
@@ -34,6 +34,10 @@ from habitat.core.simulator import (
 from habitat.core.spaces import ActionSpace
 from habitat.core.utils import not_none_validator, try_cv2_import
 from habitat.sims.habitat_simulator.actions import HabitatSimActions
+from habitat.tasks.nav.geodesic_distance_cache import (
+    GeodesicDistanceCache,
+    GeodesicDistanceField,
+)
 from habitat.tasks.utils import cartesian_to_polar
 from habitat.utils.geometry_utils import (
     quaternion_from_coeff,
@@ -61,6 +65,8 @@ cv2 = try_cv2_import()
 
 
 MAP_THICKNESS_SCALAR: int = 128
+# Number of scene floors whose top down map is kept in memory by TopDownMap
+TOP_DOWN_MAP_CACHE_SIZE: int = 4
 
 
 @attr.s(auto_attribs=True, kw_only=True)
@@ -700,6 +706,17 @@ class TopDownMap(Measure):
         self._previous_xy_location: List[Optional[Tuple[int, int]]] = None
         self._top_down_map: Optional[np.ndarray] = None
         self._shortest_path_points: Optional[List[Tuple[int, int]]] = None
+        self._map_store = maps.TopDownMapStore(
+            max_size=TOP_DOWN_MAP_CACHE_SIZE,
+            cache_dir=config.map_cache_dir,
+            height_band=config.map_height_band,
+        )
+        self._meters_per_pixel: Optional[float] = None
+        self._grid_transform: Optional[maps.GridTransform] = None
+        # Region of the map changed since the last step, as
+        # [row_min, col_min, row_max, col_max)
+        self._changed_region: Optional[List[int]] = None
+        self._output_mode = config.get("output_mode", "full")
         self.line_thickness = int(
             np.round(self._map_resolution * 2 / MAP_THICKNESS_SCALAR)
         )
@@ -712,11 +729,15 @@ class TopDownMap(Measure):
         return "top_down_map"
 
     def get_original_map(self):
-        top_down_map = maps.get_topdown_map_from_sim(
-            self._sim,
+        # The map of a floor only depends on the navmesh, it is computed
+        # once per scene floor
+        top_down_map = self._map_store.get_topdown_map(
+            self._sim.habitat_config.scene,
+            self._sim.pathfinder,
+            self._sim.get_agent(0).state.position[1],
             map_resolution=self._map_resolution,
             draw_border=self._config.draw_border,
-        )
+        ).copy()
 
         if self._config.fog_of_war.draw:
             self._fog_of_war_mask = np.zeros_like(top_down_map)
@@ -725,31 +746,32 @@ class TopDownMap(Measure):
 
         return top_down_map
 
+    def _draw_points(self, positions, point_type):
+        for t_x, t_y in self._grid_transform.points_to_grid(positions):
+            self._top_down_map[
+                t_x - self.point_padding : t_x + self.point_padding + 1,
+                t_y - self.point_padding : t_y + self.point_padding + 1,
+            ] = point_type
+
     def _draw_point(self, position, point_type):
-        t_x, t_y = maps.to_grid(
-            position[2],
-            position[0],
-            (self._top_down_map.shape[0], self._top_down_map.shape[1]),
-            sim=self._sim,
-        )
-        self._top_down_map[
-            t_x - self.point_padding : t_x + self.point_padding + 1,
-            t_y - self.point_padding : t_y + self.point_padding + 1,
-        ] = point_type
+        self._draw_points([position], point_type)
 
     def _draw_goals_view_points(self, episode):
         if self._config.draw_view_points:
+            view_point_positions = []
             for goal in episode.goals:
                 if self._is_on_same_floor(goal.position[1]):
                     try:
                         if goal.view_points is not None:
-                            for view_point in goal.view_points:
-                                self._draw_point(
-                                    view_point.agent_state.position,
-                                    maps.MAP_VIEW_POINT_INDICATOR,
-                                )
+                            view_point_positions.extend(
+                                view_point.agent_state.position
+                                for view_point in goal.view_points
+                            )
                     except AttributeError:
                         pass
+            self._draw_points(
+                view_point_positions, maps.MAP_VIEW_POINT_INDICATOR
+            )
 
     def _draw_goals_positions(self, episode):
         if self._config.draw_goal_positions:
@@ -791,18 +813,7 @@ class TopDownMap(Measure):
                         if self._is_on_same_floor(center[1])
                     ]
 
-                    map_corners = [
-                        maps.to_grid(
-                            p[2],
-                            p[0],
-                            (
-                                self._top_down_map.shape[0],
-                                self._top_down_map.shape[1],
-                            ),
-                            sim=self._sim,
-                        )
-                        for p in corners
-                    ]
+                    map_corners = self._grid_transform.points_to_grid(corners)
 
                     maps.draw_path(
                         self._top_down_map,
@@ -822,18 +833,15 @@ class TopDownMap(Measure):
                     agent_position, episode.goals[0].position
                 )
             )
+            map_path_points = self._grid_transform.points_to_grid(
+                _shortest_path_points
+            )
             self._shortest_path_points = [
-                maps.to_grid(
-                    p[2],
-                    p[0],
-                    (self._top_down_map.shape[0], self._top_down_map.shape[1]),
-                    sim=self._sim,
-                )
-                for p in _shortest_path_points
+                (int(t_x), int(t_y)) for t_x, t_y in map_path_points
             ]
             maps.draw_path(
                 self._top_down_map,
-                self._shortest_path_points,
+                map_path_points,
                 maps.MAP_SHORTEST_PATH_COLOR,
                 self.line_thickness,
             )
@@ -847,6 +855,15 @@ class TopDownMap(Measure):
 
     def reset_metric(self, episode, *args: Any, **kwargs: Any):
         self._top_down_map = self.get_original_map()
+        # The bounds of the navmesh are read once per episode for all the
+        # conversions to map coordinates.
+        self._grid_transform = maps.GridTransform.from_sim(
+            (self._top_down_map.shape[0], self._top_down_map.shape[1]),
+            sim=self._sim,
+        )
+        self._meters_per_pixel = maps.calculate_meters_per_pixel(
+            self._map_resolution, sim=self._sim
+        )
         self._step_count = 0
         agent_position = self._sim.get_agent_state().position
         self._previous_xy_location = [
@@ -870,18 +887,83 @@ class TopDownMap(Measure):
 
     def update_metric(self, episode, action, *args: Any, **kwargs: Any):
         self._step_count += 1
-        map_positions: List[Tuple[float]] = []
+        map_positions: List[Tuple[int, int]] = []
         map_angles = []
         for agent_index in range(len(self._sim.habitat_config.agents)):
             agent_state = self._sim.get_agent_state(agent_index)
             map_positions.append(self.update_map(agent_state, agent_index))
             map_angles.append(TopDownMap.get_polar_angle(agent_state))
-        self._metric = {
-            "map": self._top_down_map,
-            "fog_of_war_mask": self._fog_of_war_mask,
-            "agent_map_coord": map_positions,
-            "agent_angle": map_angles,
-        }
+        self.update_fog_of_war_mask(np.array(map_positions), map_angles)
+
+        if self._output_mode == "delta" and self._step_count > 1:
+            self._metric = {
+                "map_delta": self._changed_patch(self._top_down_map),
+                "fog_of_war_mask_delta": self._changed_patch(
+                    self._fog_of_war_mask
+                ),
+                "agent_map_coord": map_positions,
+                "agent_angle": map_angles,
+            }
+        elif self._output_mode == "downsampled":
+            factor = int(
+                np.ceil(
+                    max(self._top_down_map.shape)
+                    / self._config.output_map_resolution
+                )
+            )
+            self._metric = {
+                "map": maps.downsample_topdown_map(self._top_down_map, factor),
+                "fog_of_war_mask": (
+                    None
+                    if self._fog_of_war_mask is None
+                    else maps.downsample_topdown_map(
+                        self._fog_of_war_mask, factor
+                    )
+                ),
+                "agent_map_coord": [
+                    (a_x // factor, a_y // factor)
+                    for a_x, a_y in map_positions
+                ],
+                "agent_angle": map_angles,
+            }
+        else:
+            # The first step of an episode always has the full map, the
+            # deltas of the next steps apply to it
+            self._metric = {
+                "map": self._top_down_map,
+                "fog_of_war_mask": self._fog_of_war_mask,
+                "agent_map_coord": map_positions,
+                "agent_angle": map_angles,
+            }
+        self._changed_region = None
+
+    def _mark_changed(
+        self, row_min: int, col_min: int, row_max: int, col_max: int
+    ) -> None:
+        region = [
+            max(row_min, 0),
+            max(col_min, 0),
+            min(row_max, self._top_down_map.shape[0]),
+            min(col_max, self._top_down_map.shape[1]),
+        ]
+        if self._changed_region is not None:
+            region[:2] = np.minimum(region[:2], self._changed_region[:2])
+            region[2:] = np.maximum(region[2:], self._changed_region[2:])
+        self._changed_region = [int(v) for v in region]
+
+    def _changed_patch(
+        self, array: Optional[np.ndarray]
+    ) -> Optional[Tuple[int, int, np.ndarray]]:
+        if array is None or self._changed_region is None:
+            return None
+        row_min, col_min, row_max, col_max = self._changed_region
+        if row_min >= row_max or col_min >= col_max:
+            return None
+        return (
+            row_min,
+            col_min,
+            array[row_min:row_max, col_min:col_max].copy(),
+        )
 
     @staticmethod
     def get_polar_angle(agent_state):
@@ -895,12 +977,10 @@ class TopDownMap(Measure):
 
     def update_map(self, agent_state: AgentState, agent_index: int):
         agent_position = agent_state.position
-        a_x, a_y = maps.to_grid(
-            agent_position[2],
-            agent_position[0],
-            (self._top_down_map.shape[0], self._top_down_map.shape[1]),
-            sim=self._sim,
+        grid_x, grid_y = self._grid_transform.to_grid(
+            agent_position[2], agent_position[0]
         )
+        a_x, a_y = int(grid_x), int(grid_y)
         # Don't draw over the source point
         if self._top_down_map[a_x, a_y] != maps.MAP_SOURCE_POINT_INDICATOR:
             color = 10 + min(
@@ -909,6 +989,7 @@ class TopDownMap(Measure):
 
             thickness = self.line_thickness
             if self._previous_xy_location[agent_index] is not None:
+                prev_y, prev_x = self._previous_xy_location[agent_index]
                 cv2.line(
                     self._top_down_map,
                     self._previous_xy_location[agent_index],
@@ -916,25 +997,38 @@ class TopDownMap(Measure):
                     color,
                     thickness=thickness,
                 )
-        angle = TopDownMap.get_polar_angle(agent_state)
-        self.update_fog_of_war_mask(np.array([a_x, a_y]), angle)
+                self._mark_changed(
+                    min(prev_x, a_x) - thickness,
+                    min(prev_y, a_y) - thickness,
+                    max(prev_x, a_x) + thickness + 1,
+                    max(prev_y, a_y) + thickness + 1,
+                )
 
         self._previous_xy_location[agent_index] = (a_y, a_x)
         return a_x, a_y
 
-    def update_fog_of_war_mask(self, agent_position, angle):
+    def update_fog_of_war_mask(self, agent_positions, angles):
+        r"""Reveals the fog of war at the map positions of all the agents at
+        once.
+        """
         if self._config.fog_of_war.draw:
-            self._fog_of_war_mask = fog_of_war.reveal_fog_of_war(
+            max_line_len = (
+                self._config.fog_of_war.visibility_dist
+                / self._meters_per_pixel
+            )
+            fog_of_war.reveal_fog_of_war_batch(
                 self._top_down_map,
                 self._fog_of_war_mask,
-                agent_position,
-                angle,
+                agent_positions,
+                angles,
                 fov=self._config.fog_of_war.fov,
-                max_line_len=self._config.fog_of_war.visibility_dist
-                / maps.calculate_meters_per_pixel(
-                    self._map_resolution, sim=self._sim
-                ),
+                max_line_len=max_line_len,
             )
+            reach = int(np.ceil(max_line_len)) + 1
+            for a_x, a_y in agent_positions:
+                self._mark_changed(
+                    a_x - reach, a_y - reach, a_x + reach + 1, a_y + reach + 1
+                )
 
 
 @registry.register_measure
@@ -953,6 +1047,14 @@ class DistanceToGoal(Measure):
             List[Tuple[float, float, float]]
         ] = None
         self._distance_to = self._config.distance_to
+        self._geodesic_cache: Optional[GeodesicDistanceCache] = None
+        if self._config.get("use_geodesic_cache", False):
+            self._geodesic_cache = GeodesicDistanceCache(
+                self._config.geodesic_cache_size,
+                self._config.geodesic_cache_meters_per_pixel,
+                self._config.geodesic_cache_dir,
+            )
+        self._distance_field: Optional[GeodesicDistanceField] = None
 
         super().__init__(**kwargs)
 
@@ -967,8 +1069,39 @@ class DistanceToGoal(Measure):
                 for goal in episode.goals
                 for view_point in goal.view_points
             ]
+        self._distance_field = None
+        if self._geodesic_cache is not None:
+            self._distance_field = self._geodesic_cache.get(
+                self._sim.pathfinder,
+                episode.scene_id,
+                self._goal_positions(episode),
+                episode.start_position[1],
+            )
         self.update_metric(episode=episode, *args, **kwargs)  # type: ignore
 
+    def _goal_positions(
+        self, episode: NavigationEpisode
+    ) -> List[Tuple[float, float, float]]:
+        if self._distance_to == "VIEW_POINTS":
+            return self._episode_view_points
+        return [goal.position for goal in episode.goals]
+
+    def _cached_distance(self, position: np.ndarray) -> Optional[float]:
+        r"""Returns the distance to the goals from the distance field, or
+        :py:`None` if it must be computed exactly.
+        """
+        if self._distance_field is None or self._previous_position is None:
+            # The distance at the start of the episode is exact, SPL is
+            # relative to it
+            return None
+        distance = self._distance_field.lookup(position)
+        if (
+            distance is None
+            or distance < self._config.geodesic_cache_exact_distance
+        ):
+            return None
+        return distance
+
     def update_metric(
         self, episode: NavigationEpisode, *args: Any, **kwargs: Any
     ):
@@ -977,20 +1110,22 @@ class DistanceToGoal(Measure):
         if self._previous_position is None or not np.allclose(
             self._previous_position, current_position, atol=1e-4
         ):
-            if self._distance_to == "POINT":
-                distance_to_target = self._sim.geodesic_distance(
-                    current_position,
-                    [goal.position for goal in episode.goals],
-                    episode,
-                )
-            elif self._distance_to == "VIEW_POINTS":
-                distance_to_target = self._sim.geodesic_distance(
-                    current_position, self._episode_view_points, episode
-                )
-            else:
-                logger.error(
-                    f"Non valid distance_to parameter was provided: {self._distance_to }"
-                )
+            distance_to_target = self._cached_distance(current_position)
+            if distance_to_target is None:
+                if self._distance_to == "POINT":
+                    distance_to_target = self._sim.geodesic_distance(
+                        current_position,
+                        [goal.position for goal in episode.goals],
+                        episode,
+                    )
+                elif self._distance_to == "VIEW_POINTS":
+                    distance_to_target = self._sim.geodesic_distance(
+                        current_position, self._episode_view_points, episode
+                    )
+                else:
+                    logger.error(
+                        f"Non valid distance_to parameter was provided: {self._distance_to }"
+                    )
 
             self._previous_position = (
                 current_position[0],
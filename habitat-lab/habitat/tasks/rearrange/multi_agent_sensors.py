@@ -1,9 +1,12 @@
+from typing import Optional
+
 import numpy as np
 from gym import spaces
 
 from habitat.core.embodied_task import Measure
 from habitat.core.registry import registry
 from habitat.core.simulator import Sensor, SensorTypes
+from habitat.tasks.rearrange.multi_task.pddl_compiled import CompiledPredicates
 from habitat.tasks.rearrange.multi_task.pddl_sensors import PddlSubgoalReward
 from habitat.tasks.rearrange.utils import (
     UsesArticulatedAgentInterface,
@@ -125,6 +128,7 @@ class MultiAgentGlobalPredicatesSensor(UsesArticulatedAgentInterface, Sensor):
         self._task = task
         self._sim = sim
         self._predicates_list = None
+        self._compiled_predicates: Optional[CompiledPredicates] = None
         super().__init__(config=config)
 
     def _get_uuid(self, *args, **kwargs):
@@ -148,8 +152,15 @@ class MultiAgentGlobalPredicatesSensor(UsesArticulatedAgentInterface, Sensor):
 
     def get_observation(self, observations, episode, *args, **kwargs):
         sim_info = self._task.pddl_problem.sim_info
-        truth_values = [p.is_true(sim_info) for p in self.predicates_list]
-        return np.array(truth_values, dtype=np.float32)
+        if (
+            self._compiled_predicates is None
+            or self._compiled_predicates.sim_info is not sim_info
+        ):
+            # The simulator info is recreated for every episode.
+            self._compiled_predicates = CompiledPredicates(
+                self.predicates_list, sim_info
+            )
+        return self._compiled_predicates.is_true().astype(np.float32)
 
 
 @registry.register_sensor
@@ -4,7 +4,7 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
-from typing import Dict, List, Optional
+from typing import Container, Dict, List, Optional
 
 from habitat.tasks.rearrange.multi_task.pddl_logical_expr import LogicalExpr
 from habitat.tasks.rearrange.multi_task.pddl_predicate import Predicate
@@ -93,7 +93,7 @@ class PddlAction:
         return f"{self._name}({params})"
 
     def is_precond_satisfied_from_predicates(
-        self, predicates: List[Predicate]
+        self, predicates: Container[Predicate]
     ) -> bool:
         """
         Checks if the preconditions of the action are satisfied from the input
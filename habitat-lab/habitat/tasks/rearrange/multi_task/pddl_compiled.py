@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple, cast
+
+import magnum as mn
+import numpy as np
+
+from habitat.tasks.rearrange.marker_info import MarkerInfo
+from habitat.tasks.rearrange.multi_task.pddl_predicate import Predicate
+from habitat.tasks.rearrange.multi_task.pddl_sim_state import (
+    ArtSampler,
+    PddlRobotState,
+    get_receptacle_global_bb,
+)
+from habitat.tasks.rearrange.multi_task.rearrange_pddl import (
+    PddlEntity,
+    PddlSimInfo,
+    SimulatorObjectType,
+)
+
+# Kinds of the object state terms.
+_OBJ_AT_GOAL = 0
+_OBJ_IN_STATIC_RECEP = 1
+_OBJ_IN_ART_RECEP = 2
+
+_ART_CMPS = {"greater": 0, "less": 1, "close": 2}
+
+
+def _predicate_key(pred: Predicate) -> Tuple[str, Tuple[PddlEntity, ...]]:
+    return (pred.name, tuple(pred.arg_values or ()))
+
+
+class PredicateSet:
+    """
+    Grounded predicates with constant time membership tests. Can be passed
+    in place of a list of predicates to check logical expressions with
+    `LogicalExpr.is_true_from_predicates`.
+    """
+
+    def __init__(self, predicates: Iterable[Predicate]):
+        self._preds: Dict[
+            Tuple[str, Tuple[PddlEntity, ...]], List[Predicate]
+        ] = defaultdict(list)
+        for pred in predicates:
+            self._preds[_predicate_key(pred)].append(pred)
+
+    def __contains__(self, pred) -> bool:
+        if not isinstance(pred, Predicate):
+            return False
+        return any(
+            other == pred
+            for other in self._preds.get(_predicate_key(pred), [])
+        )
+
+
+class CompiledPredicates:
+    """
+    Evaluates a fixed list of grounded predicates in the current simulator
+    state. The simulator states of the predicates are compiled once into
+    index arrays, then every evaluation queries the simulator once for the
+    object positions, goal positions, receptacle joint states and grasped
+    objects, and checks all the object and articulated object states of the
+    predicates at once. This gives the same result as calling
+    `Predicate.is_true` on every predicate.
+
+    Predicates with states that cannot be compiled, and the robot states
+    that depend on the robot position, are evaluated with
+    `Predicate.is_true` and `PddlRobotState.is_true`.
+    """
+
+    def __init__(self, predicates: List[Predicate], sim_info: PddlSimInfo):
+        """
+        :param predicates: The grounded predicates to evaluate.
+        :param sim_info: The simulator instance the predicates are evaluated
+            in. The predicates must be compiled again for a new instance.
+        """
+        self.sim_info = sim_info
+        self._num_preds = len(predicates)
+        self._fallback_preds: List[Tuple[int, Predicate]] = []
+
+        self._target_idxs = list(sim_info.sim.get_targets()[0])
+        # Boxes of the static receptacles, the boxes of the articulated
+        # receptacles change with their joint states.
+        self._static_boxes: List[Tuple[np.ndarray, np.ndarray]] = []
+        self._static_box_rows: Dict[str, int] = {}
+        self._art_receps: List[PddlEntity] = []
+        self._art_recep_rows: Dict[str, int] = {}
+        self._markers: List[MarkerInfo] = []
+        self._marker_rows: Dict[str, int] = {}
+
+        # Object state terms: predicate, kind, object row in the scene
+        # positions and row of the goal or receptacle.
+        obj_terms: List[Tuple[int, int, int, int]] = []
+        # Articulated object state terms: predicate, marker row, value,
+        # comparison and threshold.
+        art_terms: List[Tuple[int, int, float, int, float]] = []
+        self._robot_terms: List[Tuple[int, PddlEntity, PddlRobotState]] = []
+
+        for pred_idx, pred in enumerate(predicates):
+            state = pred.pddl_sim_state
+            compiled: Optional[list] = None
+            if state is None:
+                pass
+            elif len(state.obj_states) > 0:
+                # Like `PddlSimState.is_true`, only the object states are
+                # checked if there are any, then the articulated object
+                # states, then the robot states.
+                compiled = [
+                    self._compile_obj_state(pred_idx, entity, target)
+                    for entity, target in state.obj_states.items()
+                ]
+                if all(term is not None for term in compiled):
+                    obj_terms.extend(compiled)
+                    continue
+            elif len(state.art_states) > 0:
+                compiled = [
+                    self._compile_art_state(pred_idx, art_entity, set_art)
+                    for art_entity, set_art in state.art_states.items()
+                ]
+                if all(term is not None for term in compiled):
+                    art_terms.extend(compiled)
+                    continue
+            else:
+                self._robot_terms.extend(
+                    (pred_idx, robot_entity, robot_state)
+                    for robot_entity, robot_state in state.robot_states.items()
+                )
+                continue
+            self._fallback_preds.append((pred_idx, pred))
+
+        obj_cols = np.array(obj_terms, dtype=np.int64).reshape(-1, 4)
+        self._obj_pred_idxs = obj_cols[:, 0]
+        self._obj_kinds = obj_cols[:, 1]
+        self._obj_rows = obj_cols[:, 2]
+        self._obj_targ_rows = obj_cols[:, 3]
+        self._obj_at_goal = self._obj_kinds == _OBJ_AT_GOAL
+        self._obj_in_box = self._obj_kinds != _OBJ_AT_GOAL
+        # The boxes of the articulated receptacles follow the static boxes.
+        self._obj_box_rows = np.where(
+            self._obj_kinds == _OBJ_IN_ART_RECEP,
+            self._obj_targ_rows + len(self._static_boxes),
+            self._obj_targ_rows,
+        )[self._obj_in_box]
+
+        art_cols = np.array(art_terms, dtype=np.float64).reshape(-1, 5)
+        self._art_pred_idxs = art_cols[:, 0].astype(np.int64)
+        self._art_marker_rows = art_cols[:, 1].astype(np.int64)
+        self._art_values = art_cols[:, 2]
+        self._art_cmps = art_cols[:, 3].astype(np.int64)
+        self._art_threshs = art_cols[:, 4]
+
+        self._robot_holding_ids: Dict[PddlEntity, int] = {}
+        for _, _, robot_state in self._robot_terms:
+            if robot_state.holding is not None:
+                obj_idx = cast(
+                    int, sim_info.search_for_entity(robot_state.holding)
+                )
+                self._robot_holding_ids[
+                    robot_state.holding
+                ] = sim_info.sim.scene_obj_ids[obj_idx]
+
+    def _compile_obj_state(
+        self, pred_idx: int, entity: PddlEntity, target: PddlEntity
+    ) -> Optional[Tuple[int, int, int, int]]:
+        sim_info = self.sim_info
+        if not sim_info.check_type_matches(
+            entity, SimulatorObjectType.MOVABLE_ENTITY.value
+        ):
+            return None
+        obj_row = sim_info.obj_ids[entity.name]
+
+        # Same order of checks as `_is_obj_state_true`.
+        if sim_info.check_type_matches(
+            target, SimulatorObjectType.ARTICULATED_RECEPTACLE_ENTITY.value
+        ):
+            if target.name not in self._art_recep_rows:
+                self._art_recep_rows[target.name] = len(self._art_receps)
+                self._art_receps.append(target)
+            return (
+                pred_idx,
+                _OBJ_IN_ART_RECEP,
+                obj_row,
+                self._art_recep_rows[target.name],
+            )
+        elif sim_info.check_type_matches(
+            target, SimulatorObjectType.GOAL_ENTITY.value
+        ):
+            targ_idx = sim_info.search_for_entity(target)
+            return (
+                pred_idx,
+                _OBJ_AT_GOAL,
+                obj_row,
+                self._target_idxs.index(targ_idx),
+            )
+        elif sim_info.check_type_matches(
+            target, SimulatorObjectType.STATIC_RECEPTACLE_ENTITY.value
+        ):
+            if target.name not in self._static_box_rows:
+                recep = cast(mn.Range3D, sim_info.search_for_entity(target))
+                self._static_box_rows[target.name] = len(self._static_boxes)
+                self._static_boxes.append(
+                    (np.array(recep.min), np.array(recep.max))
+                )
+            return (
+                pred_idx,
+                _OBJ_IN_STATIC_RECEP,
+                obj_row,
+                self._static_box_rows[target.name],
+            )
+        return None
+
+    def _compile_art_state(
+        self, pred_idx: int, art_entity: PddlEntity, set_art: ArtSampler
+    ) -> Optional[Tuple[int, int, float, int, float]]:
+        sim_info = self.sim_info
+        if set_art.cmp not in _ART_CMPS or not sim_info.check_type_matches(
+            art_entity,
+            SimulatorObjectType.ARTICULATED_RECEPTACLE_ENTITY.value,
+        ):
+            return None
+        if art_entity.name not in self._marker_rows:
+            self._marker_rows[art_entity.name] = len(self._markers)
+            self._markers.append(
+                cast(MarkerInfo, sim_info.search_for_entity(art_entity))
+            )
+        thresh = (
+            set_art.override_thresh
+            if set_art.override_thresh is not None
+            else sim_info.art_thresh
+        )
+        return (
+            pred_idx,
+            self._marker_rows[art_entity.name],
+            set_art.value,
+            _ART_CMPS[set_art.cmp],
+            thresh,
+        )
+
+    def _all_terms_true(
+        self, pred_idxs: np.ndarray, terms_true: np.ndarray
+    ) -> np.ndarray:
+        """
+        Returns for every predicate if all of its terms are true.
+        """
+        return (
+            np.bincount(pred_idxs[~terms_true], minlength=self._num_preds) == 0
+        )
+
+    def _get_boxes(self) -> Tuple[np.ndarray, np.ndarray]:
+        boxes = list(self._static_boxes)
+        for recep in self._art_receps:
+            global_bb = get_receptacle_global_bb(recep, self.sim_info)
+            boxes.append((np.array(global_bb.min), np.array(global_bb.max)))
+        box_min, box_max = zip(*boxes)
+        return np.stack(box_min), np.stack(box_max)
+
+    def _eval_obj_terms(self) -> np.ndarray:
+        sim = self.sim_info.sim
+        obj_pos = sim.get_scene_pos()[self._obj_rows]
+        terms_true = np.zeros(len(self._obj_rows), dtype=bool)
+
+        if self._obj_at_goal.any():
+            _, pos_targs = sim.get_targets()
+            targ_pos = np.asarray(pos_targs)[
+                self._obj_targ_rows[self._obj_at_goal]
+            ]
+            terms_true[self._obj_at_goal] = (
+                np.linalg.norm(obj_pos[self._obj_at_goal] - targ_pos, axis=1)
+                < self.sim_info.obj_thresh
+            )
+
+        if self._obj_in_box.any():
+            box_rows = self._obj_box_rows
+            box_min, box_max = self._get_boxes()
+            pos = obj_pos[self._obj_in_box]
+            # Same as `mn.Range3D.contains`, the upper bound is excluded.
+            terms_true[self._obj_in_box] = np.all(
+                (pos >= box_min[box_rows]) & (pos < box_max[box_rows]), axis=1
+            )
+        return self._all_terms_true(self._obj_pred_idxs, terms_true)
+
+    def _eval_art_terms(self) -> np.ndarray:
+        joint_states = np.array(
+            [marker.get_targ_js() for marker in self._markers]
+        )[self._art_marker_rows]
+        terms_true = np.select(
+            [self._art_cmps == 0, self._art_cmps == 1],
+            [
+                joint_states > self._art_values - self._art_threshs,
+                joint_states < self._art_values + self._art_threshs,
+            ],
+            np.abs(joint_states - self._art_values) < self._art_threshs,
+        )
+        return self._all_terms_true(self._art_pred_idxs, terms_true)
+
+    def _eval_robot_terms(self, truth_vals: np.ndarray) -> None:
+        sim_info = self.sim_info
+        snap_idxs = {
+            robot_id: sim_info.sim.get_agent_data(robot_id).grasp_mgr.snap_idx
+            for robot_id in set(sim_info.robot_ids.values())
+        }
+        for pred_idx, robot_entity, robot_state in self._robot_terms:
+            if not truth_vals[pred_idx]:
+                continue
+            if isinstance(robot_state.pos, PddlEntity):
+                truth_vals[pred_idx] = robot_state.is_true(
+                    sim_info, robot_entity
+                )
+                continue
+            assert not (
+                robot_state.holding is not None and robot_state.should_drop
+            )
+            snap_idx = snap_idxs[sim_info.robot_ids[robot_entity.name]]
+            if robot_state.holding is not None:
+                truth_vals[pred_idx] = (
+                    snap_idx == self._robot_holding_ids[robot_state.holding]
+                )
+            elif robot_state.should_drop:
+                truth_vals[pred_idx] = snap_idx is None
+
+    def is_true(self) -> np.ndarray:
+        """
+        Returns the truth value of every predicate in the current simulator
+        state as a boolean array.
+        """
+        truth_vals = np.ones(self._num_preds, dtype=bool)
+        if len(self._obj_rows) > 0:
+            truth_vals &= self._eval_obj_terms()
+        if len(self._art_marker_rows) > 0:
+            truth_vals &= self._eval_art_terms()
+        if len(self._robot_terms) > 0:
+            self._eval_robot_terms(truth_vals)
+        for pred_idx, pred in self._fallback_preds:
+            truth_vals[pred_idx] = pred.is_true(self.sim_info)
+        return truth_vals
@@ -25,6 +25,7 @@ from habitat.config.default import get_full_habitat_config_path
 from habitat.core.dataset import Episode
 from habitat.datasets.rearrange.rearrange_dataset import RearrangeDatasetV0
 from habitat.tasks.rearrange.multi_task.pddl_action import PddlAction
+from habitat.tasks.rearrange.multi_task.pddl_compiled import PredicateSet
 from habitat.tasks.rearrange.multi_task.pddl_logical_expr import (
     LogicalExpr,
     LogicalExprType,
@@ -70,6 +71,11 @@ class PddlDomain:
         self._sim_info: Optional[PddlSimInfo] = None
         self._config = cur_task_config
         self._orig_actions: Dict[str, PddlAction] = {}
+        # Groundings of the actions in `get_possible_actions`, cleared when
+        # the actions or entities change.
+        self._grounded_actions: Dict[
+            str, List[Tuple[Tuple[PddlEntity, ...], PddlAction]]
+        ] = {}
 
         if read_config:
             # Setup config properties
@@ -111,6 +117,7 @@ class PddlDomain:
     def set_actions(self, actions: Dict[str, PddlAction]) -> None:
         self._orig_actions = actions
         self._actions = dict(actions)
+        self._grounded_actions = {}
 
     def _parse_actions(self, domain_def) -> None:
         """
@@ -211,12 +218,14 @@ class PddlDomain:
         Add a type to `self.expr_types`. Clears every episode
         """
         self._added_expr_types[expr_type.name] = expr_type
+        self._grounded_actions = {}
 
     def register_episode_entity(self, pddl_entity: PddlEntity) -> None:
         """
         Add an entity to appear in `self.all_entities`. Clears every episode.
         """
         self._added_entities[pddl_entity.name] = pddl_entity
+        self._grounded_actions = {}
 
     def _parse_expr_types(self, domain_def):
         """
@@ -348,6 +357,7 @@ class PddlDomain:
 
         self._added_entities = {}
         self._added_expr_types = {}
+        self._grounded_actions = {}
 
         id_to_name = {}
         for k, i in sim.handle_to_object_id.items():
@@ -400,6 +410,7 @@ class PddlDomain:
                 new_ac.set_post_cond_search(assigns)
 
             self._actions[k] = new_ac
+        self._grounded_actions = {}
 
     @property
     def sim_info(self) -> PddlSimInfo:
@@ -482,13 +493,17 @@ class PddlDomain:
             entities in `filter_entities` are allowed.
         :param allowed_action_names: ONLY action names allowed.
         :param restricted_action_names: Action names NOT allowed.
+        :param true_preds: If specified, ONLY actions with preconditions
+            satisfied from these predicates are allowed.
+        :return: The actions are grounded once per instance bind and the same
+            action objects are returned by every call.
         """
         if filter_entities is None:
             filter_entities = []
         if restricted_action_names is None:
             restricted_action_names = []
 
-        all_entities = list(self.all_entities.values())
+        pred_set = None if true_preds is None else PredicateSet(true_preds)
         matching_actions = []
         for action in self.actions.values():
             if (
@@ -500,33 +515,50 @@ class PddlDomain:
             if action.name in restricted_action_names:
                 continue
 
-            for entity_input in itertools.combinations(
-                all_entities, action.n_args
+            for entity_inputs, grounded_action in self._get_grounded_actions(
+                action
             ):
-                # Check that all the filter_entities are in entity_input
+                # Check that all the filter_entities are in entity_inputs
                 matches_filter = all(
-                    filter_entity in entity_input
+                    filter_entity in entity_inputs
                     for filter_entity in filter_entities
                 )
                 if not matches_filter:
                     continue
-
-                for entity_input_perm in itertools.permutations(entity_input):
-                    entity_inputs = cast(List[PddlEntity], entity_input_perm)
-                    if not action.are_args_compatible(entity_inputs):
-                        continue
-                    new_action = action.clone()
-                    new_action.set_param_values(entity_inputs)
-                    if (
-                        true_preds is not None
-                        and not new_action.is_precond_satisfied_from_predicates(
-                            true_preds
-                        )
-                    ):
-                        continue
-                    matching_actions.append(new_action)
+                if (
+                    pred_set is not None
+                    and not grounded_action.is_precond_satisfied_from_predicates(
+                        pred_set
+                    )
+                ):
+                    continue
+                matching_actions.append(grounded_action)
         return matching_actions
 
+    def _get_grounded_actions(
+        self, action: PddlAction
+    ) -> List[Tuple[Tuple[PddlEntity, ...], PddlAction]]:
+        """
+        Returns the action bound to every compatible list of entities, with
+        the entities. The actions are only grounded once per instance bind.
+        """
+        if action.name in self._grounded_actions:
+            return self._grounded_actions[action.name]
+
+        grounded_actions = []
+        for entity_input in itertools.combinations(
+            self.all_entities.values(), action.n_args
+        ):
+            for entity_input_perm in itertools.permutations(entity_input):
+                entity_inputs = cast(List[PddlEntity], entity_input_perm)
+                if not action.are_args_compatible(entity_inputs):
+                    continue
+                new_action = action.clone()
+                new_action.set_param_values(entity_inputs)
+                grounded_actions.append((entity_input_perm, new_action))
+        self._grounded_actions[action.name] = grounded_actions
+        return grounded_actions
+
     def get_ordered_actions(self) -> List[PddlAction]:
         """
         Gets an ordered list of all possible PDDL actions in the environment
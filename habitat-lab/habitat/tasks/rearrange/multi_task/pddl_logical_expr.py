@@ -3,7 +3,7 @@
 # LICENSE file in the root directory of this source tree.
 
 from enum import Enum
-from typing import Dict, List, Optional, Union
+from typing import Container, Dict, List, Optional, Union
 
 from habitat.tasks.rearrange.multi_task.pddl_predicate import Predicate
 from habitat.tasks.rearrange.multi_task.rearrange_pddl import (
@@ -67,7 +67,7 @@ class LogicalExpr:
     def quantifier(self):
         return self._quantifier
 
-    def is_true_from_predicates(self, preds: List[Predicate]) -> bool:
+    def is_true_from_predicates(self, preds: Container[Predicate]) -> bool:
         def check_statement(p):
             if isinstance(p, LogicalExpr):
                 return p.is_true_from_predicates(preds)
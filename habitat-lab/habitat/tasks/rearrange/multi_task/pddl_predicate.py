@@ -72,6 +72,14 @@ class Predicate:
     def name(self):
         return self._name
 
+    @property
+    def arg_values(self) -> Optional[List[PddlEntity]]:
+        return self._arg_values
+
+    @property
+    def pddl_sim_state(self) -> Optional[PddlSimState]:
+        return self._pddl_sim_state
+
     def sub_in(self, sub_dict: Dict[PddlEntity, PddlEntity]) -> "Predicate":
         self._arg_values = [
             sub_dict.get(entity, entity) for entity in self._arg_values
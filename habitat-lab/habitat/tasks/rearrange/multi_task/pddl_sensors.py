@@ -5,7 +5,7 @@
 # LICENSE file in the root directory of this source tree.
 
 
-from typing import List
+from typing import List, Optional
 
 import numpy as np
 from gym import spaces
@@ -13,6 +13,7 @@ from gym import spaces
 from habitat.core.embodied_task import Measure
 from habitat.core.registry import registry
 from habitat.core.simulator import Sensor, SensorTypes
+from habitat.tasks.rearrange.multi_task.pddl_compiled import CompiledPredicates
 from habitat.tasks.rearrange.multi_task.pddl_task import PddlTask
 from habitat.tasks.rearrange.rearrange_sensors import (
     DoesWantTerminate,
@@ -28,6 +29,7 @@ class GlobalPredicatesSensor(Sensor):
         self._task = task
         self._sim = sim
         self._predicates_list = None
+        self._compiled_predicates: Optional[CompiledPredicates] = None
         assert isinstance(task, PddlTask)
         super().__init__(config=config)
 
@@ -52,8 +54,15 @@ class GlobalPredicatesSensor(Sensor):
 
     def get_observation(self, observations, episode, *args, **kwargs):
         sim_info = self._task.pddl_problem.sim_info
-        truth_values = [p.is_true(sim_info) for p in self.predicates_list]
-        return np.array(truth_values, dtype=np.float32)
+        if (
+            self._compiled_predicates is None
+            or self._compiled_predicates.sim_info is not sim_info
+        ):
+            # The simulator info is recreated for every episode.
+            self._compiled_predicates = CompiledPredicates(
+                self.predicates_list, sim_info
+            )
+        return self._compiled_predicates.is_true().astype(np.float32)
 
 
 @registry.register_measure
@@ -251,6 +251,18 @@ class PddlSimState:
     def __repr__(self):
         return f"{self._art_states}, {self._obj_states}, {self._robot_states}"
 
+    @property
+    def art_states(self) -> Dict[PddlEntity, ArtSampler]:
+        return self._art_states
+
+    @property
+    def obj_states(self) -> Dict[PddlEntity, PddlEntity]:
+        return self._obj_states
+
+    @property
+    def robot_states(self) -> Dict[PddlEntity, PddlRobotState]:
+        return self._robot_states
+
     def clone(self) -> "PddlSimState":
         return PddlSimState(
             self._art_states,
@@ -422,19 +434,26 @@ def _is_object_inside(
     Returns if `entity` is inside of `target` in the CURRENT simulator state, NOT at the start of the episode.
     """
     entity_pos = sim_info.get_entity_pos(entity)
+    return get_receptacle_global_bb(target, sim_info).contains(entity_pos)
+
+
+def get_receptacle_global_bb(
+    target: PddlEntity, sim_info: PddlSimInfo
+) -> mn.Range3D:
+    """
+    Returns the bounding box, in the CURRENT simulator state, in which objects
+    are inside of the articulated receptacle `target`.
+    """
     check_marker = cast(
         MarkerInfo,
         sim_info.search_for_entity(target),
     )
     if sim_info.check_type_matches(target, FRIDGE_TYPE):
-        global_bb = get_ao_global_bb(check_marker.ao_parent)
-    else:
-        bb = check_marker.link_node.cumulative_bb
-        global_bb = habitat_sim.geo.get_transformed_bb(
-            bb, check_marker.link_node.transformation
-        )
-
-    return global_bb.contains(entity_pos)
+        return get_ao_global_bb(check_marker.ao_parent)
+    bb = check_marker.link_node.cumulative_bb
+    return habitat_sim.geo.get_transformed_bb(
+        bb, check_marker.link_node.transformation
+    )
 
 
 def _is_obj_state_true(entity, target, sim_info) -> bool:
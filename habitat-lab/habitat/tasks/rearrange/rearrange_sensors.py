@@ -23,6 +23,10 @@ from habitat.tasks.rearrange.utils import (
     get_angle_to_pos,
     get_camera_object_angle,
     get_camera_transform,
+    get_step_base_pos,
+    get_step_ee_pos,
+    get_step_scene_pos,
+    get_step_targets,
     rearrange_logger,
 )
 from habitat.tasks.utils import cartesian_to_polar
@@ -477,6 +481,7 @@ class ObjectToGoalDistance(Measure):
     """
 
     cls_uuid: str = "object_to_goal_distance"
+    is_lazy = True
 
     def __init__(self, sim, config, *args, **kwargs):
         self._sim = sim
@@ -490,9 +495,9 @@ class ObjectToGoalDistance(Measure):
     def reset_metric(self, *args, episode, **kwargs):
         self.update_metric(*args, episode=episode, **kwargs)
 
-    def update_metric(self, *args, episode, **kwargs):
-        idxs, goal_pos = self._sim.get_targets()
-        scene_pos = self._sim.get_scene_pos()
+    def update_metric(self, *args, episode, task, **kwargs):
+        idxs, goal_pos = get_step_targets(task, self._sim)
+        scene_pos = get_step_scene_pos(task, self._sim)
         target_pos = scene_pos[idxs]
         distances = np.linalg.norm(target_pos - goal_pos, ord=2, axis=-1)
         self._metric = {str(idx): dist for idx, dist in enumerate(distances)}
@@ -541,6 +546,7 @@ class ObjAtGoal(Measure):
     """
 
     cls_uuid: str = "obj_at_goal"
+    is_lazy = True
 
     def __init__(self, *args, sim, config, task, **kwargs):
         self._config = config
@@ -580,6 +586,7 @@ class ObjAtGoal(Measure):
 @registry.register_measure
 class EndEffectorToGoalDistance(UsesArticulatedAgentInterface, Measure):
     cls_uuid: str = "ee_to_goal_distance"
+    is_lazy = True
 
     def __init__(self, sim, *args, **kwargs):
         self._sim = sim
@@ -592,14 +599,10 @@ class EndEffectorToGoalDistance(UsesArticulatedAgentInterface, Measure):
     def reset_metric(self, *args, episode, **kwargs):
         self.update_metric(*args, episode=episode, **kwargs)
 
-    def update_metric(self, *args, observations, **kwargs):
-        ee_pos = (
-            self._sim.get_agent_data(self.agent_id)
-            .articulated_agent.ee_transform()
-            .translation
-        )
+    def update_metric(self, *args, task, observations, **kwargs):
+        ee_pos = get_step_ee_pos(task, self._sim, self.agent_id)
 
-        goals = self._sim.get_targets()[1]
+        goals = get_step_targets(task, self._sim)[1]
 
         distances = np.linalg.norm(goals - ee_pos, ord=2, axis=-1)
 
@@ -613,6 +616,7 @@ class EndEffectorToObjectDistance(UsesArticulatedAgentInterface, Measure):
     """
 
     cls_uuid: str = "ee_to_object_distance"
+    is_lazy = True
 
     def __init__(self, sim, config, *args, **kwargs):
         self._sim = sim
@@ -631,15 +635,11 @@ class EndEffectorToObjectDistance(UsesArticulatedAgentInterface, Measure):
     def reset_metric(self, *args, episode, **kwargs):
         self.update_metric(*args, episode=episode, **kwargs)
 
-    def update_metric(self, *args, episode, **kwargs):
-        ee_pos = (
-            self._sim.get_agent_data(self.agent_id)
-            .articulated_agent.ee_transform()
-            .translation
-        )
+    def update_metric(self, *args, episode, task, **kwargs):
+        ee_pos = get_step_ee_pos(task, self._sim, self.agent_id)
 
-        idxs, _ = self._sim.get_targets()
-        scene_pos = self._sim.get_scene_pos()
+        idxs, _ = get_step_targets(task, self._sim)
+        scene_pos = get_step_scene_pos(task, self._sim)
         target_pos = scene_pos[idxs]
 
         distances = np.linalg.norm(target_pos - ee_pos, ord=2, axis=-1)
@@ -671,6 +671,7 @@ class BaseToObjectDistance(UsesArticulatedAgentInterface, Measure):
     """
 
     cls_uuid: str = "base_to_object_distance"
+    is_lazy = True
 
     def __init__(self, sim, config, *args, **kwargs):
         self._sim = sim
@@ -684,17 +685,11 @@ class BaseToObjectDistance(UsesArticulatedAgentInterface, Measure):
     def reset_metric(self, *args, episode, **kwargs):
         self.update_metric(*args, episode=episode, **kwargs)
 
-    def update_metric(self, *args, episode, **kwargs):
-        base_pos = np.array(
-            (
-                self._sim.get_agent_data(
-                    self.agent_id
-                ).articulated_agent.base_pos
-            )
-        )
+    def update_metric(self, *args, episode, task, **kwargs):
+        base_pos = get_step_base_pos(task, self._sim, self.agent_id)
 
-        idxs, _ = self._sim.get_targets()
-        scene_pos = self._sim.get_scene_pos()
+        idxs, _ = get_step_targets(task, self._sim)
+        scene_pos = get_step_scene_pos(task, self._sim)
         target_pos = np.array(scene_pos[idxs])
         distances = np.linalg.norm(
             target_pos[:, [0, 2]] - base_pos[[0, 2]], ord=2, axis=-1
@@ -709,6 +704,7 @@ class EndEffectorToRestDistance(Measure):
     """
 
     cls_uuid: str = "ee_to_rest_distance"
+    is_lazy = True
 
     def __init__(self, sim, config, *args, **kwargs):
         self._sim = sim
@@ -765,8 +761,8 @@ class ReturnToRestDistance(UsesArticulatedAgentInterface, Measure):
                 .articulated_agent.ee_transform()
                 .inverted()
             )
-            idxs, _ = self._sim.get_targets()
-            scene_pos = self._sim.get_scene_pos()
+            idxs, _ = get_step_targets(task, self._sim)
+            scene_pos = get_step_scene_pos(task, self._sim)
             pos = scene_pos[idxs][0]
             pos = T_inv.transform_point(pos)
 
@@ -46,7 +46,11 @@ from habitat.tasks.rearrange.marker_info import MarkerInfo
 from habitat.tasks.rearrange.rearrange_grasp_manager import (
     RearrangeGraspManager,
 )
+from habitat.tasks.rearrange.sim_snapshot import RearrangeSimSnapshot
 from habitat.tasks.rearrange.utils import (
+    CollisionClassifier,
+    ContactPointArrays,
+    SpawnCandidateCache,
     add_perf_timing_func,
     get_rigid_aabb,
     make_render_only,
@@ -101,6 +105,12 @@ class RearrangeSim(HabitatSim):
         ] = {}
         self._prev_obj_names: Optional[List[str]] = None
         self._scene_obj_ids: List[int] = []
+        self._collision_classifier = CollisionClassifier()
+        # The contact points of the current physics state, fetched on demand.
+        self._contact_point_arrays: Optional[ContactPointArrays] = None
+        self._spawn_candidate_cache = SpawnCandidateCache(
+            self.habitat_config.spawn_candidate_cache_size
+        )
         # The receptacle information cached between all scenes.
         self._receptacles_cache: Dict[str, Dict[str, mn.Range3D]] = {}
         # The per episode receptacle information.
@@ -181,6 +191,41 @@ class RearrangeSim(HabitatSim):
         """
         return self._scene_obj_ids
 
+    @property
+    def collision_classifier(self) -> CollisionClassifier:
+        """
+        Classifies the contact points of the agents, see `rearrange_collision`.
+        """
+        return self._collision_classifier
+
+    @property
+    def spawn_candidate_cache(self) -> SpawnCandidateCache:
+        """
+        Navigable agent spawn candidates around targets of the current scene.
+        """
+        return self._spawn_candidate_cache
+
+    def get_contact_point_arrays(self) -> ContactPointArrays:
+        """
+        The physics contact points of the current simulator state. They are
+        only fetched once between physics updates and shared by all users.
+        """
+        if self._contact_point_arrays is None:
+            self._contact_point_arrays = (
+                ContactPointArrays.from_contact_points(
+                    self.get_physics_contact_points()
+                )
+            )
+        return self._contact_point_arrays
+
+    def step_world(self, dt: float = 1.0 / 60.0) -> None:
+        self._contact_point_arrays = None
+        super().step_world(dt)
+
+    def perform_discrete_collision_detection(self) -> None:
+        self._contact_point_arrays = None
+        super().perform_discrete_collision_detection()
+
     @property
     def articulated_agent(self):
         if len(self.agents_mgr) > 1:
@@ -272,6 +317,7 @@ class RearrangeSim(HabitatSim):
     @add_perf_timing_func()
     def reset(self):
         SimulatorBackend.reset(self)
+        self._contact_point_arrays = None
         for i in range(len(self.agents)):
             self.reset_agent(i)
         return None
@@ -347,6 +393,7 @@ class RearrangeSim(HabitatSim):
 
         if new_scene:
             self._load_navmesh(ep_info)
+            self._spawn_candidate_cache.clear()
 
         # Get the starting positions of the target objects.
         scene_pos = self.get_scene_pos()
@@ -366,6 +413,10 @@ class RearrangeSim(HabitatSim):
             for obj_handle in self._targets
         ]
 
+        # The scene objects and agents may have changed.
+        self._collision_classifier.reset(self._scene_obj_ids)
+        self._contact_point_arrays = None
+
         if self.first_setup:
             self.first_setup = False
             self.agents_mgr.first_setup()
@@ -833,6 +884,126 @@ class RearrangeSim(HabitatSim):
                 for grasp_mgr in self.agents_mgr.grasp_iter:
                     grasp_mgr.desnap(True)
 
+    def capture_snapshot(
+        self, with_articulated_agent_js: bool = False
+    ) -> RearrangeSimSnapshot:
+        """
+        Records the same state as `capture_state`, in a
+        `RearrangeSimSnapshot` backed by contiguous arrays that can be
+        compared with `RearrangeSimSnapshot.diff` and serialized with
+        `RearrangeSimSnapshot.to_bytes`.
+
+        :param with_articulated_agent_js: If true, the snapshot includes the
+            articulated_agent joint positions in addition.
+        """
+        rom = self.get_rigid_object_manager()
+        num_objs = len(self._scene_obj_ids)
+        rigid_T = np.empty((num_objs, 4, 4), dtype=np.float32)
+        rigid_V = np.empty((num_objs, 2, 3), dtype=np.float32)
+        for obj_idx, i in enumerate(self._scene_obj_ids):
+            obj_i = rom.get_object_by_id(i)
+            rigid_T[obj_idx] = obj_i.transformation
+            rigid_V[obj_idx, 0] = obj_i.linear_velocity
+            rigid_V[obj_idx, 1] = obj_i.angular_velocity
+
+        articulated_agents = list(self.agents_mgr.articulated_agents_iter)
+        return RearrangeSimSnapshot.from_lists(
+            articulated_agent_T=[
+                np.array(articulated_agent.sim_obj.transformation)
+                for articulated_agent in articulated_agents
+            ],
+            art_T=[np.array(ao.transformation) for ao in self.art_objs],
+            rigid_T=rigid_T,
+            rigid_V=rigid_V,
+            art_pos=[ao.joint_positions for ao in self.art_objs],
+            obj_hold=[
+                grasp_mgr.snap_idx for grasp_mgr in self.agents_mgr.grasp_iter
+            ],
+            articulated_agent_js=[
+                articulated_agent.sim_obj.joint_positions
+                for articulated_agent in articulated_agents
+            ]
+            if with_articulated_agent_js
+            else None,
+        )
+
+    def set_snapshot(
+        self,
+        snapshot: RearrangeSimSnapshot,
+        set_hold: bool = False,
+        only_changed: bool = True,
+    ) -> None:
+        """
+        Sets the simulation state from a snapshot, see `capture_snapshot` and
+        `set_state`.
+
+        :param set_hold: If true this will set the snapped objects from the
+            snapshot.
+        :param only_changed: If true, only the agents and objects with a
+            state that differs from the current state are written back. The
+            other objects are not touched, so their physics state is kept.
+            The joint forces and velocities of the agents that are not
+            written back are not reset.
+        """
+        diff = None
+        if only_changed:
+            diff = snapshot.diff(
+                self.capture_snapshot(
+                    with_articulated_agent_js=snapshot.articulated_agent_js
+                    is not None
+                )
+            )
+
+        # The snapshot matrices are row major, magnum matrices are built
+        # from columns.
+        for agent_idx, robot in enumerate(
+            self.agents_mgr.articulated_agents_iter
+        ):
+            if diff is not None and not diff.articulated_agents[agent_idx]:
+                continue
+            robot.sim_obj.transformation = mn.Matrix4(
+                snapshot.articulated_agent_T[agent_idx].T.tolist()
+            )
+            n_dof = len(robot.sim_obj.joint_forces)
+            robot.sim_obj.joint_forces = np.zeros(n_dof)
+            robot.sim_obj.joint_velocities = np.zeros(n_dof)
+            if snapshot.articulated_agent_js is not None:
+                robot.sim_obj.joint_positions = (
+                    snapshot.get_articulated_agent_js(agent_idx).tolist()
+                )
+
+        rom = self.get_rigid_object_manager()
+        changed_objs = (
+            range(len(self._scene_obj_ids))
+            if diff is None
+            else np.nonzero(diff.rigid_objs)[0]
+        )
+        for obj_idx in changed_objs:
+            obj = rom.get_object_by_id(self._scene_obj_ids[obj_idx])
+            obj.transformation = mn.Matrix4(
+                snapshot.rigid_T[obj_idx].T.tolist()
+            )
+            obj.linear_velocity = mn.Vector3(snapshot.rigid_V[obj_idx, 0])
+            obj.angular_velocity = mn.Vector3(snapshot.rigid_V[obj_idx, 1])
+
+        for art_idx, ao in enumerate(self.art_objs):
+            if diff is not None and not diff.art_objs[art_idx]:
+                continue
+            ao.transformation = mn.Matrix4(snapshot.art_T[art_idx].T.tolist())
+            ao.joint_positions = snapshot.get_art_pos(art_idx).tolist()
+
+        if set_hold:
+            for agent_idx, (obj_hold, grasp_mgr) in enumerate(
+                zip(snapshot.get_obj_hold(), self.agents_mgr.grasp_iter)
+            ):
+                if diff is not None and not diff.obj_hold[agent_idx]:
+                    continue
+                if grasp_mgr.is_grasped:
+                    grasp_mgr.desnap(True)
+                if obj_hold is not None:
+                    self.internal_step(-1)
+                    grasp_mgr.snap_to_obj(obj_hold)
+
     def get_agent_state(self, agent_id: int = 0) -> habitat_sim.AgentState:
         articulated_agent = self.get_agent_data(agent_id).articulated_agent
         rotation = mn.Quaternion.rotation(
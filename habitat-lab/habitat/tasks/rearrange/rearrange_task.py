@@ -347,35 +347,24 @@ class RearrangeTask(NavigationTask):
         ).articulated_agent
         snapped_obj = grasp_mgr.snap_idx
         articulated_agent_id = articulated_agent.sim_obj.object_id
-        contact_points = self._sim.get_physics_contact_points()
-
-        def get_max_force(contact_points, check_id):
-            match_contacts = [
-                x
-                for x in contact_points
-                if (check_id in [x.object_id_a, x.object_id_b])
-                and (x.object_id_a != x.object_id_b)
-            ]
-
-            max_force = 0
-            if len(match_contacts) > 0:
-                max_force = max([abs(x.normal_force) for x in match_contacts])
-
-            return max_force
-
-        forces = [
-            abs(x.normal_force)
-            for x in contact_points
-            if (
-                x.object_id_a not in self._ignore_collisions
-                and x.object_id_b not in self._ignore_collisions
+        contacts = self._sim.get_contact_point_arrays()
+        forces = np.abs(contacts.normal_force)
+
+        def get_max_force(mask):
+            return float(forces[mask].max()) if mask.any() else 0
+
+        def get_max_contact_force(check_id):
+            if check_id is None:
+                return 0
+            return get_max_force(
+                contacts.involves([check_id])
+                & (contacts.object_id_a != contacts.object_id_b)
             )
-        ]
-        max_force = max(forces) if len(forces) > 0 else 0
 
-        max_obj_force = get_max_force(contact_points, snapped_obj)
-        max_articulated_agent_force = get_max_force(
-            contact_points, articulated_agent_id
+        max_force = get_max_force(~contacts.involves(self._ignore_collisions))
+        max_obj_force = get_max_contact_force(snapped_obj)
+        max_articulated_agent_force = get_max_contact_force(
+            articulated_agent_id
         )
         return max_articulated_agent_force, max_obj_force, max_force
 
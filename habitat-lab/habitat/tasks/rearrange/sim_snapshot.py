@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import io
+from dataclasses import dataclass, fields
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Value of `RearrangeSimSnapshot.obj_hold` when an agent holds nothing.
+NO_OBJ_HOLD = -1
+
+
+def _pack_segments(
+    segments: Sequence[Sequence[float]],
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Packs arrays of different lengths into one flat array and the offsets of
+    the arrays in it.
+    """
+    lengths = [len(s) for s in segments]
+    offsets = np.zeros(len(segments) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    flat = np.zeros(offsets[-1], dtype=np.float32)
+    for segment, start, end in zip(segments, offsets[:-1], offsets[1:]):
+        flat[start:end] = segment
+    return flat, offsets
+
+
+def _changed_segments(
+    a: np.ndarray, b: np.ndarray, offsets: np.ndarray, atol: float
+) -> np.ndarray:
+    """
+    Returns for every segment of the packed arrays `a` and `b` if any of its
+    values differ.
+    """
+    num_segments = len(offsets) - 1
+    if len(a) == 0:
+        return np.zeros(num_segments, dtype=bool)
+    owners = np.repeat(np.arange(num_segments), np.diff(offsets))
+    changed = np.abs(a - b) > atol
+    return np.bincount(owners[changed], minlength=num_segments) > 0
+
+
+@dataclass
+class RearrangeSimSnapshotDiff:
+    """
+    Which agents and objects differ between two snapshots, as boolean masks
+    in the order of the snapshots.
+    """
+
+    articulated_agents: np.ndarray
+    art_objs: np.ndarray
+    rigid_objs: np.ndarray
+    obj_hold: np.ndarray
+
+    def any(self) -> bool:
+        return bool(
+            self.articulated_agents.any()
+            or self.art_objs.any()
+            or self.rigid_objs.any()
+            or self.obj_hold.any()
+        )
+
+
+@dataclass
+class RearrangeSimSnapshot:
+    """
+    State of the agents and objects of a `RearrangeSim`, stored in
+    contiguous arrays. Captured with `RearrangeSim.capture_snapshot` and
+    restored with `RearrangeSim.set_snapshot`. Holds the same information as
+    the dict of `RearrangeSim.capture_state`.
+
+    The joint positions of the articulated objects and agents, which have
+    different numbers of joints, are packed into one array with the offset of
+    every object in it.
+
+    :property articulated_agent_T: (num_agents, 4, 4) agent transformations.
+    :property art_T: (num_art_objs, 4, 4) articulated object transformations.
+    :property rigid_T: (num_objs, 4, 4) transformations of the scene objects.
+    :property rigid_V: (num_objs, 2, 3) linear and angular velocities of the
+        scene objects.
+    :property art_pos: Packed joint positions of the articulated objects.
+    :property art_pos_offsets: (num_art_objs + 1,) offsets in `art_pos`.
+    :property obj_hold: (num_agents,) object id held by every agent,
+        `NO_OBJ_HOLD` if the agent holds nothing.
+    :property articulated_agent_js: Packed joint positions of the agents, if
+        captured.
+    :property articulated_agent_js_offsets: (num_agents + 1,) offsets in
+        `articulated_agent_js`, if captured.
+    """
+
+    articulated_agent_T: np.ndarray
+    art_T: np.ndarray
+    rigid_T: np.ndarray
+    rigid_V: np.ndarray
+    art_pos: np.ndarray
+    art_pos_offsets: np.ndarray
+    obj_hold: np.ndarray
+    articulated_agent_js: Optional[np.ndarray] = None
+    articulated_agent_js_offsets: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_lists(
+        cls,
+        articulated_agent_T: Sequence[np.ndarray],
+        art_T: Sequence[np.ndarray],
+        rigid_T: Sequence[np.ndarray],
+        rigid_V: Sequence[np.ndarray],
+        art_pos: Sequence[Sequence[float]],
+        obj_hold: Sequence[Optional[int]],
+        articulated_agent_js: Optional[Sequence[Sequence[float]]] = None,
+    ) -> "RearrangeSimSnapshot":
+        """
+        Packs the state of every agent and object into a snapshot.
+        """
+        art_pos_flat, art_pos_offsets = _pack_segments(art_pos)
+        agent_js_flat, agent_js_offsets = None, None
+        if articulated_agent_js is not None:
+            agent_js_flat, agent_js_offsets = _pack_segments(
+                articulated_agent_js
+            )
+        return cls(
+            articulated_agent_T=np.array(
+                articulated_agent_T, dtype=np.float32
+            ).reshape(-1, 4, 4),
+            art_T=np.array(art_T, dtype=np.float32).reshape(-1, 4, 4),
+            rigid_T=np.array(rigid_T, dtype=np.float32).reshape(-1, 4, 4),
+            rigid_V=np.array(rigid_V, dtype=np.float32).reshape(-1, 2, 3),
+            art_pos=art_pos_flat,
+            art_pos_offsets=art_pos_offsets,
+            obj_hold=np.array(
+                [NO_OBJ_HOLD if i is None else i for i in obj_hold],
+                dtype=np.int64,
+            ),
+            articulated_agent_js=agent_js_flat,
+            articulated_agent_js_offsets=agent_js_offsets,
+        )
+
+    def get_art_pos(self, art_obj_idx: int) -> np.ndarray:
+        """
+        Joint positions of the articulated object at `art_obj_idx`.
+        """
+        return self.art_pos[
+            self.art_pos_offsets[art_obj_idx] : self.art_pos_offsets[
+                art_obj_idx + 1
+            ]
+        ]
+
+    def get_articulated_agent_js(self, agent_idx: int) -> np.ndarray:
+        """
+        Joint positions of the agent at `agent_idx`.
+        """
+        if (
+            self.articulated_agent_js is None
+            or self.articulated_agent_js_offsets is None
+        ):
+            raise ValueError("The agent joint positions were not captured.")
+        offsets = self.articulated_agent_js_offsets
+        return self.articulated_agent_js[
+            offsets[agent_idx] : offsets[agent_idx + 1]
+        ]
+
+    def get_obj_hold(self) -> List[Optional[int]]:
+        """
+        Object id held by every agent, None if the agent holds nothing.
+        """
+        return [None if i == NO_OBJ_HOLD else int(i) for i in self.obj_hold]
+
+    def diff(
+        self, other: "RearrangeSimSnapshot", atol: float = 0.0
+    ) -> RearrangeSimSnapshotDiff:
+        """
+        Compares the snapshot with a snapshot of the same scene.
+
+        :param atol: Values that differ by at most this much are equal.
+        """
+        if (
+            self.rigid_T.shape != other.rigid_T.shape
+            or self.art_T.shape != other.art_T.shape
+            or self.articulated_agent_T.shape
+            != other.articulated_agent_T.shape
+            or not np.array_equal(self.art_pos_offsets, other.art_pos_offsets)
+        ):
+            raise ValueError("Can only compare snapshots of the same scene.")
+
+        def changed(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+            return (
+                (np.abs(a - b) > atol)
+                .reshape(a.shape[0], int(np.prod(a.shape[1:])))
+                .any(axis=1)
+            )
+
+        agents_changed = changed(
+            self.articulated_agent_T, other.articulated_agent_T
+        )
+        if (
+            self.articulated_agent_js is not None
+            and other.articulated_agent_js is not None
+            and self.articulated_agent_js_offsets is not None
+            and np.array_equal(
+                self.articulated_agent_js_offsets,
+                other.articulated_agent_js_offsets,
+            )
+        ):
+            agents_changed |= _changed_segments(
+                self.articulated_agent_js,
+                other.articulated_agent_js,
+                self.articulated_agent_js_offsets,
+                atol,
+            )
+
+        return RearrangeSimSnapshotDiff(
+            articulated_agents=agents_changed,
+            art_objs=changed(self.art_T, other.art_T)
+            | _changed_segments(
+                self.art_pos, other.art_pos, self.art_pos_offsets, atol
+            ),
+            rigid_objs=changed(self.rigid_T, other.rigid_T)
+            | changed(self.rigid_V, other.rigid_V),
+            obj_hold=self.obj_hold != other.obj_hold,
+        )
+
+    def to_bytes(self) -> bytes:
+        """
+        Serializes the snapshot, see `from_bytes`.
+        """
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            **{
+                f.name: getattr(self, f.name)
+                for f in fields(self)
+                if getattr(self, f.name) is not None
+            },
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "RearrangeSimSnapshot":
+        with np.load(io.BytesIO(data)) as arrays:
+            return cls(**{k: arrays[k] for k in arrays.files})
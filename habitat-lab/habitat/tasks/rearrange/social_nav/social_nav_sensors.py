@@ -28,6 +28,7 @@ from habitat.tasks.rearrange.sub_tasks.nav_to_obj_sensors import (
 from habitat.tasks.rearrange.utils import (
     UsesArticulatedAgentInterface,
     batch_transform_point,
+    get_step_base_pos,
 )
 from habitat.tasks.utils import cartesian_to_polar
 
@@ -312,16 +313,8 @@ class SocialNavStats(UsesArticulatedAgentInterface, Measure):
 
     def update_metric(self, *args, episode, task, observations, **kwargs):
         # Get the agent locations
-        robot_pos = np.array(
-            self._sim.get_agent_data(
-                self._robot_idx
-            ).articulated_agent.base_pos
-        )
-        human_pos = np.array(
-            self._sim.get_agent_data(
-                self._human_idx
-            ).articulated_agent.base_pos
-        )
+        robot_pos = get_step_base_pos(task, self._sim, self._robot_idx)
+        human_pos = get_step_base_pos(task, self._sim, self._human_idx)
 
         # Store the human/robot position info
         self.human_pos_list.append(human_pos)
@@ -10,7 +10,7 @@ import os.path as osp
 import pickle
 import time
 from functools import wraps
-from typing import List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 
 import attr
 import magnum as mn
@@ -31,6 +31,9 @@ rearrange_logger = HabitatLogger(
     format_str="[%(levelname)s,%(name)s] %(asctime)-15s %(filename)s:%(lineno)d %(message)s",
 )
 
+# Number of spawn candidates sampled at once when they are not cached.
+SPAWN_CANDIDATE_CHUNK_SIZE = 10
+
 
 def make_render_only(obj, sim):
     obj.motion_type = MotionType.KINEMATIC
@@ -89,6 +92,148 @@ class CollisionDetails:
         )
 
 
+@attr.s(auto_attribs=True, kw_only=True)
+class ContactPointArrays:
+    """
+    The physics contact points of a simulator state as parallel arrays, one
+    entry per contact point.
+    """
+
+    object_id_a: np.ndarray
+    object_id_b: np.ndarray
+    link_id_a: np.ndarray
+    link_id_b: np.ndarray
+    normal_force: np.ndarray
+
+    @classmethod
+    def from_contact_points(cls, contact_points) -> "ContactPointArrays":
+        num_contacts = len(contact_points)
+
+        def get_field(name, dtype):
+            return np.fromiter(
+                (getattr(c, name) for c in contact_points),
+                dtype=dtype,
+                count=num_contacts,
+            )
+
+        return cls(
+            object_id_a=get_field("object_id_a", np.int64),
+            object_id_b=get_field("object_id_b", np.int64),
+            link_id_a=get_field("link_id_a", np.int64),
+            link_id_b=get_field("link_id_b", np.int64),
+            normal_force=get_field("normal_force", np.float64),
+        )
+
+    def involves(self, obj_ids) -> np.ndarray:
+        """
+        Mask of the contact points where either object is in `obj_ids`.
+        """
+        return np.isin(self.object_id_a, obj_ids) | np.isin(
+            self.object_id_b, obj_ids
+        )
+
+
+class CollisionClassifier:
+    """
+    Classifies the physics contact points into the collision categories of
+    `rearrange_collision` with vectorized lookups. The simulator ids of the
+    scene objects and which agent links are base links are cached until
+    `reset` is called when the scene is reconfigured.
+    """
+
+    def __init__(self):
+        self.reset([])
+
+    def reset(self, scene_obj_ids: List[int]) -> None:
+        self._scene_obj_ids = np.array(scene_obj_ids, dtype=np.int64)
+        # Agent simulator id to whether each of its links is a base link.
+        self._agent_base_links: Dict[int, Dict[int, bool]] = {}
+
+    def _is_base_link(
+        self, articulated_agent, agent_id: int, link_ids: np.ndarray
+    ) -> np.ndarray:
+        base_links = self._agent_base_links.setdefault(agent_id, {})
+        for link_id in np.unique(link_ids).tolist():
+            if link_id not in base_links:
+                base_links[link_id] = articulated_agent.is_base_link(link_id)
+        return np.isin(
+            link_ids,
+            [link_id for link_id, is_base in base_links.items() if is_base],
+        )
+
+    def classify(
+        self,
+        contacts: ContactPointArrays,
+        articulated_agent,
+        snapped_obj_id: Optional[int],
+        count_obj_colls: bool,
+        ignore_names: Optional[List[str]] = None,
+        ignore_base: bool = True,
+        get_extra_coll_data: bool = False,
+    ) -> Tuple[bool, CollisionDetails]:
+        """
+        Counts the collisions of an agent, see `rearrange_collision`.
+        """
+        ids_a, ids_b = contacts.object_id_a, contacts.object_id_b
+        agent_id = articulated_agent.get_robot_sim_id()
+        is_agent_a = ids_a == agent_id
+        is_agent = is_agent_a | (ids_b == agent_id)
+
+        # Filter out any collisions with the ignore objects
+        keep = np.ones(len(ids_a), dtype=bool)
+        if ignore_base and is_agent.any():
+            # The agent link of the contact, object a is checked first.
+            agent_link_ids = np.where(
+                is_agent_a, contacts.link_id_a, contacts.link_id_b
+            )
+            keep[is_agent] = ~self._is_base_link(
+                articulated_agent, agent_id, agent_link_ids[is_agent]
+            )
+        if ignore_names is not None:
+            keep &= ~contacts.involves(ignore_names)
+
+        # Check for robot collision
+        robot_matches = keep & is_agent
+        is_reg_obj_coll = contacts.involves(self._scene_obj_ids)
+        robot_obj_colls = int(
+            np.count_nonzero(robot_matches & is_reg_obj_coll)
+        )
+        robot_scene_colls = int(
+            np.count_nonzero(robot_matches & ~is_reg_obj_coll)
+        )
+
+        # Checking for holding object collision
+        obj_scene_colls = 0
+        if count_obj_colls and snapped_obj_id is not None:
+            obj_scene_colls = int(
+                np.count_nonzero(
+                    keep
+                    & ((ids_a == snapped_obj_id) | (ids_b == snapped_obj_id))
+                    & ~is_agent
+                )
+            )
+
+        if get_extra_coll_data:
+            coll_details = CollisionDetails(
+                obj_scene_colls=min(obj_scene_colls, 1),
+                robot_obj_colls=min(robot_obj_colls, 1),
+                robot_scene_colls=min(robot_scene_colls, 1),
+                robot_coll_ids=np.where(is_agent_a, ids_b, ids_a)[
+                    robot_matches
+                ].tolist(),
+                all_colls=list(
+                    zip(ids_a[keep].tolist(), ids_b[keep].tolist())
+                ),
+            )
+        else:
+            coll_details = CollisionDetails(
+                obj_scene_colls=min(obj_scene_colls, 1),
+                robot_obj_colls=min(robot_obj_colls, 1),
+                robot_scene_colls=min(robot_scene_colls, 1),
+            )
+        return coll_details.total_collisions > 0, coll_details
+
+
 def rearrange_collision(
     sim,
     count_obj_colls: bool,
@@ -99,74 +244,16 @@ def rearrange_collision(
     agent_idx: Optional[int] = None,
 ):
     """Defines what counts as a collision for the Rearrange environment execution"""
-    agent_model = sim.get_agent_data(agent_idx).articulated_agent
-    grasp_mgr = sim.get_agent_data(agent_idx).grasp_mgr
-    colls = sim.get_physics_contact_points()
-    agent_id = agent_model.get_robot_sim_id()
-    added_objs = sim.scene_obj_ids
-    snapped_obj_id = grasp_mgr.snap_idx
-
-    def should_keep(x):
-        if ignore_base:
-            match_link = get_match_link(x, agent_id)
-            if match_link is not None and agent_model.is_base_link(match_link):
-                return False
-
-        if ignore_names is not None:
-            should_ignore = any(
-                coll_name_matches(x, ignore_name)
-                for ignore_name in ignore_names
-            )
-            if should_ignore:
-                return False
-        return True
-
-    # Filter out any collisions with the ignore objects
-    colls = list(filter(should_keep, colls))
-    robot_coll_ids = []
-
-    # Check for robot collision
-    robot_obj_colls = 0
-    robot_scene_colls = 0
-    robot_scene_matches = [c for c in colls if coll_name_matches(c, agent_id)]
-    for match in robot_scene_matches:
-        reg_obj_coll = any(
-            coll_name_matches(match, obj_id) for obj_id in added_objs
-        )
-        if reg_obj_coll:
-            robot_obj_colls += 1
-        else:
-            robot_scene_colls += 1
-
-        if match.object_id_a == agent_id:
-            robot_coll_ids.append(match.object_id_b)
-        else:
-            robot_coll_ids.append(match.object_id_a)
-
-    # Checking for holding object collision
-    obj_scene_colls = 0
-    if count_obj_colls and snapped_obj_id is not None:
-        matches = [c for c in colls if coll_name_matches(c, snapped_obj_id)]
-        for match in matches:
-            if coll_name_matches(match, agent_id):
-                continue
-            obj_scene_colls += 1
-
-    if get_extra_coll_data:
-        coll_details = CollisionDetails(
-            obj_scene_colls=min(obj_scene_colls, 1),
-            robot_obj_colls=min(robot_obj_colls, 1),
-            robot_scene_colls=min(robot_scene_colls, 1),
-            robot_coll_ids=robot_coll_ids,
-            all_colls=[(x.object_id_a, x.object_id_b) for x in colls],
-        )
-    else:
-        coll_details = CollisionDetails(
-            obj_scene_colls=min(obj_scene_colls, 1),
-            robot_obj_colls=min(robot_obj_colls, 1),
-            robot_scene_colls=min(robot_scene_colls, 1),
-        )
-    return coll_details.total_collisions > 0, coll_details
+    agent_data = sim.get_agent_data(agent_idx)
+    return sim.collision_classifier.classify(
+        sim.get_contact_point_arrays(),
+        agent_data.articulated_agent,
+        agent_data.grasp_mgr.snap_idx,
+        count_obj_colls,
+        ignore_names=ignore_names,
+        ignore_base=ignore_base,
+        get_extra_coll_data=get_extra_coll_data,
+    )
 
 
 def convert_legacy_cfg(obj_list):
@@ -411,6 +498,51 @@ class UsesArticulatedAgentInterface:
         self.agent_id = None
 
 
+def get_step_scene_pos(task, sim) -> np.ndarray:
+    """
+    `sim.get_scene_pos()`, queried once per update of the measures of the
+    task. The returned array is shared between the measures and must not be
+    modified.
+    """
+    return task.measurements.step_context.get("scene_pos", sim.get_scene_pos)
+
+
+def get_step_targets(task, sim) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    `sim.get_targets()`, queried once per update of the measures of the
+    task. The returned arrays must not be modified.
+    """
+    return task.measurements.step_context.get("targets", sim.get_targets)
+
+
+def get_step_ee_pos(task, sim, agent_id: Optional[int]) -> np.ndarray:
+    """
+    End-effector position of the agent, queried once per update of the
+    measures of the task. The returned array must not be modified.
+    """
+    return task.measurements.step_context.get(
+        f"ee_pos.{agent_id}",
+        lambda: np.array(
+            sim.get_agent_data(agent_id)
+            .articulated_agent.ee_transform()
+            .translation
+        ),
+    )
+
+
+def get_step_base_pos(task, sim, agent_id: Optional[int]) -> np.ndarray:
+    """
+    Base position of the agent, queried once per update of the measures of
+    the task. The returned array must not be modified.
+    """
+    return task.measurements.step_context.get(
+        f"base_pos.{agent_id}",
+        lambda: np.array(
+            sim.get_agent_data(agent_id).articulated_agent.base_pos
+        ),
+    )
+
+
 def write_gfx_replay(gfx_keyframe_str, task_config, ep_id):
     """
     Writes the all replay frames to a file for later replay. Filename is of the
@@ -588,60 +720,51 @@ def _get_robot_spawns(
     start_rotation = agent.base_rot
     start_position = agent.base_pos
 
-    # Try to place the robot.
-    for _ in range(num_spawn_attempts):
-        # Place within `distance_threshold` of the object.
-        candidate_navmesh_position = (
-            sim.pathfinder.get_random_navigable_point_near(
-                target_position,
-                distance_threshold,
-                island_index=sim.largest_island_idx,
-            )
-        )
-        # get_random_navigable_point_near() can return NaNs for start_position.
-        # If we assign nan position into agent.base_pos, we cannot revert it back
-        # We want to make sure that the generated start_position is valid
-        if np.isnan(candidate_navmesh_position).any():
-            continue
-
-        # get the horizontal distance (XZ planar projection) to the target position
-        hor_disp = candidate_navmesh_position - target_position
-        hor_disp[1] = 0
-        target_distance = np.linalg.norm(hor_disp)
-
-        if target_distance > distance_threshold:
-            continue
-
+    # The candidates are already within `distance_threshold` of the object
+    # and on the navmesh. Only run the physics collision checks on them
+    # until a feasible one is found.
+    for candidates in sim.spawn_candidate_cache.get_chunks(
+        sim, target_position, distance_threshold, num_spawn_attempts
+    ):
         # Face the robot towards the object.
-        relative_target = target_position - candidate_navmesh_position
-        angle_to_object = get_angle_to_pos(relative_target)
-        rotation_noise = np.random.normal(0.0, rotation_perturbation_noise)
-        angle_to_object += rotation_noise
-
-        # Set the agent position and rotation
-        set_agent_base_via_obj_trans(
-            candidate_navmesh_position, angle_to_object, agent
+        angles_to_object = get_angles_to_pos(
+            np.asarray(target_position) - candidates
+        ) + np.random.normal(
+            0.0, rotation_perturbation_noise, size=len(candidates)
         )
 
-        is_feasible_state = True
-        if filter_colliding_states:
-            # Make sure the robot is not colliding with anything in this
-            # position.
-            sim.perform_discrete_collision_detection()
-            _, details = rearrange_collision(
-                sim,
-                False,
-                ignore_base=False,
-            )
-
-            # Only care about collisions between the robot and scene.
-            is_feasible_state = details.robot_scene_colls == 0
-
-        if is_feasible_state:
-            # found a feasbile state: reset state and return proposed stated
-            agent.base_pos = start_position
-            agent.base_rot = start_rotation
-            return candidate_navmesh_position, angle_to_object, False
+        for candidate_navmesh_position, angle_to_object in zip(
+            candidates, angles_to_object
+        ):
+            is_feasible_state = True
+            if filter_colliding_states:
+                # Set the agent position and rotation
+                set_agent_base_via_obj_trans(
+                    candidate_navmesh_position, angle_to_object, agent
+                )
+                # Make sure the robot is not colliding with anything in this
+                # position.
+                sim.perform_discrete_collision_detection()
+                _, details = rearrange_collision(
+                    sim,
+                    False,
+                    ignore_base=False,
+                )
+
+                # Only care about collisions between the robot and scene.
+                is_feasible_state = details.robot_scene_colls == 0
+
+            if is_feasible_state:
+                # found a feasbile state: reset state and return proposed stated
+                agent.base_pos = start_position
+                agent.base_rot = start_rotation
+                return candidate_navmesh_position, angle_to_object, False
+
+    # None of the cached candidates is feasible in the current state, sample
+    # new ones next time.
+    sim.spawn_candidate_cache.discard(
+        target_position, distance_threshold, num_spawn_attempts
+    )
 
     # failure to sample a feasbile state: reset state and return initial conditions
     agent.base_pos = start_position
@@ -667,6 +790,154 @@ def get_angle_to_pos(rel_pos: np.ndarray) -> float:
     return heading_angle
 
 
+def get_angles_to_pos(rel_pos: np.ndarray) -> np.ndarray:
+    """
+    Batched version of `get_angle_to_pos`.
+
+    :param rel_pos: (N, 3) relative 3D positions from the robot to the target.
+    :returns: (N,) angles in radians.
+    """
+    rel_pos = np.asarray(rel_pos, dtype=np.float64).reshape(-1, 3)
+    norm = np.linalg.norm(rel_pos[:, [0, 2]], axis=1)
+    cos_angle = np.divide(
+        rel_pos[:, 0], norm, out=np.zeros_like(norm), where=norm != 0
+    )
+    heading_angle = np.arccos(np.clip(cos_angle, -1, 1))
+    return np.where(rel_pos[:, 2] < 0, heading_angle, -heading_angle)
+
+
+class SpawnCandidateCache:
+    """
+    Caches navigable agent spawn candidates within a distance of target
+    positions, keyed by target, distance and number of candidates. The
+    candidates only depend on the navmesh, so the cache must be cleared when
+    the navmesh changes.
+
+    Reusing the candidates of a target makes its spawns less diverse, so the
+    cache is disabled by default and new candidates are sampled on every
+    call, a few at a time.
+
+    :param max_size: The number of targets whose candidates are cached, 0
+        to disable caching.
+    """
+
+    def __init__(self, max_size: int = 0):
+        self._max_size = max_size
+        self._candidates: Dict[Tuple, np.ndarray] = {}
+
+    @staticmethod
+    def _get_key(
+        target_position: np.ndarray,
+        distance_threshold: float,
+        num_candidates: int,
+    ) -> Tuple:
+        return (
+            tuple(np.round(np.asarray(target_position, dtype=np.float64), 4)),
+            distance_threshold,
+            num_candidates,
+        )
+
+    def clear(self) -> None:
+        self._candidates.clear()
+
+    def get(
+        self,
+        sim,
+        target_position: np.ndarray,
+        distance_threshold: float,
+        num_candidates: int,
+    ) -> np.ndarray:
+        """
+        Get the (N, 3) navigable points on the largest island within
+        `distance_threshold` in XZ of the target out of `num_candidates`
+        samples. They are sampled if they are not cached or caching is
+        disabled.
+        """
+        if self._max_size == 0:
+            return sample_navigable_points_near(
+                sim, target_position, distance_threshold, num_candidates
+            )
+        key = self._get_key(
+            target_position, distance_threshold, num_candidates
+        )
+        if key not in self._candidates:
+            if len(self._candidates) >= self._max_size:
+                # Evict the oldest entry.
+                del self._candidates[next(iter(self._candidates))]
+            self._candidates[key] = sample_navigable_points_near(
+                sim, target_position, distance_threshold, num_candidates
+            )
+        return self._candidates[key]
+
+    def get_chunks(
+        self,
+        sim,
+        target_position: np.ndarray,
+        distance_threshold: float,
+        num_candidates: int,
+    ) -> Iterator[np.ndarray]:
+        """
+        Yields the candidates of `get` in random order. When caching is
+        disabled, they are sampled `SPAWN_CANDIDATE_CHUNK_SIZE` at a time so
+        that no more candidates are sampled once the caller stops iterating.
+        """
+        if self._max_size > 0:
+            candidates = self.get(
+                sim, target_position, distance_threshold, num_candidates
+            )
+            yield candidates[np.random.permutation(len(candidates))]
+            return
+        for start in range(0, num_candidates, SPAWN_CANDIDATE_CHUNK_SIZE):
+            yield sample_navigable_points_near(
+                sim,
+                target_position,
+                distance_threshold,
+                min(SPAWN_CANDIDATE_CHUNK_SIZE, num_candidates - start),
+            )
+
+    def discard(
+        self,
+        target_position: np.ndarray,
+        distance_threshold: float,
+        num_candidates: int,
+    ) -> None:
+        self._candidates.pop(
+            self._get_key(target_position, distance_threshold, num_candidates),
+            None,
+        )
+
+
+def sample_navigable_points_near(
+    sim,
+    target_position: np.ndarray,
+    distance_threshold: float,
+    num_samples: int,
+) -> np.ndarray:
+    """
+    Samples navigable points on the largest island near the target position and
+    only keeps the valid ones within `distance_threshold` of it in XZ.
+
+    :return: (N, 3) array of points, N <= num_samples.
+    """
+    points = np.array(
+        [
+            sim.pathfinder.get_random_navigable_point_near(
+                target_position,
+                distance_threshold,
+                island_index=sim.largest_island_idx,
+            )
+            for _ in range(num_samples)
+        ],
+        dtype=np.float32,
+    ).reshape(-1, 3)
+    # get_random_navigable_point_near() can return NaNs, these are filtered
+    # out by the distance check.
+    hor_dist = np.linalg.norm(
+        points[:, [0, 2]] - np.asarray(target_position)[[0, 2]], axis=1
+    )
+    return points[hor_dist <= distance_threshold]
+
+
 def add_perf_timing_func(name: Optional[str] = None):
     """
     Function decorator for logging the speed of a method to the RearrangeSim.
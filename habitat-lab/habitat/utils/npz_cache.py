@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+r"""LRU cache of values that are computed from the navmesh of a scene, such
+as top-down maps and geodesic distance fields, optionally persisted to disk
+as ``.npz`` files shared by all the processes using the same directory.
+"""
+
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Hashable, Optional, TypeVar
+
+import numpy as np
+
+T = TypeVar("T")
+
+
+def get_navmesh_hash(pathfinder: Any) -> str:
+    r"""Returns a hash of the bounds and navigable area of the navmesh of
+    pathfinder, which changes when the navmesh is recomputed.
+    """
+    lower_bound, upper_bound = pathfinder.get_bounds()
+    navmesh_info = np.array(
+        [*lower_bound, *upper_bound, pathfinder.navigable_area],
+        dtype=np.float64,
+    )
+    return hashlib.sha1(navmesh_info.tobytes()).hexdigest()[:16]
+
+
+def save_npz(path: str, compressed: bool = False, **arrays: Any) -> None:
+    r"""Saves the arrays to path. They are written to a temporary file first
+    so that concurrent readers never see a partially written file.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    if compressed:
+        np.savez_compressed(tmp_path, **arrays)
+    else:
+        np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+
+class NpzCache(Generic[T]):
+    r"""Keeps the most recently used values in memory. If a cache directory
+    is set, the values are also written there as ``.npz`` files so that
+    every value is only computed once by all the processes sharing the
+    directory. :py:`None` values are only kept in memory.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        to_arrays: Callable[[T], Dict[str, Any]],
+        from_arrays: Callable[[Dict[str, np.ndarray]], T],
+        cache_dir: Optional[str] = None,
+        file_prefix: str = "",
+        compressed: bool = False,
+    ) -> None:
+        r"""
+        :param max_size: Number of values kept in memory.
+        :param to_arrays: Returns the arrays a value is saved as.
+        :param from_arrays: Builds a value from the arrays it was saved as.
+        :param cache_dir: Optional directory the values are stored in.
+        :param file_prefix: Prefix of the names of the files of the values.
+        :param compressed: Whether the files are compressed.
+        """
+        self._max_size = max_size
+        self._to_arrays = to_arrays
+        self._from_arrays = from_arrays
+        self._cache_dir = cache_dir
+        self._file_prefix = file_prefix
+        self._compressed = compressed
+        self._values: "OrderedDict[Hashable, Optional[T]]" = OrderedDict()
+
+    def _get_path(self, key: Hashable) -> Optional[str]:
+        if self._cache_dir is None:
+            return None
+        key_hash = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(
+            self._cache_dir, f"{self._file_prefix}{key_hash}.npz"
+        )
+
+    def get(
+        self, key: Hashable, create_fn: Callable[[], Optional[T]]
+    ) -> Optional[T]:
+        r"""Returns the value of key, loading it from the cache directory or
+        computing it with create_fn if it is not in memory. The repr of key
+        must identify the value across processes.
+        """
+        if key in self._values:
+            self._values.move_to_end(key)
+            return self._values[key]
+
+        path = self._get_path(key)
+        value: Optional[T]
+        if path is not None and os.path.exists(path):
+            with np.load(path) as data:
+                value = self._from_arrays(dict(data))
+        else:
+            value = create_fn()
+            if path is not None and value is not None:
+                os.makedirs(self._cache_dir, exist_ok=True)  # type: ignore[arg-type]
+                save_npz(path, self._compressed, **self._to_arrays(value))
+
+        self._values[key] = value
+        if len(self._values) > self._max_size:
+            self._values.popitem(last=False)
+        return value
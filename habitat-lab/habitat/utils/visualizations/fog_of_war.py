@@ -11,9 +11,10 @@ from habitat.utils.visualizations import maps
 
 
 @numba.jit(nopython=True)
-def bresenham_supercover_line(pt1, pt2):
-    r"""Line drawing algo based
-    on http://eugen.dedu.free.fr/projects/bresenham/
+def _walk_supercover_line(pt1, pt2, visit, state):
+    r"""Calls :py:`visit(state, x, y)` on the points of the line between pt1
+    and pt2 in order, see :ref:`bresenham_supercover_line`. The walk stops
+    at the first point for which visit returns False.
     """
 
     ystep, xstep = 1, 1
@@ -29,7 +30,8 @@ def bresenham_supercover_line(pt1, pt2):
         xstep *= -1
         dx *= -1
 
-    line_pts = [[x, y]]
+    if not visit(state, x, y):
+        return
 
     ddx, ddy = 2 * dx, 2 * dy
     if ddx > ddy:
@@ -43,14 +45,19 @@ def bresenham_supercover_line(pt1, pt2):
                 y += ystep
                 error -= ddx
                 if error + errorprev < ddx:
-                    line_pts.append([x, y - ystep])
+                    if not visit(state, x, y - ystep):
+                        return
                 elif error + errorprev > ddx:
-                    line_pts.append([x - xstep, y])
+                    if not visit(state, x - xstep, y):
+                        return
                 else:
-                    line_pts.append([x - xstep, y])
-                    line_pts.append([x, y - ystep])
+                    if not visit(state, x - xstep, y):
+                        return
+                    if not visit(state, x, y - ystep):
+                        return
 
-            line_pts.append([x, y])
+            if not visit(state, x, y):
+                return
 
             errorprev = error
     else:
@@ -64,37 +71,71 @@ def bresenham_supercover_line(pt1, pt2):
                 x += xstep
                 error -= ddy
                 if error + errorprev < ddy:
-                    line_pts.append([x - xstep, y])
+                    if not visit(state, x - xstep, y):
+                        return
                 elif error + errorprev > ddy:
-                    line_pts.append([x, y - ystep])
+                    if not visit(state, x, y - ystep):
+                        return
                 else:
-                    line_pts.append([x - xstep, y])
-                    line_pts.append([x, y - ystep])
+                    if not visit(state, x - xstep, y):
+                        return
+                    if not visit(state, x, y - ystep):
+                        return
 
-            line_pts.append([x, y])
+            if not visit(state, x, y):
+                return
 
             errorprev = error
 
+
+@numba.jit(nopython=True)
+def _append_point(line_pts, x, y):
+    line_pts.append([x, y])
+    return True
+
+
+@numba.jit(nopython=True)
+def bresenham_supercover_line(pt1, pt2):
+    r"""Line drawing algo based
+    on http://eugen.dedu.free.fr/projects/bresenham/
+    """
+    x, y = pt1
+    # An empty list of points, typed from the first point
+    line_pts = [[x, y] for _ in range(0)]
+    _walk_supercover_line(pt1, pt2, _append_point, line_pts)
     return line_pts
 
 
 @numba.jit(nopython=True)
-def draw_fog_of_war_line(top_down_map, fog_of_war_mask, pt1, pt2):
-    r"""Draws a line on the fog_of_war_mask mask between pt1 and pt2"""
+def _reveal_point(state, x, y):
+    r"""Reveals a point of a line on the fog_of_war_mask.
+
+    Returns False if the line is blocked at the point.
+    """
+    top_down_map, fog_of_war_mask = state
+    if x < 0 or x >= fog_of_war_mask.shape[0]:
+        return False
+
+    if y < 0 or y >= fog_of_war_mask.shape[1]:
+        return False
 
-    for pt in bresenham_supercover_line(pt1, pt2):
-        x, y = pt
+    if top_down_map[x, y] == maps.MAP_INVALID_POINT:
+        return False
 
-        if x < 0 or x >= fog_of_war_mask.shape[0]:
-            break
+    fog_of_war_mask[x, y] = 1
+    return True
 
-        if y < 0 or y >= fog_of_war_mask.shape[1]:
-            break
 
-        if top_down_map[x, y] == maps.MAP_INVALID_POINT:
-            break
+@numba.jit(nopython=True)
+def draw_fog_of_war_line(top_down_map, fog_of_war_mask, pt1, pt2):
+    r"""Draws a line on the fog_of_war_mask mask between pt1 and pt2
 
-        fog_of_war_mask[x, y] = 1
+    The points of the line are revealed while walking it, so no list of
+    points is built and the walk stops at the first blocked point.
+    """
+    _walk_supercover_line(
+        pt1, pt2, _reveal_point, (top_down_map, fog_of_war_mask)
+    )
 
 
 @numba.jit(nopython=True)
@@ -119,6 +160,64 @@ def _draw_loop(
         )
 
 
+@numba.jit(nopython=True)
+def _draw_batch_loop(
+    top_down_map,
+    fog_of_war_mask,
+    points,
+    point_angles,
+    max_line_len,
+    angles,
+):
+    for i in range(points.shape[0]):
+        _draw_loop(
+            top_down_map,
+            fog_of_war_mask,
+            points[i],
+            point_angles[i],
+            max_line_len,
+            angles,
+        )
+
+
+def _fov_angles(fov: float, max_line_len: float) -> np.ndarray:
+    fov = np.deg2rad(fov)
+
+    # Set the angle step to a value such that delta_angle * max_line_len = 1
+    return np.arange(
+        -fov / 2, fov / 2, step=1.0 / max_line_len, dtype=np.float32
+    )
+
+
+def reveal_fog_of_war_batch(
+    top_down_map: np.ndarray,
+    fog_of_war_mask: np.ndarray,
+    points: np.ndarray,
+    point_angles: np.ndarray,
+    fov: float = 90,
+    max_line_len: float = 100,
+) -> None:
+    r"""Reveals the fog-of-war in place at several locations at once, e.g.
+    the locations of all the agents, see :ref:`reveal_fog_of_war`.
+
+    Args:
+        top_down_map: The current top down map.  Used for respecting walls when revealing
+        fog_of_war_mask: The fog-of-war mask to reveal the fog-of-war on
+        points: (N, 2) locations on the fog_of_war_mask
+        point_angles: (N,) look directions at the locations
+        fov: The feild of view of the agent
+        max_line_len: The maximum length of the lines used to reveal the fog-of-war
+    """
+    _draw_batch_loop(
+        top_down_map,
+        fog_of_war_mask,
+        np.asarray(points, dtype=np.int64).reshape(-1, 2),
+        np.asarray(point_angles, dtype=np.float64).reshape(-1),
+        max_line_len,
+        _fov_angles(fov, max_line_len),
+    )
+
+
 def reveal_fog_of_war(
     top_down_map: np.ndarray,
     current_fog_of_war_mask: np.ndarray,
@@ -143,13 +242,6 @@ def reveal_fog_of_war(
     Returns:
         The updated fog_of_war_mask
     """
-    fov = np.deg2rad(fov)
-
-    # Set the angle step to a value such that delta_angle * max_line_len = 1
-    angles = np.arange(
-        -fov / 2, fov / 2, step=1.0 / max_line_len, dtype=np.float32
-    )
-
     fog_of_war_mask = current_fog_of_war_mask.copy()
     _draw_loop(
         top_down_map,
@@ -157,7 +249,7 @@ def reveal_fog_of_war(
         current_point,
         current_angle,
         max_line_len,
-        angles,
+        _fov_angles(fov, max_line_len),
     )
 
     return fog_of_war_mask
@@ -5,13 +5,14 @@
 # LICENSE file in the root directory of this source tree.
 
 import os
-from typing import Any, Dict, List, Optional, Sequence, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 
 import imageio
 import numpy as np
 import scipy.ndimage
 
 from habitat.core.utils import try_cv2_import
+from habitat.utils.npz_cache import NpzCache, get_navmesh_hash
 from habitat.utils.visualizations import utils
 
 try:
@@ -185,6 +186,110 @@ def pointnav_draw_target_birdseye_view(
     return im_position
 
 
+class GridTransform:
+    r"""Converts between real world coordinates and gridworld indices of a
+    top-down map, see :ref:`to_grid` and :ref:`from_grid`. The bounds of the
+    pathfinder are read once when the transform is created and the
+    conversions take arrays of coordinates.
+
+    The conversions of arrays give the same results as converting every
+    coordinate on its own with :ref:`to_grid` and :ref:`from_grid`.
+    """
+
+    def __init__(
+        self,
+        lower_bound: Sequence[float],
+        upper_bound: Sequence[float],
+        grid_resolution: Tuple[int, int],
+    ):
+        r"""
+        :param lower_bound: The lower bound of the pathfinder.
+        :param upper_bound: The upper bound of the pathfinder.
+        :param grid_resolution: The shape of the top-down map.
+        """
+        self._lower_bound = (lower_bound[2], lower_bound[0])
+        self._grid_size = (
+            abs(upper_bound[2] - lower_bound[2]) / grid_resolution[0],
+            abs(upper_bound[0] - lower_bound[0]) / grid_resolution[1],
+        )
+
+    @classmethod
+    def from_sim(
+        cls,
+        grid_resolution: Tuple[int, int],
+        sim: Optional["HabitatSim"] = None,
+        pathfinder=None,
+    ) -> "GridTransform":
+        if sim is None and pathfinder is None:
+            raise RuntimeError(
+                "Must provide either a simulator or pathfinder instance"
+            )
+
+        if pathfinder is None:
+            pathfinder = sim.pathfinder
+
+        lower_bound, upper_bound = pathfinder.get_bounds()
+        return cls(lower_bound, upper_bound, grid_resolution)
+
+    @staticmethod
+    def _to_grid_axis(realworld: Any, lower_bound, grid_size) -> np.ndarray:
+        realworld = np.asarray(realworld)
+        # Compute in the precision the same operations on scalars use.
+        diff_type = type(realworld.dtype.type(0) - lower_bound)
+        diff = realworld.astype(diff_type) - diff_type(lower_bound)
+        div_type = type(diff_type(0) / grid_size)
+        return np.trunc(diff.astype(div_type) / div_type(grid_size)).astype(
+            np.int64
+        )
+
+    @staticmethod
+    def _from_grid_axis(grid: Any, lower_bound, grid_size) -> np.ndarray:
+        grid = np.asarray(grid)
+        # Compute in the precision the same operations on scalars use.
+        mul_type = type(grid.dtype.type(0) * grid_size)
+        offset = grid.astype(mul_type) * mul_type(grid_size)
+        add_type = type(lower_bound + mul_type(0))
+        return add_type(lower_bound) + offset.astype(add_type)
+
+    def to_grid(
+        self, realworld_x: Any, realworld_y: Any
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        r"""Returns the gridworld indices of arrays of real world
+        coordinates.
+        """
+        return (
+            self._to_grid_axis(
+                realworld_x, self._lower_bound[0], self._grid_size[0]
+            ),
+            self._to_grid_axis(
+                realworld_y, self._lower_bound[1], self._grid_size[1]
+            ),
+        )
+
+    def points_to_grid(self, points: Any) -> np.ndarray:
+        r"""Returns the (N, 2) gridworld indices of (N, 3) real world
+        positions.
+        """
+        points = np.asarray(points).reshape(-1, 3)
+        grid_x, grid_y = self.to_grid(points[:, 2], points[:, 0])
+        return np.stack([grid_x, grid_y], axis=-1)
+
+    def from_grid(
+        self, grid_x: Any, grid_y: Any
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        r"""Returns the real world coordinates of arrays of gridworld
+        indices.
+        """
+        return (
+            self._from_grid_axis(
+                grid_x, self._lower_bound[0], self._grid_size[0]
+            ),
+            self._from_grid_axis(
+                grid_y, self._lower_bound[1], self._grid_size[1]
+            ),
+        )
+
+
 def to_grid(
     realworld_x: float,
     realworld_y: float,
@@ -195,25 +300,13 @@ def to_grid(
     r"""Return gridworld index of realworld coordinates assuming top-left corner
     is the origin. The real world coordinates of lower left corner are
     (coordinate_min, coordinate_min) and of top right corner are
-    (coordinate_max, coordinate_max)
+    (coordinate_max, coordinate_max). Use :ref:`GridTransform` to convert
+    many coordinates.
     """
-    if sim is None and pathfinder is None:
-        raise RuntimeError(
-            "Must provide either a simulator or pathfinder instance"
-        )
-
-    if pathfinder is None:
-        pathfinder = sim.pathfinder
-
-    lower_bound, upper_bound = pathfinder.get_bounds()
-
-    grid_size = (
-        abs(upper_bound[2] - lower_bound[2]) / grid_resolution[0],
-        abs(upper_bound[0] - lower_bound[0]) / grid_resolution[1],
-    )
-    grid_x = int((realworld_x - lower_bound[2]) / grid_size[0])
-    grid_y = int((realworld_y - lower_bound[0]) / grid_size[1])
-    return grid_x, grid_y
+    grid_x, grid_y = GridTransform.from_sim(
+        grid_resolution, sim=sim, pathfinder=pathfinder
+    ).to_grid(realworld_x, realworld_y)
+    return int(grid_x), int(grid_y)
 
 
 def from_grid(
@@ -226,26 +319,13 @@ def from_grid(
     r"""Inverse of _to_grid function. Return real world coordinate from
     gridworld assuming top-left corner is the origin. The real world
     coordinates of lower left corner are (coordinate_min, coordinate_min) and
-    of top right corner are (coordinate_max, coordinate_max)
+    of top right corner are (coordinate_max, coordinate_max). Use
+    :ref:`GridTransform` to convert many coordinates.
     """
-
-    if sim is None and pathfinder is None:
-        raise RuntimeError(
-            "Must provide either a simulator or pathfinder instance"
-        )
-
-    if pathfinder is None:
-        pathfinder = sim.pathfinder
-
-    lower_bound, upper_bound = pathfinder.get_bounds()
-
-    grid_size = (
-        abs(upper_bound[2] - lower_bound[2]) / grid_resolution[0],
-        abs(upper_bound[0] - lower_bound[0]) / grid_resolution[1],
-    )
-    realworld_x = lower_bound[2] + grid_x * grid_size[0]
-    realworld_y = lower_bound[0] + grid_y * grid_size[1]
-    return realworld_x, realworld_y
+    realworld_x, realworld_y = GridTransform.from_sim(
+        grid_resolution, sim=sim, pathfinder=pathfinder
+    ).from_grid(grid_x, grid_y)
+    return realworld_x[()], realworld_y[()]
 
 
 def _outline_border(top_down_map):
@@ -346,6 +426,79 @@ def get_topdown_map_from_sim(
     )
 
 
+class TopDownMapStore:
+    r"""Caches the top-down maps of :ref:`get_topdown_map`, which only depend
+    on the navmesh of a scene and the floor they are drawn for.
+
+    The maps are keyed by the scene, a hash of the navmesh, the height band of
+    the floor, the meters per pixel and whether the border is drawn. The most
+    recently used maps are kept in memory. If a cache directory is set, the
+    maps are also written there as ``.npz`` files so that all the processes
+    sharing the directory only compute every map once.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 4,
+        cache_dir: Optional[str] = None,
+        height_band: float = 0.01,
+    ):
+        r"""
+        :param max_size: Number of maps kept in memory.
+        :param cache_dir: Optional directory the maps are stored in.
+        :param height_band: Size in meters of the bands of agent heights that
+            share a map. The map of a band is drawn at the center height of
+            the band.
+        """
+        self._height_band = height_band
+        self._maps: NpzCache[np.ndarray] = NpzCache(
+            max_size,
+            to_arrays=lambda top_down_map: {"top_down_map": top_down_map},
+            from_arrays=lambda data: data["top_down_map"],
+            cache_dir=cache_dir,
+            file_prefix="top_down_map_",
+            compressed=True,
+        )
+
+    def get_topdown_map(
+        self,
+        scene: str,
+        pathfinder,
+        height: float,
+        map_resolution: int = 1024,
+        draw_border: bool = True,
+        meters_per_pixel: Optional[float] = None,
+    ) -> np.ndarray:
+        r"""Returns the cached top-down map of the floor at `height`, see
+        :ref:`get_topdown_map`. The returned map is shared and must not be
+        modified.
+        """
+        if meters_per_pixel is None:
+            meters_per_pixel = calculate_meters_per_pixel(
+                map_resolution, pathfinder=pathfinder
+            )
+        band = int(round(height / self._height_band))
+        key = (
+            scene,
+            get_navmesh_hash(pathfinder),
+            band,
+            float(meters_per_pixel),
+            draw_border,
+        )
+        top_down_map = self._maps.get(
+            key,
+            lambda: get_topdown_map(
+                pathfinder,
+                band * self._height_band,
+                map_resolution,
+                draw_border,
+                meters_per_pixel,
+            ),
+        )
+        assert top_down_map is not None
+        return top_down_map
+
+
 def colorize_topdown_map(
     top_down_map: np.ndarray,
     fog_of_war_mask: Optional[np.ndarray] = None,
@@ -379,7 +532,7 @@ def colorize_topdown_map(
 
 def draw_path(
     top_down_map: np.ndarray,
-    path_points: Sequence[Tuple],
+    path_points: Union[Sequence[Tuple], np.ndarray],
     color: int = 10,
     thickness: int = 2,
 ) -> None:
@@ -387,18 +540,69 @@ def draw_path(
     Args:
         top_down_map: A colored version of the map.
         color: color code of the path, from TOP_DOWN_MAP_COLORS.
-        path_points: list of points that specify the path to be drawn
+        path_points: list or (N, 2) array of points that specify the path
+            to be drawn
         thickness: thickness of the path.
     """
-    for prev_pt, next_pt in zip(path_points[:-1], path_points[1:]):
-        # Swapping x y
-        cv2.line(
-            top_down_map,
-            prev_pt[::-1],
-            next_pt[::-1],
-            color,
-            thickness=thickness,
-        )
+    if len(path_points) < 2:
+        return
+    # Swapping x y
+    polyline = np.ascontiguousarray(
+        np.asarray(path_points).reshape(-1, 2)[:, ::-1], dtype=np.int32
+    )
+    # Draws the same pixels as a line per segment.
+    cv2.polylines(top_down_map, [polyline], False, color, thickness=thickness)
+
+
+def downsample_topdown_map(
+    top_down_map: np.ndarray, factor: int
+) -> np.ndarray:
+    r"""Downsamples a top down map by an integer factor. Each pixel takes the
+    largest value of the pixels it covers, so that paths and indicators drawn
+    on the map are kept.
+    """
+    if factor <= 1:
+        return top_down_map
+    rows, cols = top_down_map.shape
+    padded = np.zeros(
+        (-(-rows // factor) * factor, -(-cols // factor) * factor),
+        dtype=top_down_map.dtype,
+    )
+    padded[:rows, :cols] = top_down_map
+    return padded.reshape(
+        padded.shape[0] // factor, factor, padded.shape[1] // factor, factor
+    ).max(axis=(1, 3))
+
+
+def apply_top_down_map_delta(
+    topdown_map_info: Dict[str, Any],
+    previous_topdown_map_info: Optional[Dict[str, Any]],
+) -> Dict[str, Any]:
+    r"""Returns the full output of the TopDownMap measure from its output
+    with :py:`output_mode="delta"`.
+
+    :param topdown_map_info: The output of the TopDownMap measure
+    :param previous_topdown_map_info: The full output of the previous step,
+        whose arrays are updated in place
+    """
+    if "map" in topdown_map_info:
+        return topdown_map_info
+
+    assert (
+        previous_topdown_map_info is not None
+    ), "A delta can only be applied to the output of the previous step"
+    for key in ("map", "fog_of_war_mask"):
+        delta = topdown_map_info[f"{key}_delta"]
+        if delta is not None:
+            row, col, patch = delta
+            previous_topdown_map_info[key][
+                row : row + patch.shape[0], col : col + patch.shape[1]
+            ] = patch
+    return dict(
+        previous_topdown_map_info,
+        agent_map_coord=topdown_map_info["agent_map_coord"],
+        agent_angle=topdown_map_info["agent_angle"],
+    )
 
 
 def colorize_draw_agent_and_fit_to_height(
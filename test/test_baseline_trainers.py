@@ -11,6 +11,7 @@ import os
 import random
 from copy import deepcopy
 
+import numpy as np
 import pytest
 
 from habitat.config.default import get_agent_config
@@ -23,6 +24,7 @@ try:
     import habitat_sim.utils.datasets_download as data_downloader
     from habitat_baselines.common.base_trainer import BaseRLTrainer
     from habitat_baselines.common.baseline_registry import baseline_registry
+    from habitat_baselines.common.rollout_storage import compute_gae_returns
     from habitat_baselines.config.default import get_config
     from habitat_baselines.rl.ddppo.ddp_utils import find_free_port
     from habitat_baselines.run import execute_exp
@@ -456,3 +458,160 @@ def test_batch_obs(sensor_device, batched_device):
     ]
 
     _ = batch_obs(sensors, device=batched_device)
+
+
+@pytest.mark.skipif(
+    not baseline_installed, reason="baseline sub-module not installed"
+)
+@pytest.mark.parametrize("batched_device", ["cpu", "cuda"])
+def test_batch_obs_flat_numpy(batched_device):
+    if batched_device == "cuda" and not torch.cuda.is_available():
+        pytest.skip("CUDA not avaliable")
+
+    rng = np.random.RandomState(0)
+    for num_envs in [4, 2, 6]:
+        sensors = [
+            {
+                "rgb": rng.randint(0, 255, (16, 16, 3)).astype(np.uint8),
+                "depth": rng.rand(16, 16, 1).astype(np.float32),
+                "gps": rng.rand(2),
+                "is_holding": np.array([True]),
+            }
+            for _ in range(num_envs)
+        ]
+        batch = batch_obs(sensors, device=torch.device(batched_device))
+        assert list(batch.keys()) == sorted(sensors[0].keys())
+        for k, v in batch.items():
+            assert v.device.type == batched_device
+            assert np.array_equal(
+                v.cpu().numpy(), np.stack([s[k] for s in sensors])
+            )
+
+    # Nested observations are batched through the generic path.
+    batch = batch_obs(
+        [{"a": {"b": np.zeros(3)}, "c": np.ones(2)} for _ in range(2)]
+    )
+    assert batch["a"]["b"].shape == (2, 3)
+
+
+@pytest.mark.skipif(
+    not baseline_installed, reason="baseline sub-module not installed"
+)
+def test_compute_gae_returns():
+    gamma, tau = 0.99, 0.95
+    torch.manual_seed(0)
+    for num_steps in [1, 5, 128]:
+        rewards = torch.randn(num_steps, 4, 1)
+        value_preds = torch.randn(num_steps + 1, 4, 1)
+        masks = torch.rand(num_steps + 1, 4, 1) > 0.1
+
+        expected = torch.zeros(num_steps, 4, 1)
+        gae = 0.0
+        for step in reversed(range(num_steps)):
+            delta = (
+                rewards[step]
+                + gamma * value_preds[step + 1] * masks[step + 1]
+                - value_preds[step]
+            )
+            gae = delta + gamma * tau * gae * masks[step + 1]
+            expected[step] = gae + value_preds[step]
+
+        assert torch.allclose(
+            compute_gae_returns(rewards, value_preds, masks, gamma, tau),
+            expected,
+            atol=1e-5,
+        )
+
+
+@pytest.mark.skipif(
+    not baseline_installed, reason="baseline sub-module not installed"
+)
+def test_rollout_storage_mask_interrupted_episodes():
+    from types import SimpleNamespace
+
+    from gym import spaces
+
+    from habitat_baselines.common.rollout_storage import RolloutStorage
+
+    num_steps, num_envs = 6, 2
+    rollouts = RolloutStorage(
+        num_steps,
+        num_envs,
+        spaces.Dict({"pos": spaces.Box(-1.0, 1.0, (2,))}),
+        spaces.Discrete(3),
+        SimpleNamespace(num_recurrent_layers=1, recurrent_hidden_size=4),
+    )
+    # The episode of env 0 ends after step 1 and the new one is cut short
+    # at step 3.
+    dones = {1: [True, False], 3: [True, False]}
+    for step in range(num_steps):
+        if step == 3:
+            rollouts.mask_interrupted_episodes(torch.tensor([0]))
+        done = dones.get(step, [False, False])
+        rollouts.insert(
+            rewards=torch.ones(num_envs, 1),
+            next_masks=torch.tensor([[not d] for d in done]),
+        )
+        rollouts.advance_rollout()
+
+    loss_mask = rollouts.buffers["loss_mask"][:num_steps].view(-1, num_envs)
+    assert loss_mask[:, 0].tolist() == [
+        True,
+        True,
+        False,
+        False,
+        True,
+        True,
+    ]
+    assert loss_mask[:, 1].all()
+
+    batch = next(rollouts.data_generator(None, 1))
+    assert batch["loss_mask"].sum() == num_steps * num_envs - 2
+
+    rollouts.after_update()
+    assert rollouts.buffers["loss_mask"].all()
+
+
+@pytest.mark.skipif(
+    not baseline_installed, reason="baseline sub-module not installed"
+)
+def test_first_ready_rollout_ends_early():
+    from types import SimpleNamespace
+
+    from habitat_baselines.rl.ppo.ppo_trainer import PPOTrainer
+
+    num_envs, num_steps = 3, 8
+    in_flight = set()
+    env_steps = [0 for _ in range(num_envs)]
+
+    def step_envs(env_idxs):
+        in_flight.update(env_idxs)
+
+    def collect(env_idxs):
+        for i in env_idxs:
+            env_steps[i] += 1
+        return len(env_idxs)
+
+    def wait_any(min_ready):
+        # The first environment is always the fastest one.
+        ready = sorted(in_flight)[:min_ready]
+        in_flight.difference_update(ready)
+        return ready
+
+    trainer = PPOTrainer.__new__(PPOTrainer)
+    trainer.envs = SimpleNamespace(num_envs=num_envs, wait_any=wait_any)
+    trainer._ppo_cfg = SimpleNamespace(
+        num_steps=num_steps, first_ready_min_envs=1
+    )
+    trainer._compute_actions_and_step_envs_at = step_envs
+    trainer._collect_environment_result_at = collect
+    trainer.should_end_early = lambda rollout_step: rollout_step >= 3
+
+    assert trainer._collect_first_ready_rollout() == 3 * num_envs
+    assert env_steps == [3, 3, 3]
+    assert len(in_flight) == 0
+
+    env_steps[:] = [0 for _ in range(num_envs)]
+    trainer.should_end_early = lambda rollout_step: False
+    assert trainer._collect_first_ready_rollout() == num_steps * num_envs
+    assert env_steps == [num_steps for _ in range(num_envs)]
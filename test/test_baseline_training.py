@@ -289,6 +289,50 @@ def test_hrl(config_path, policy_type, skill_type, mode):
         execute_exp(config, mode)
 
 
+@pytest.mark.skipif(
+    not baseline_installed, reason="baseline sub-module not installed"
+)
+def test_hrl_broadcast_skill_ids():
+    from types import SimpleNamespace
+
+    from habitat_baselines.common.tensor_dict import TensorDict
+    from habitat_baselines.rl.hrl.hierarchical_policy import HierarchicalPolicy
+
+    policy = HierarchicalPolicy.__new__(HierarchicalPolicy)
+    # Skill 1 is redirected to skill 0.
+    policy._skill_redirect_ids = np.array([0, 0, 2], dtype=np.int64)
+    policy._skills = {
+        0: SimpleNamespace(required_obs_keys=["a"]),
+        2: SimpleNamespace(required_obs_keys=["b"]),
+    }
+    observations = TensorDict(
+        {"a": torch.arange(4), "b": torch.arange(4) + 10}
+    )
+    masks = torch.arange(4)
+
+    # The high-level policies output the skill IDs as floats.
+    grouped_skills = policy._broadcast_skill_ids(
+        torch.tensor([0.0, 1.0, 2.0, -1.0]),
+        sel_dat={"observations": observations, "masks": masks},
+    )
+    assert sorted(grouped_skills.keys()) == [0, 2]
+    batch_idxs, skill_dat = grouped_skills[0]
+    assert batch_idxs == [0, 1]
+    assert skill_dat["masks"].tolist() == [0, 1]
+    assert list(skill_dat["observations"].keys()) == ["a"]
+    batch_idxs, skill_dat = grouped_skills[2]
+    assert batch_idxs == [2]
+    assert skill_dat["observations"]["b"].tolist() == [12]
+
+    grouped_skills = policy._broadcast_skill_ids(
+        torch.tensor([1.0, 1.0, 2.0, 0.0]),
+        sel_dat={"masks": masks},
+        should_adds=torch.tensor([True, False, False, True]),
+    )
+    assert list(grouped_skills.keys()) == [0]
+    assert grouped_skills[0][0] == [0, 3]
+
+
 @pytest.mark.skipif(
     int(os.environ.get("TEST_BASELINE_SMALL", 0)) == 0,
     reason="Full training tests did not run. Need `export TEST_BASELINE_SMALL=1",
@@ -4,11 +4,20 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
+import pickle
 from itertools import groupby, islice
 
+import numpy as np
 import pytest
+from omegaconf import OmegaConf
 
+from habitat.core.columnar_episodes import (
+    ColumnarEpisodes,
+    read_columnar_dataset_state,
+    write_columnar_episodes,
+)
 from habitat.core.dataset import Dataset, Episode
+from habitat.datasets.pointnav.pointnav_dataset import PointNavDatasetV1
 from habitat.tasks.nav.nav import NavigationEpisode, NavigationGoal
 
 
@@ -27,6 +36,26 @@ def _construct_dataset(num_episodes, num_groups=10):
     return dataset
 
 
+def _episode_from_dict(fields):
+    return Episode(**fields)
+
+
+def _construct_columnar_dataset(path, num_episodes, num_groups=10):
+    dataset = _construct_dataset(num_episodes, num_groups)
+    store_path = str(path / "dataset.episodes")
+    write_columnar_episodes(
+        store_path,
+        [
+            PointNavDatasetV1().episode_to_columnar(ep)
+            for ep in dataset.episodes
+        ],
+    )
+    dataset.episodes = ColumnarEpisodes(
+        store_path, episode_fn=_episode_from_dict
+    )
+    return dataset
+
+
 def test_scene_ids():
     dataset = _construct_dataset(100)
     assert dataset.scene_ids == ["scene_id_" + str(ii) for ii in range(10)]
@@ -376,3 +405,163 @@ def test_reset_goals():
 
     ep.goals = [NavigationGoal(position=[3, 4, 5])]
     assert ep._shortest_path_cache is None
+
+
+def test_columnar_episodes(tmp_path):
+    episodes = _construct_dataset(100).episodes
+    dataset = _construct_columnar_dataset(tmp_path, 100)
+    assert len(dataset.episodes) == 100
+    assert list(dataset.episodes) == episodes
+    assert dataset.episodes[-1] == episodes[-1]
+    assert list(dataset.episodes[10:20]) == episodes[10:20]
+    assert dataset.scene_ids == _construct_dataset(100).scene_ids
+
+    scene_episodes = dataset.get_scene_episodes("scene_id_0")
+    assert len(scene_episodes) == 10
+    for ep in scene_episodes:
+        assert ep.scene_id == "scene_id_0"
+
+    filtered_dataset = dataset.filter_episodes(
+        lambda ep: int(ep.episode_id) % 2 == 0
+    )
+    assert isinstance(filtered_dataset.episodes, ColumnarEpisodes)
+    assert len(filtered_dataset.episodes) == 50
+
+    unpickled = pickle.loads(pickle.dumps(dataset.episodes[10:20]))
+    assert list(unpickled) == episodes[10:20]
+
+
+def test_columnar_navigation_episodes(tmp_path):
+    dataset = PointNavDatasetV1()
+    rng = np.random.RandomState(0)
+    for i in range(20):
+        dataset.episodes.append(
+            NavigationEpisode(
+                episode_id=str(i),
+                scene_id=f"scene_id_{i % 3}",
+                start_position=rng.rand(3).tolist(),
+                start_rotation=[0, 0, 0, 1],
+                goals=[
+                    NavigationGoal(position=rng.rand(3).tolist(), radius=0.2)
+                    for _ in range(i % 3 + 1)
+                ],
+                info={"geodesic_distance": float(i)},
+            )
+        )
+    dataset.content_scenes_path = "{data_path}/content/{scene}.json.gz"
+    store_path = str(tmp_path / "dataset.episodes")
+    write_columnar_episodes(
+        store_path,
+        [dataset.episode_to_columnar(ep) for ep in dataset.episodes],
+        dataset.columnar_dataset_state(),
+    )
+
+    # Fixed size fields are typed columns, the others are JSON encoded
+    columns_dir = tmp_path / "dataset.episodes" / "columns"
+    assert np.load(columns_dir / "start_position.npy").dtype == np.float64
+    assert np.load(columns_dir / "start_rotation.npy").dtype == np.int64
+    assert not (columns_dir / "goals.npy").exists()
+
+    columnar_dataset = PointNavDatasetV1()
+    columnar_dataset._set_columnar_dataset_state(
+        read_columnar_dataset_state(store_path)
+    )
+    assert columnar_dataset.content_scenes_path == dataset.content_scenes_path
+    episodes = ColumnarEpisodes(
+        store_path, episode_fn=columnar_dataset._episode_from_dict
+    )
+    assert list(episodes) == dataset.episodes
+    assert all(
+        isinstance(goal, NavigationGoal)
+        for ep in episodes
+        for goal in ep.goals
+    )
+
+
+@pytest.mark.parametrize(
+    "collate_scene_ids,sort_by_episode_id",
+    [(True, False), (False, False), (True, True)],
+)
+def test_columnar_get_splits(tmp_path, collate_scene_ids, sort_by_episode_id):
+    dataset = _construct_dataset(1000)
+    columnar_dataset = _construct_columnar_dataset(tmp_path, 1000)
+    kwargs = dict(
+        num_splits=8,
+        episodes_per_split=100,
+        collate_scene_ids=collate_scene_ids,
+        sort_by_episode_id=sort_by_episode_id,
+    )
+    np.random.seed(0)
+    splits = dataset.get_splits(**kwargs)
+    np.random.seed(0)
+    columnar_splits = columnar_dataset.get_splits(**kwargs)
+    for split, columnar_split in zip(splits, columnar_splits):
+        assert isinstance(columnar_split.episodes, ColumnarEpisodes)
+        assert list(columnar_split.episodes) == split.episodes
+
+
+def test_columnar_iterator(tmp_path):
+    dataset = _construct_columnar_dataset(tmp_path, 1000)
+    episode_iter = dataset.get_episode_iterator(
+        max_scene_repeat_episodes=25, shuffle=True, cycle=True
+    )
+    episodes = list(islice(episode_iter, 1000))
+    assert sorted(episodes) == sorted(dataset.episodes)
+    for _, scene_episodes in groupby(episodes, lambda ep: ep.scene_id):
+        assert len(list(scene_episodes)) <= 25
+
+    assert sorted(islice(episode_iter, 1000)) == sorted(dataset.episodes)
+
+
+def test_scene_index():
+    dataset = _construct_dataset(100)
+    index = dataset.scene_index
+    assert list(index.episode_indices("scene_id_3")) == list(range(3, 100, 10))
+    assert dataset.scene_index is index
+
+    # Appended episodes are indexed incrementally
+    dataset.episodes.append(
+        Episode(
+            episode_id="100",
+            scene_id="scene_id_new",
+            start_position=[0, 0, 0],
+            start_rotation=[0, 0, 0, 1],
+        )
+    )
+    assert dataset.scene_index is index
+    assert list(index.episode_indices("scene_id_new")) == [100]
+    assert "scene_id_new" in dataset.scene_ids
+
+    # Assigned episodes are indexed again
+    dataset.episodes = dataset.episodes[:50]
+    assert "scene_id_new" not in dataset.scene_ids
+    assert len(dataset.get_scene_episodes("scene_id_3")) == 5
+
+    filtered_dataset = dataset.filter_episodes(
+        lambda ep: ep.scene_id == "scene_id_3"
+    )
+    assert filtered_dataset.scene_ids == ["scene_id_3"]
+    assert dataset.num_episodes == 50
+
+
+def test_apply_content_scenes_filter():
+    dataset = _construct_dataset(100)
+    config = OmegaConf.create({"content_scenes": ["*"]})
+    dataset._apply_content_scenes_filter(config)
+    assert dataset.num_episodes == 100
+
+    config = OmegaConf.create({"content_scenes": ["scene_id_1", "scene_id_5"]})
+    dataset._apply_content_scenes_filter(config)
+    assert dataset.scene_ids == ["scene_id_1", "scene_id_5"]
+    assert [ep.episode_id for ep in dataset.episodes[:3]] == ["1", "5", "11"]
+
+
+def test_columnar_dataset_state():
+    dataset = PointNavDatasetV1()
+    dataset.episodes = _construct_dataset(10).episodes
+    dataset.content_scenes_path = "{data_path}/content/{scene}.json.gz"
+    # Builds the private scene index, which is not stored
+    assert len(dataset.scene_ids) == 10
+    assert dataset.columnar_dataset_state() == {
+        "content_scenes_path": "{data_path}/content/{scene}.json.gz"
+    }
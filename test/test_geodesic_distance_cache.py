@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from types import SimpleNamespace
+
+import numpy as np
+from omegaconf import OmegaConf
+
+from habitat.config.default_structured_configs import (
+    DistanceToGoalMeasurementConfig,
+)
+from habitat.tasks.nav.geodesic_distance_cache import (
+    GeodesicDistanceCache,
+    compute_distance_field,
+)
+from habitat.tasks.nav.nav import SPL, DistanceToGoal, SoftSPL, Success
+
+
+class _GridPathFinder:
+    r"""Pathfinder of a single floor at height 0 described by a grid."""
+
+    def __init__(self, navigable, meters_per_pixel):
+        self.navigable = navigable
+        self.meters_per_pixel = meters_per_pixel
+        self.navigable_area = navigable.sum() * meters_per_pixel**2
+        self.num_topdown_views = 0
+
+    def get_bounds(self):
+        rows, cols = self.navigable.shape
+        return (
+            np.array([0.0, 0.0, 0.0]),
+            np.array(
+                [
+                    cols * self.meters_per_pixel,
+                    0.0,
+                    rows * self.meters_per_pixel,
+                ]
+            ),
+        )
+
+    def get_topdown_view(self, meters_per_pixel, height):
+        assert meters_per_pixel == self.meters_per_pixel
+        self.num_topdown_views += 1
+        return self.navigable
+
+    def snap_point(self, point):
+        return np.array(point, dtype=np.float32)
+
+
+def test_distance_field_open_grid():
+    navigable = np.ones((50, 50), dtype=bool)
+    field = compute_distance_field(
+        navigable, np.array([[0, 0]]), np.array([0.0]), 0.1
+    )
+    rows, cols = np.mgrid[0:50, 0:50]
+    euclidean = np.hypot(rows, cols) * 0.1
+    assert field[0, 0] < 1e-4
+    assert np.all(field >= euclidean - 1e-4)
+    assert np.all(field <= euclidean * 1.03 + 1e-4)
+
+
+def test_distance_field_walls():
+    navigable = np.ones((20, 20), dtype=bool)
+    navigable[10, :18] = False
+    navigable[:, 19] = False
+    field = compute_distance_field(
+        navigable, np.array([[0, 0]]), np.array([0.0]), 1.0
+    )
+    # The path goes around the end of the wall
+    assert field[11, 0] > 30
+    assert np.isinf(field[10, 0])
+    assert np.isinf(field[0, 19])
+
+
+def test_geodesic_distance_cache(tmp_path):
+    pathfinder = _GridPathFinder(np.ones((40, 40), dtype=bool), 0.1)
+    cache = GeodesicDistanceCache(
+        max_fields=1, meters_per_pixel=0.1, cache_dir=str(tmp_path)
+    )
+    goals = [[0.05, 0.0, 0.05], [3.95, 0.0, 3.95]]
+    field = cache.get(pathfinder, "scene.glb", goals, 0.0)
+    assert abs(field.lookup([1.05, 0.0, 0.05]) - 1.0) < 1e-4
+    assert abs(field.lookup([3.95, 0.0, 2.95]) - 1.0) < 1e-4
+    assert field.lookup([1.05, 2.0, 0.05]) is None
+    assert field.lookup([5.0, 0.0, 0.05]) is None
+
+    assert cache.get(pathfinder, "scene.glb", goals, 0.0) is field
+    cache.get(pathfinder, "scene.glb", goals[:1], 0.0)
+    assert pathfinder.num_topdown_views == 2
+
+    # Evicted fields are read back from disk
+    cache.get(pathfinder, "scene.glb", goals, 0.0)
+    assert pathfinder.num_topdown_views == 2
+    other_cache = GeodesicDistanceCache(
+        max_fields=1, meters_per_pixel=0.1, cache_dir=str(tmp_path)
+    )
+    loaded = other_cache.get(pathfinder, "scene.glb", goals, 0.0)
+    assert np.array_equal(loaded.distances, field.distances)
+    assert pathfinder.num_topdown_views == 2
+
+
+def test_geodesic_distance_cache_key(tmp_path):
+    cache = GeodesicDistanceCache(
+        max_fields=4, meters_per_pixel=0.1, cache_dir=str(tmp_path)
+    )
+    goals = [[0.05, 0.0, 0.05]]
+    pathfinder = _GridPathFinder(np.ones((40, 40), dtype=bool), 0.1)
+    field = cache.get(pathfinder, "data/a/scene.glb", goals, 0.0)
+
+    # Scenes with the same name in another dataset have their own field
+    assert cache.get(pathfinder, "data/b/scene.glb", goals, 0.0) is not field
+    assert pathfinder.num_topdown_views == 2
+
+    # So do scenes whose navmesh changed
+    navigable = np.ones((40, 40), dtype=bool)
+    navigable[20, :30] = False
+    other_pathfinder = _GridPathFinder(navigable, 0.1)
+    other_field = cache.get(other_pathfinder, "data/a/scene.glb", goals, 0.0)
+    assert other_pathfinder.num_topdown_views == 1
+    assert not np.array_equal(other_field.distances, field.distances)
+
+
+class _GridSim:
+    r"""Simulator of an agent on a :ref:`_GridPathFinder` that counts the
+    exact geodesic distance queries.
+    """
+
+    def __init__(self, pathfinder):
+        self.pathfinder = pathfinder
+        self.position = np.zeros(3, dtype=np.float32)
+        self.num_geodesic_distances = 0
+
+    def get_agent_state(self):
+        return SimpleNamespace(position=self.position)
+
+    def geodesic_distance(self, position, goals, episode=None):
+        self.num_geodesic_distances += 1
+        return float(
+            min(np.linalg.norm(np.asarray(g) - position) for g in goals)
+        )
+
+
+def test_spl_uses_geodesic_cache():
+    sim = _GridSim(_GridPathFinder(np.ones((40, 40), dtype=bool), 0.1))
+    config = OmegaConf.structured(
+        DistanceToGoalMeasurementConfig(
+            use_geodesic_cache=True, geodesic_cache_meters_per_pixel=0.1
+        )
+    )
+    distance_to_goal = DistanceToGoal(sim=sim, config=config)
+    success = SimpleNamespace(get_metric=lambda: 0.0)
+    task = SimpleNamespace(
+        measurements=SimpleNamespace(
+            measures={
+                DistanceToGoal.cls_uuid: distance_to_goal,
+                Success.cls_uuid: success,
+            },
+            check_measure_dependencies=lambda *args: None,
+        )
+    )
+    episode = SimpleNamespace(
+        scene_id="scene.glb",
+        start_position=[0.05, 0.0, 0.05],
+        goals=[SimpleNamespace(position=[3.95, 0.0, 0.05])],
+    )
+    sim.position = np.array([0.05, 0.0, 0.05], dtype=np.float32)
+    distance_to_goal.reset_metric(episode)
+    spl_measures = [SPL(sim, config), SoftSPL(sim, config)]
+    for measure in spl_measures:
+        measure.reset_metric(episode, task)
+    # Only the distance at the start of the episode is searched
+    assert sim.num_geodesic_distances == 1
+
+    for x in np.arange(0.15, 2.5, 0.1):
+        sim.position = np.array([x, 0.0, 0.05], dtype=np.float32)
+        distance_to_goal.update_metric(episode)
+        for measure in spl_measures:
+            measure.update_metric(episode, task)
+    assert sim.num_geodesic_distances == 1
+    assert abs(distance_to_goal.get_metric() - 1.5) < 1e-4
+    assert abs(spl_measures[1].get_metric() - (1 - 1.5 / 3.9)) < 1e-4
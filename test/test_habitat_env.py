@@ -19,6 +19,7 @@ from habitat.core.batch_rendering.env_batch_renderer_constants import (
     KEYFRAME_OBSERVATION_KEY,
 )
 from habitat.core.simulator import AgentState
+from habitat.core.vector_env import RESPAWNED_INFO_KEY, _skip_episodes
 from habitat.datasets.pointnav.pointnav_dataset import PointNavDatasetV1
 from habitat.gym.gym_definitions import make_gym_from_config
 from habitat.gym.gym_wrapper import HabGymWrapper
@@ -160,13 +161,15 @@ def test_with_scope():
     assert envs._is_closed
 
 
-def test_number_of_episodes():
+@pytest.mark.parametrize("envs_per_worker", [1, 2])
+def test_number_of_episodes(envs_per_worker):
     configs, _ = _load_test_data()
     env_fn_args = tuple((c,) for c in configs)
     with habitat.VectorEnv(
         make_env_fn=make_gym_from_config,
         env_fn_args=env_fn_args,
         multiprocessing_start_method="forkserver",
+        envs_per_worker=envs_per_worker,
     ) as envs:
         assert envs.number_of_episodes == [10000, 10000, 10000, 10000]
 
@@ -187,6 +190,50 @@ def test_threaded_vectorized_env():
             assert len(observations) == num_envs
 
 
+def test_vectorized_envs_shared_memory_observations():
+    configs, datasets = _load_test_data()
+    num_envs = len(configs)
+    env_fn_args = tuple(zip(configs, datasets, range(num_envs)))
+    with habitat.VectorEnv(
+        make_env_fn=_make_dummy_env_func,
+        env_fn_args=env_fn_args,
+        shared_memory_observations=True,
+    ) as envs, habitat.VectorEnv(
+        make_env_fn=_make_dummy_env_func,
+        env_fn_args=env_fn_args,
+    ) as ref_envs:
+        assert envs.has_shared_observations
+        assert not ref_envs.has_shared_observations
+        observations = envs.reset()
+        ref_observations = ref_envs.reset()
+
+        for _ in range(configs[0].habitat.environment.max_episode_steps):
+            for obs, ref_obs in zip(observations, ref_observations):
+                for k, v in ref_obs.items():
+                    assert np.allclose(obs[k], v)
+
+            shared_observations = envs.shared_observations()
+            for k, v in shared_observations.items():
+                assert v.size(0) == num_envs
+                for i in range(num_envs):
+                    assert np.allclose(v[i].numpy(), ref_observations[i][k])
+
+            actions = sample_non_stop_action_gym(
+                envs.action_spaces[0], num_envs
+            )
+            outputs = envs.step(actions)
+            ref_outputs = ref_envs.step(actions)
+            observations = [o[0] for o in outputs]
+            ref_observations = [o[0] for o in ref_outputs]
+            assert [o[1:3] for o in outputs] == [o[1:3] for o in ref_outputs]
+
+        envs.pause_at(1)
+        shared_observations = envs.shared_observations()
+        for k, v in shared_observations.items():
+            assert v.size(0) == num_envs - 1
+            assert np.allclose(v[1].numpy(), ref_observations[2][k])
+
+
 @pytest.mark.parametrize("gpu2gpu", [False, True])
 def test_env(gpu2gpu):
     import habitat_sim
@@ -462,7 +509,8 @@ def _make_dummy_env_func(config, dataset=None, env_id=0, rank=0):
     return env
 
 
-def test_vec_env_call_func():
+@pytest.mark.parametrize("envs_per_worker", [1, 3])
+def test_vec_env_call_func(envs_per_worker):
     configs, datasets = _load_test_data()
     num_envs = len(configs)
     env_fn_args = tuple(zip(configs, datasets, range(num_envs)))
@@ -471,6 +519,7 @@ def test_vec_env_call_func():
         make_env_fn=_make_dummy_env_func,
         env_fn_args=env_fn_args,
         multiprocessing_start_method="forkserver",
+        envs_per_worker=envs_per_worker,
     ) as envs:
         envs.reset()
         env_ids = envs.call(["get_env_ind"] * num_envs)
@@ -504,13 +553,15 @@ def test_vec_env_call_func():
         assert env_ids == list(range(num_envs))
 
 
-def test_close_with_paused():
+@pytest.mark.parametrize("envs_per_worker", [1, 2])
+def test_close_with_paused(envs_per_worker):
     configs, _ = _load_test_data()
     env_fn_args = tuple((c,) for c in configs)
     with habitat.VectorEnv(
         make_env_fn=make_gym_from_config,
         env_fn_args=env_fn_args,
         multiprocessing_start_method="forkserver",
+        envs_per_worker=envs_per_worker,
     ) as envs:
         envs.reset()
 
@@ -520,6 +571,109 @@ def test_close_with_paused():
     assert envs._is_closed
 
 
+@pytest.mark.parametrize("envs_per_worker", [1, 2])
+@pytest.mark.parametrize(
+    "vector_env_cls", [habitat.VectorEnv, habitat.ThreadedVectorEnv]
+)
+def test_vec_env_wait_any(envs_per_worker, vector_env_cls):
+    configs, _ = _load_test_data()
+    num_envs = len(configs)
+    env_fn_args = tuple((c,) for c in configs)
+    with vector_env_cls(
+        make_env_fn=make_gym_from_config,
+        env_fn_args=env_fn_args,
+        multiprocessing_start_method="forkserver",
+        envs_per_worker=envs_per_worker,
+    ) as envs:
+        envs.reset()
+        # Nothing is stepping, so nothing can become ready
+        assert envs.wait_any(timeout=0.0) == []
+
+        for i in range(num_envs):
+            envs.async_step_at(i, envs.action_spaces[i].sample())
+
+        remaining = set(range(num_envs))
+        while len(remaining) > 0:
+            ready = envs.wait_any(min_ready=1)
+            assert len(ready) > 0
+            assert set(ready) <= remaining
+            for i in ready:
+                envs.wait_step_at(i)
+            remaining -= set(ready)
+
+        for i in range(num_envs):
+            envs.async_step_at(i, envs.action_spaces[i].sample())
+        ready = envs.wait_any(min_ready=num_envs)
+        assert sorted(ready) == list(range(num_envs))
+        for i in ready:
+            envs.wait_step_at(i)
+
+
+@pytest.mark.parametrize("envs_per_worker", [1, 2])
+def test_vec_env_respawn(envs_per_worker):
+    configs, _ = _load_test_data()
+    num_envs = len(configs)
+    env_fn_args = tuple((c,) for c in configs)
+    with habitat.VectorEnv(
+        make_env_fn=make_gym_from_config,
+        env_fn_args=env_fn_args,
+        multiprocessing_start_method="forkserver",
+        envs_per_worker=envs_per_worker,
+        respawn_workers=True,
+    ) as envs:
+        envs.reset()
+        episode_ids = [ep.episode_id for ep in envs.current_episodes()]
+
+        killed_worker = envs._workers[1]
+        killed = [w is killed_worker for w in envs._workers]
+        killed_worker.kill()
+        killed_worker.join()
+
+        outputs = envs.step(
+            [envs.action_spaces[i].sample() for i in range(num_envs)]
+        )
+        assert envs.num_respawns == 1
+        for i, (_, reward, done, info) in enumerate(outputs):
+            assert info.get(RESPAWNED_INFO_KEY, False) == killed[i]
+            if killed[i]:
+                assert done and reward == 0.0
+
+        # The respawned envs resume at the next episode
+        new_episode_ids = [ep.episode_id for ep in envs.current_episodes()]
+        for i in range(num_envs):
+            if killed[i]:
+                assert new_episode_ids[i] != episode_ids[i]
+
+        envs.step([envs.action_spaces[i].sample() for i in range(num_envs)])
+
+
+@pytest.mark.parametrize("num_started", [0, 1, 3])
+def test_skip_episodes(num_started):
+    episodes = [
+        NavigationEpisode(
+            episode_id=str(i),
+            scene_id="scene",
+            start_position=[0.0, 0.0, 0.0],
+            start_rotation=[0.0, 0.0, 0.0, 1.0],
+            goals=[],
+        )
+        for i in range(6)
+    ]
+    # A newly created env, which took its first episode from the iterator
+    env = habitat.Env.__new__(habitat.Env)
+    env._episode_iterator = iter(episodes)
+    env.current_episode = next(env.episode_iterator)
+
+    _skip_episodes(env, num_started)
+
+    # The episode the next reset of the env starts, see `habitat.Env.reset`
+    if env._episode_from_iter_on_reset:
+        next_episode = next(env.episode_iterator)
+    else:
+        next_episode = env.current_episode
+    assert next_episode.episode_id == str(num_started)
+
+
 # TODO Bring back this test for the greedy follower
 @pytest.mark.skip
 def test_action_space_shortest_path():
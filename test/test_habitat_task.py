@@ -11,6 +11,7 @@ import pytest
 
 import habitat
 from habitat.config.default_structured_configs import TeleportActionConfig
+from habitat.core.embodied_task import Measure, Measurements
 from habitat.utils.test_utils import sample_non_stop_action
 
 CFG_TEST = "test/config/habitat/habitat_all_sensors_test.yaml"
@@ -100,3 +101,64 @@ def test_task_actions_sampling(config_file):
             env.step(action)
             agent_state = env.sim.get_agent_state()
             habitat.logger.info(agent_state)
+
+
+class _CountingMeasure(Measure):
+    def __init__(self, uuid, is_lazy, dependency=None):
+        self._uuid = uuid
+        self.is_lazy = is_lazy
+        self._dependency = dependency
+        self.num_updates = 0
+        super().__init__()
+
+    def _get_uuid(self, *args, **kwargs):
+        return self._uuid
+
+    def reset_metric(self, *args, **kwargs):
+        self.num_updates = 0
+        self.update_metric(*args, **kwargs)
+
+    def update_metric(self, *args, task, **kwargs):
+        self.num_updates += 1
+        value = task.measurements.step_context.get("value", task.get_value)
+        if self._dependency is not None:
+            value += task.measurements.measures[self._dependency].get_metric()
+        self._metric = value
+
+
+class _FakeTask:
+    def __init__(self, measures):
+        self.measurements = Measurements(measures)
+        self.num_queries = 0
+
+    def get_value(self):
+        self.num_queries += 1
+        return self.num_queries
+
+    def add_perf_timing(self, *args, **kwargs):
+        pass
+
+
+def test_lazy_measures():
+    distance = _CountingMeasure("distance", is_lazy=True)
+    at_goal = _CountingMeasure("at_goal", is_lazy=True, dependency="distance")
+    logging_only = _CountingMeasure("logging_only", is_lazy=True)
+    reward = _CountingMeasure("reward", is_lazy=False, dependency="at_goal")
+    task = _FakeTask([distance, at_goal, logging_only, reward])
+    task.measurements.reset_measures(task=task)
+    assert task.num_queries == 1
+
+    task.measurements.update_measures(task=task)
+    # The reward pulls the lazy measures it depends on, and the value shared
+    # through the step context is queried once.
+    assert reward.get_metric() == 6
+    assert (distance.num_updates, at_goal.num_updates) == (2, 2)
+    assert logging_only.num_updates == 1
+    assert task.num_queries == 2
+
+    # Reading the metrics updates the pending lazy measures
+    task.measurements.update_measures(task=task)
+    metrics = task.measurements.get_metrics()
+    assert metrics["logging_only"] == 3
+    assert logging_only.num_updates == 2
+    assert task.num_queries == 3
@@ -4,6 +4,8 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
+import os
+import pickle as pkl
 from os import path as osp
 
 import gym
@@ -18,6 +20,10 @@ import habitat_sim.agent
 from habitat.articulated_agent_controllers import (
     HumanoidRearrangeController,
     HumanoidSeqPoseController,
+    load_motion_library,
+)
+from habitat.articulated_agent_controllers.motion_library import (
+    MOTION_LIBRARY_SUFFIX,
 )
 
 default_sim_settings = {
@@ -441,3 +447,72 @@ def test_humanoid_seqpose_controller(humanoid_name):
                 "test_humanoid_wrapper",
                 open_vid=True,
             )
+
+
+def test_motion_library(tmp_path):
+    rng = np.random.RandomState(0)
+    motion_data = {
+        "walk_motion": {
+            "joints_array": rng.rand(10, 54, 4),
+            "transform_array": rng.rand(10, 4, 4),
+            "displacement": None,
+            "fps": 30,
+        },
+        "left_hand": {
+            "coord_info": np.array(
+                {"min": [-0.1, 0.0, -0.2], "max": [0.3, 0.2, 0.4]},
+                dtype=object,
+            ),
+        },
+    }
+    motion_path = str(tmp_path / "motion.pkl")
+    with open(motion_path, "wb") as f:
+        pkl.dump(motion_data, f)
+
+    library = load_motion_library(motion_path)
+    assert osp.isfile(motion_path + MOTION_LIBRARY_SUFFIX)
+    assert load_motion_library(motion_path) is library
+
+    tree = library.tree()
+    walk_motion = tree["walk_motion"]
+    assert np.array_equal(
+        walk_motion["joints_array"], motion_data["walk_motion"]["joints_array"]
+    )
+    assert not walk_motion["joints_array"].flags.writeable
+    assert walk_motion["displacement"] is None
+    assert walk_motion["fps"] == 30
+    assert np.allclose(tree["left_hand"]["coord_info"]["max"], [0.3, 0.2, 0.4])
+
+    # The library is converted again when the motion file changes
+    motion_data["walk_motion"]["fps"] = 60
+    with open(motion_path, "wb") as f:
+        pkl.dump(motion_data, f)
+    os.utime(motion_path, ns=(0, 0))
+    library = load_motion_library(motion_path)
+    assert library.tree()["walk_motion"]["fps"] == 60
+
+
+def test_humanoid_controller_without_hand_data(tmp_path):
+    rng = np.random.RandomState(0)
+    motion_data = {
+        "walk_motion": {
+            "joints_array": rng.rand(10, 54, 4),
+            "transform_array": np.tile(np.eye(4), (10, 1, 1)),
+            "displacement": np.linspace(0.0, 1.0, 10),
+            "fps": 30,
+        },
+        "stop_pose": {
+            "joints": rng.rand(54, 4),
+            "transform": np.eye(4),
+        },
+    }
+    motion_path = str(tmp_path / "motion.pkl")
+    with open(motion_path, "wb") as f:
+        pkl.dump(motion_data, f)
+
+    controller = HumanoidRearrangeController(motion_path)
+    assert controller.hand_processed_data == {
+        "left_hand": None,
+        "right_hand": None,
+    }
+    assert controller._hand_pose_tables == {}
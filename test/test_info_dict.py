@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import numpy as np
+import pytest
+
+from habitat_baselines.utils.info_dict import (
+    ScalarInfoExtractor,
+    extract_scalars_from_infos,
+)
+
+
+def _make_info(step):
+    return {
+        "distance_to_goal": 1.0 / (step + 1),
+        "success": np.float32(step % 2),
+        "top_down_map": {"map": np.zeros((4, 4))},
+        "collisions": {"count": step, "is_collision": False},
+        "composite_stage_goals": {"stage_0.5_success": step > 1},
+        "episode_name": "ep",
+        "obj_pos": np.zeros(3),
+    }
+
+
+def test_scalar_info_extractor():
+    extractor = ScalarInfoExtractor(ignore_keys={"success"})
+    for step in range(3):
+        infos = [_make_info(step), _make_info(step + 1)]
+        names, values, found = extractor.extract(infos)
+        assert found.all()
+        expected = extract_scalars_from_infos(infos, ignore_keys={"success"})
+        assert set(names) == set(expected.keys())
+        for i, name in enumerate(names):
+            assert np.allclose(values[:, i], expected[name])
+
+    # A new layout of keys adds columns after the existing ones.
+    info = _make_info(0)
+    info["new_measure"] = 2.0
+    del info["distance_to_goal"]
+    names, values, found = extractor.extract([_make_info(0), info])
+    assert names == extractor.metric_names
+    assert names[-1] == "new_measure"
+    assert not found[0, -1] and values[0, -1] == 0.0
+    assert found[1, -1] and values[1, -1] == 2.0
+    col = names.index("distance_to_goal")
+    assert not found[1, col] and values[1, col] == 0.0
+    assert extractor.metric_paths["collisions.count"] == (
+        "collisions",
+        "count",
+    )
+
+    # A value that was not a scalar before is picked up once it is one.
+    info = _make_info(0)
+    info["obj_pos"] = np.zeros(1)
+    names, values, found = extractor.extract([info])
+    assert "obj_pos" in names
+
+
+def test_update_info_stats_missing_metric():
+    torch = pytest.importorskip("torch")
+    from habitat_baselines.rl.ppo.ppo_trainer import PPOTrainer
+
+    trainer = PPOTrainer.__new__(PPOTrainer)
+    trainer._rank0_keys = {"success"}
+    trainer._info_extractor = ScalarInfoExtractor()
+    trainer._is_rank0_metric = {}
+    trainer.current_episode_reward = torch.zeros(2, 1)
+    trainer.running_episode_stats = {"count": torch.zeros(2, 1)}
+
+    # Metrics missing in envs whose episode did not end are not counted
+    info = _make_info(1)
+    del info["distance_to_goal"]
+    del info["success"]
+    trainer._update_info_stats(
+        [_make_info(0), info], slice(0, 2), torch.tensor([[True], [False]])
+    )
+    assert torch.equal(
+        trainer.running_episode_stats["distance_to_goal"],
+        torch.tensor([[1.0], [0.0]]),
+    )
+    assert np.array_equal(trainer._single_proc_infos["success"], [0.0])
+
+    with pytest.raises(RuntimeError, match="distance_to_goal"):
+        trainer._update_info_stats(
+            [_make_info(0), info], slice(0, 2), torch.tensor([[True], [True]])
+        )
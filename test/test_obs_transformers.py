@@ -3,13 +3,17 @@
 # LICENSE file in the root directory of this source tree.
 
 import pytest
+import torch
 from gym import spaces
 from gym.vector.utils.spaces import batch_space
 
 from habitat_baselines.common.baseline_registry import baseline_registry
 from habitat_baselines.common.obs_transformers import (  # get_active_obs_transforms,
+    CenterCropper,
+    ResizeShortestEdge,
     apply_obs_transforms_batch,
     apply_obs_transforms_obs_space,
+    fuse_obs_transforms,
 )
 from habitat_baselines.common.tensor_dict import TensorDict
 from habitat_baselines.config.default_structured_configs import (
@@ -18,6 +22,7 @@ from habitat_baselines.config.default_structured_configs import (
     Cube2FishConfig,
     Eq2CubeConfig,
     ObsTransformConfig,
+    ResizeShortestEdgeCenterCropperConfig,
     ResizeShortestEdgeConfig,
 )
 
@@ -27,6 +32,7 @@ from habitat_baselines.config.default_structured_configs import (
     [
         ResizeShortestEdgeConfig(),
         CenterCropperConfig(),
+        ResizeShortestEdgeCenterCropperConfig(),
         Cube2EqConfig(),
         Cube2FishConfig(),
         Eq2CubeConfig(),
@@ -62,3 +68,33 @@ def test_transforms(obs_transform_config: ObsTransformConfig):
     assert modified_obs_space.contains(
         {k: v[0] for k, v in transformed_obs.items()}
     ), f"Observation transform generated the observation ({str({k: v.shape for k,v in transformed_obs.items()}) }) which is incompatible with the defined observation space {modified_obs_space}"
+
+
+@pytest.mark.parametrize(
+    "height,width,size,crop_size",
+    [
+        (64, 48, 24, (20, 16)),
+        (60, 40, 25, (20, 20)),
+        (32, 32, 32, (16, 16)),
+    ],
+)
+def test_fused_resize_crop(height, width, size, crop_size):
+    obs_transforms = [ResizeShortestEdge(size), CenterCropper(crop_size)]
+    fused_obs_transforms = fuse_obs_transforms(obs_transforms)
+    assert len(fused_obs_transforms) == 1
+
+    observation = {
+        "rgb": torch.randint(0, 255, (2, height, width, 3), dtype=torch.uint8),
+        "depth": torch.rand(2, height, width, 1),
+        "semantic": torch.randint(0, 10, (2, height, width, 1)),
+    }
+    expected_obs = apply_obs_transforms_batch(
+        dict(observation), obs_transforms
+    )
+    fused_obs = apply_obs_transforms_batch(
+        dict(observation), fused_obs_transforms
+    )
+    for k, v in expected_obs.items():
+        assert fused_obs[k].shape == v.shape
+        assert fused_obs[k].dtype == v.dtype
+        assert torch.allclose(fused_obs[k].float(), v.float(), atol=1e-4)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import numpy as np
+import pytest
+
+from habitat.tasks.rearrange.sim_snapshot import RearrangeSimSnapshot
+
+
+def _make_snapshot(with_articulated_agent_js=True):
+    rng = np.random.RandomState(0)
+    return RearrangeSimSnapshot.from_lists(
+        articulated_agent_T=[np.eye(4)],
+        art_T=[np.eye(4), np.eye(4), np.eye(4)],
+        rigid_T=rng.rand(5, 4, 4),
+        rigid_V=rng.rand(5, 2, 3),
+        art_pos=[[0.1, 0.2], [], [0.3, 0.4, 0.5]],
+        obj_hold=[None],
+        articulated_agent_js=[[0.0] * 7]
+        if with_articulated_agent_js
+        else None,
+    )
+
+
+def test_snapshot_packing():
+    snapshot = _make_snapshot()
+    assert snapshot.rigid_T.shape == (5, 4, 4)
+    assert np.allclose(snapshot.get_art_pos(0), [0.1, 0.2])
+    assert len(snapshot.get_art_pos(1)) == 0
+    assert np.allclose(snapshot.get_art_pos(2), [0.3, 0.4, 0.5])
+    assert snapshot.get_obj_hold() == [None]
+    assert len(snapshot.get_articulated_agent_js(0)) == 7
+    with pytest.raises(ValueError):
+        _make_snapshot(False).get_articulated_agent_js(0)
+
+
+def test_snapshot_diff():
+    snapshot = _make_snapshot()
+    other = _make_snapshot()
+    assert not snapshot.diff(other).any()
+
+    other.rigid_T[3, 0, 3] += 1.0
+    other.art_pos[3] += 1e-3
+    other.articulated_agent_js[2] += 1.0
+    other.obj_hold[0] = 10
+    diff = snapshot.diff(other)
+    assert diff.rigid_objs.tolist() == [False, False, False, True, False]
+    assert diff.art_objs.tolist() == [False, False, True]
+    assert diff.articulated_agents.tolist() == [True]
+    assert diff.obj_hold.tolist() == [True]
+    assert snapshot.diff(other, atol=1e-2).art_objs.tolist() == [
+        False,
+        False,
+        False,
+    ]
+
+
+def test_snapshot_serialization():
+    for with_articulated_agent_js in [True, False]:
+        snapshot = _make_snapshot(with_articulated_agent_js)
+        loaded = RearrangeSimSnapshot.from_bytes(snapshot.to_bytes())
+        assert not snapshot.diff(loaded).any()
+        assert (loaded.articulated_agent_js is None) == (
+            not with_articulated_agent_js
+        )
@@ -26,6 +26,15 @@ from habitat.core.embodied_task import Episode
 from habitat.core.environments import get_env_class
 from habitat.core.logging import logger
 from habitat.datasets.rearrange.rearrange_dataset import RearrangeDatasetV0
+from habitat.tasks.rearrange.multi_task.pddl_compiled import CompiledPredicates
+from habitat.tasks.rearrange.utils import (
+    SPAWN_CANDIDATE_CHUNK_SIZE,
+    CollisionClassifier,
+    ContactPointArrays,
+    SpawnCandidateCache,
+    get_angle_to_pos,
+    get_angles_to_pos,
+)
 from habitat.utils.geometry_utils import is_point_in_triangle
 
 CFG_TEST = "benchmark/rearrange/skills/pick.yaml"
@@ -145,6 +154,18 @@ def test_pddl():
         x.compact_str == "at(goal0|0,TARGET_goal0|0)" for x in true_preds
     )
 
+    # The compiled predicates match the predicates evaluated one by one.
+    poss_preds = pddl.get_possible_predicates()
+    compiled_preds = CompiledPredicates(poss_preds, sim_info)
+    assert compiled_preds.is_true().tolist() == [
+        p.is_true(sim_info) for p in poss_preds
+    ]
+    assert pddl.get_possible_actions(true_preds=true_preds) == [
+        ac
+        for ac in poss_actions
+        if ac.is_precond_satisfied_from_predicates(true_preds)
+    ]
+
 
 TEST_CFG_PATHS = list(
     glob(
@@ -416,3 +437,143 @@ def test_receptacle_parsing():
                         assert (
                             in_mesh
                         ), "The point must belong to a triangle of the local mesh to be valid."
+
+
+def test_triangle_mesh_sampling_data():
+    vertices = np.array(
+        [
+            [0.0, 0.0, 0.0],
+            [1.0, 0.0, 0.0],
+            [0.0, 0.0, 1.0],
+            [0.0, 1.0, 0.0],
+            [3.0, 1.0, 0.0],
+            [0.0, 1.0, 1.0],
+        ]
+    )
+    sampling_data = hab_receptacle.TriangleMeshSamplingData.from_arrays(
+        vertices, [0, 1, 2, 3, 4, 5]
+    )
+    assert np.isclose(sampling_data.total_area, 2.0)
+    assert np.allclose(sampling_data.area_cdf, [0.25, 1.0])
+
+    np.random.seed(0)
+    points = sampling_data.sample_points(10000)
+    assert points.shape == (10000, 3)
+    on_second_face = points[:, 1] == 1.0
+    # faces are sampled proportionally to their area
+    assert abs(on_second_face.mean() - 0.75) < 0.02
+    for point, f_ix in zip(points[:100], on_second_face[:100].astype(int)):
+        assert is_point_in_triangle(
+            point, *vertices[sampling_data.indices[f_ix]]
+        )
+
+
+def test_collision_classifier():
+    class _Agent:
+        def get_robot_sim_id(self):
+            return 1
+
+        def is_base_link(self, link_id):
+            return link_id == 0
+
+    # (object_id_a, object_id_b, link_id_a, link_id_b)
+    contacts = np.array(
+        [
+            [1, 5, 3, 0],  # agent arm with a scene object
+            [7, 1, 0, 2],  # agent arm with the stage
+            [1, 6, 0, 0],  # agent base with the stage
+            [5, 8, 0, 0],  # held object with the stage
+        ]
+    )
+    contacts = ContactPointArrays(
+        object_id_a=contacts[:, 0],
+        object_id_b=contacts[:, 1],
+        link_id_a=contacts[:, 2],
+        link_id_b=contacts[:, 3],
+        normal_force=np.ones(len(contacts)),
+    )
+    classifier = CollisionClassifier()
+    classifier.reset([4, 5])
+
+    did_collide, details = classifier.classify(
+        contacts, _Agent(), 5, True, get_extra_coll_data=True
+    )
+    assert did_collide
+    assert details.robot_obj_colls == 1
+    assert details.robot_scene_colls == 1
+    assert details.obj_scene_colls == 1
+    assert details.robot_coll_ids == [5, 7]
+    assert details.all_colls == [(1, 5), (7, 1), (5, 8)]
+
+    _, details = classifier.classify(
+        contacts,
+        _Agent(),
+        None,
+        True,
+        ignore_names=[7],
+        ignore_base=False,
+        get_extra_coll_data=True,
+    )
+    assert details.obj_scene_colls == 0
+    assert details.robot_coll_ids == [5, 6]
+
+
+def test_spawn_candidate_cache():
+    rel_pos = np.random.RandomState(0).randn(20, 3)
+    rel_pos[0] = 0.0
+    assert np.allclose(
+        get_angles_to_pos(rel_pos), [get_angle_to_pos(p) for p in rel_pos]
+    )
+
+    class _PathFinder:
+        num_calls = 0
+
+        def get_random_navigable_point_near(
+            self, circle_center, radius, island_index
+        ):
+            self.num_calls += 1
+            if self.num_calls % 3 == 0:
+                return np.full(3, np.nan)
+            offset = np.random.uniform(-radius, radius, size=3)
+            return np.asarray(circle_center) + offset
+
+    class _Sim:
+        pathfinder = _PathFinder()
+        largest_island_idx = 0
+
+    sim = _Sim()
+    target = np.array([1.0, 0.5, -2.0])
+    cache = SpawnCandidateCache(max_size=4)
+    candidates = cache.get(sim, target, 1.0, 30)
+    assert sim.pathfinder.num_calls == 30
+    assert 0 < len(candidates) <= 20
+    assert not np.isnan(candidates).any()
+    assert (
+        np.linalg.norm((candidates - target)[:, [0, 2]], axis=1) <= 1.0
+    ).all()
+
+    assert cache.get(sim, target, 1.0, 30) is candidates
+    assert sim.pathfinder.num_calls == 30
+    cache.discard(target, 1.0, 30)
+    assert cache.get(sim, target, 1.0, 30) is not candidates
+    assert sim.pathfinder.num_calls == 60
+
+    # Candidates are sampled on every call when caching is disabled
+    cache = SpawnCandidateCache()
+    candidates = cache.get(sim, target, 1.0, 30)
+    assert cache.get(sim, target, 1.0, 30) is not candidates
+    assert sim.pathfinder.num_calls == 120
+
+    # Without caching, the candidates are only sampled a chunk at a time.
+    chunks = cache.get_chunks(sim, target, 1.0, 25)
+    next(chunks)
+    assert sim.pathfinder.num_calls == 120 + SPAWN_CANDIDATE_CHUNK_SIZE
+    list(chunks)
+    assert sim.pathfinder.num_calls == 145
+
+    # With caching, all the cached candidates are yielded at once.
+    cache = SpawnCandidateCache(max_size=4)
+    (chunk,) = cache.get_chunks(sim, target, 1.0, 30)
+    candidates = cache.get(sim, target, 1.0, 30)
+    assert sim.pathfinder.num_calls == 175
+    assert np.array_equal(np.sort(chunk, axis=0), np.sort(candidates, axis=0))
@@ -6,8 +6,12 @@
 
 import numpy as np
 
+from habitat.core.utils import try_cv2_import
+from habitat.utils.visualizations import fog_of_war, maps
 from habitat.utils.visualizations.utils import observations_to_image
 
+cv2 = try_cv2_import()
+
 
 def test_observations_to_image():
     observations = {
@@ -57,3 +61,153 @@ def test_different_dim_observations_to_image():
         1570,
         3,
     ), "Resulted image resolution doesn't match."
+
+
+def test_downsample_topdown_map():
+    top_down_map = np.ones((301, 300), dtype=np.uint8)
+    top_down_map[150, 10:200] = 100
+    downsampled = maps.downsample_topdown_map(top_down_map, 4)
+    assert downsampled.shape == (76, 75)
+    # The drawn path survives downsampling
+    assert (downsampled[37, 3:50] == 100).all()
+
+
+def test_apply_top_down_map_delta():
+    full_info = {
+        "map": np.ones((100, 100), dtype=np.uint8),
+        "fog_of_war_mask": None,
+        "agent_map_coord": [(10, 10)],
+        "agent_angle": [0.0],
+    }
+    info = maps.apply_top_down_map_delta(full_info, None)
+    delta_info = {
+        "map_delta": (10, 20, np.full((2, 3), 50, dtype=np.uint8)),
+        "fog_of_war_mask_delta": None,
+        "agent_map_coord": [(11, 21)],
+        "agent_angle": [1.0],
+    }
+    info = maps.apply_top_down_map_delta(delta_info, info)
+    assert (info["map"][10:12, 20:23] == 50).all()
+    assert info["map"].sum() == 100 * 100 + 6 * 49
+    assert info["agent_map_coord"] == [(11, 21)]
+
+
+def test_reveal_fog_of_war_batch():
+    top_down_map = np.ones((200, 200), dtype=np.uint8)
+    top_down_map[100, :150] = maps.MAP_INVALID_POINT
+    points = np.array([[50, 50], [150, 120]])
+    angles = [0.5, 2.5]
+
+    expected = np.zeros_like(top_down_map)
+    for point, angle in zip(points, angles):
+        expected = fog_of_war.reveal_fog_of_war(
+            top_down_map, expected, point, angle, max_line_len=80
+        )
+    fog_of_war_mask = np.zeros_like(top_down_map)
+    fog_of_war.reveal_fog_of_war_batch(
+        top_down_map, fog_of_war_mask, points, angles, max_line_len=80
+    )
+    assert np.array_equal(fog_of_war_mask, expected)
+
+
+def test_draw_fog_of_war_line():
+    rng = np.random.RandomState(0)
+    top_down_map = (rng.rand(60, 60) > 0.05).astype(np.uint8)
+    pt1 = np.array([30, 30])
+    for angle in np.linspace(0, 2 * np.pi, 50):
+        pt2 = pt1 + 40 * np.array([np.cos(angle), np.sin(angle)])
+        expected = np.zeros_like(top_down_map)
+        for x, y in fog_of_war.bresenham_supercover_line(pt1, pt2):
+            if not (0 <= x < 60 and 0 <= y < 60):
+                break
+            if top_down_map[x, y] == maps.MAP_INVALID_POINT:
+                break
+            expected[x, y] = 1
+        fog_of_war_mask = np.zeros_like(top_down_map)
+        fog_of_war.draw_fog_of_war_line(
+            top_down_map, fog_of_war_mask, pt1, pt2
+        )
+        assert np.array_equal(fog_of_war_mask, expected)
+
+
+def test_grid_transform():
+    class PathFinder:
+        def get_bounds(self):
+            return (
+                np.array([-3.2, 0.0, 1.7], dtype=np.float32),
+                np.array([12.5, 2.0, 9.1], dtype=np.float32),
+            )
+
+    pathfinder = PathFinder()
+    grid_resolution = (301, 517)
+    grid_transform = maps.GridTransform.from_sim(
+        grid_resolution, pathfinder=pathfinder
+    )
+    rng = np.random.RandomState(0)
+    points = rng.uniform(-5, 15, size=(100, 3)).astype(np.float32)
+    grid_points = grid_transform.points_to_grid(points)
+    for point, grid_point in zip(points, grid_points):
+        assert tuple(grid_point) == maps.to_grid(
+            point[2], point[0], grid_resolution, pathfinder=pathfinder
+        )
+
+    realworld_x, realworld_y = grid_transform.from_grid(
+        grid_points[:, 0], grid_points[:, 1]
+    )
+    for grid_point, x, y in zip(grid_points, realworld_x, realworld_y):
+        assert (x, y) == maps.from_grid(
+            grid_point[0],
+            grid_point[1],
+            grid_resolution,
+            pathfinder=pathfinder,
+        )
+
+
+def test_draw_path():
+    path_points = [(10, 10), (40, 80), (90, 20), (-5, 50)]
+    expected = np.zeros((100, 100), dtype=np.uint8)
+    for prev_pt, next_pt in zip(path_points[:-1], path_points[1:]):
+        cv2.line(expected, prev_pt[::-1], next_pt[::-1], 10, thickness=3)
+    top_down_map = np.zeros((100, 100), dtype=np.uint8)
+    maps.draw_path(top_down_map, np.array(path_points), 10, thickness=3)
+    assert np.array_equal(top_down_map, expected)
+
+
+def test_top_down_map_store(tmp_path):
+    class PathFinder:
+        navigable_area = 12.0
+
+        def __init__(self):
+            self.num_views = 0
+
+        def get_bounds(self):
+            return np.zeros(3), np.array([10.0, 5.0, 10.0])
+
+        def get_topdown_view(self, meters_per_pixel, height):
+            self.num_views += 1
+            top_down_view = np.ones((50, 50), dtype=bool)
+            top_down_view[:, : int(height)] = False
+            return top_down_view
+
+    pathfinder = PathFinder()
+    store = maps.TopDownMapStore(max_size=2, cache_dir=str(tmp_path))
+    first_floor = store.get_topdown_map("scene", pathfinder, 0.1, 50)
+    assert np.array_equal(
+        first_floor, maps.get_topdown_map(pathfinder, 0.1, 50)
+    )
+    num_views = pathfinder.num_views
+    # Heights in the same band share a map.
+    store.get_topdown_map("scene", pathfinder, 0.104, 50)
+    assert pathfinder.num_views == num_views
+    second_floor = store.get_topdown_map("scene", pathfinder, 3.1, 50)
+    assert pathfinder.num_views == num_views + 1
+    assert not np.array_equal(first_floor, second_floor)
+
+    # Other stores read the maps from the cache directory.
+    other_store = maps.TopDownMapStore(cache_dir=str(tmp_path))
+    assert np.array_equal(
+        other_store.get_topdown_map("scene", pathfinder, 3.1, 50),
+        second_floor,
+    )
+    assert pathfinder.num_views == num_views + 1
+    assert len(list(tmp_path.iterdir())) == 2